@@ -2,13 +2,23 @@
 import argparse
 import asyncio
 import sys
+from dataclasses import asdict
 from typing import Any
 
+from common.config import RetentionConfig, get_typed_settings
+from database.models import DeadLetterItem
 from database.operations import (
     delete_queue_item,
     flush_all_queue_items,
+    full_vacuum,
     get_all_queue_items,
+    get_dead_letters,
+    purge_dead_letters,
+    reconcile_stats_counters,
+    replay_dead_letters,
+    run_retention,
 )
+from database.operations.queue import get_queue_statistics
 
 
 async def list_queue(args) -> None:
@@ -59,6 +69,111 @@ async def delete_queue(args) -> None:
             sys.exit(1)
 
 
+async def queue_stats(args) -> None:
+    """Show queue counts by status (optionally recomputing the counters first)."""
+    if args.reconcile:
+        await reconcile_stats_counters()
+    stats = await get_queue_statistics()
+    if args.json:
+        print_json([stats])
+        return
+    for status, count in stats.items():
+        print(f"{status}: {count}")
+
+
+def load_retention_config(args) -> RetentionConfig:
+    """Retention settings from settings.json, overridden by command-line flags."""
+    try:
+        config = get_typed_settings().retention or RetentionConfig()
+    except (FileNotFoundError, ValueError):
+        config = RetentionConfig()
+    if isinstance(config, dict):
+        config = RetentionConfig(**config)
+
+    overrides = {
+        "queue_retention_hours": args.queue_hours,
+        "message_retention_days": args.message_days,
+        "batch_size": args.batch_size,
+        "archive_path": args.archive_path,
+    }
+    overrides = {key: value for key, value in overrides.items() if value is not None}
+    return RetentionConfig(**{**config.model_dump(), **overrides})
+
+
+async def archive_queue(args) -> None:
+    """Run the retention job once: archive old queue rows and messages."""
+    config = load_retention_config(args)
+    result = await run_retention(config)
+    if args.vacuum:
+        await full_vacuum()
+
+    if args.json:
+        print_json([{**vars(result), "full_vacuum": bool(args.vacuum)}])
+        return
+    print(f"Archived {result.queue_archived} queue items")
+    print(f"Archived {result.messages_archived} messages")
+    print(f"Purged {result.outbox_purged} delivered outbox rows")
+    if result.vacuumed_pages:
+        print(f"Released {result.vacuumed_pages} free pages")
+    if args.vacuum:
+        print("Database vacuumed (incremental auto-vacuum enabled)")
+
+
+def dead_letter_filters(args) -> dict[str, Any]:
+    """Dead-letter filter keyword arguments from command-line flags."""
+    older_than_ms = None
+    if args.older_than_hours is not None:
+        older_than_ms = int(args.older_than_hours * 3600 * 1000)
+    return {
+        "ids": args.id or None,
+        "failure_class": args.failure_class,
+        "letta_user_id": args.user,
+        "older_than_ms": older_than_ms,
+    }
+
+
+async def list_dead_letters(args) -> None:
+    """List dead-lettered queue items."""
+    items = await get_dead_letters(**dead_letter_filters(args), limit=args.limit)
+    if args.json:
+        print_json([asdict(item) for item in items])
+    else:
+        print_dead_letters(items)
+
+
+async def _dead_letter_batches(operation, args) -> int:
+    """Run a replay/purge operation in batches until no matching rows remain."""
+    filters = dead_letter_filters(args)
+    if not args.all and not any(value is not None for value in filters.values()):
+        print("Pass a filter (--id/--class/--user/--older-than-hours) or --all")
+        sys.exit(1)
+
+    total = 0
+    while True:
+        done = await operation(**filters, limit=args.batch_size)
+        total += done
+        if done < args.batch_size:
+            return total
+
+
+async def replay_dead_letter_items(args) -> None:
+    """Put matching dead letters back into the queue."""
+    replayed = await _dead_letter_batches(replay_dead_letters, args)
+    if args.json:
+        print_json([{"replayed": replayed}])
+    else:
+        print(f"Replayed {replayed} dead-lettered items")
+
+
+async def purge_dead_letter_items(args) -> None:
+    """Delete matching dead letters."""
+    purged = await _dead_letter_batches(purge_dead_letters, args)
+    if args.json:
+        print_json([{"purged": purged}])
+    else:
+        print(f"Purged {purged} dead-lettered items")
+
+
 def print_json(data: list[dict[str, Any]]) -> None:
     """Print data in JSON format."""
     import json
@@ -84,6 +199,36 @@ def print_queue_items(items: list[dict[str, Any]]) -> None:
         print("-" * 80)
 
 
+def print_dead_letters(items: list[DeadLetterItem]) -> None:
+    """Print dead letters in a human-readable format."""
+    if not items:
+        print("No dead-lettered items")
+        return
+
+    print("\nDead Letters:")
+    print("-" * 80)
+    for item in items:
+        print(f"ID: {item.id} (queue item {item.queue_id})")
+        print(f"User: {item.letta_user_id}  Message: {item.message_id}")
+        print(f"Failure: {item.failure_class} after {item.attempts} attempts")
+        print(f"Last error: {item.last_error}")
+        print("-" * 80)
+
+
+def add_dead_letter_filters(parser: argparse.ArgumentParser) -> None:
+    """Filters shared by the dead-letter commands."""
+    parser.add_argument(
+        "--id", type=int, action="append", help="Dead-letter ID (repeatable)"
+    )
+    parser.add_argument(
+        "--class", dest="failure_class", help="Failure class, e.g. no_response"
+    )
+    parser.add_argument("--user", type=int, help="Letta user ID")
+    parser.add_argument(
+        "--older-than-hours", type=float, help="Dead-lettered at least N hours ago"
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Broca2 Queue Management Tool")
     parser.add_argument("--json", action="store_true", help="Output in JSON format")
@@ -104,6 +249,55 @@ def main():
     delete_group.add_argument("--all", action="store_true", help="Delete all items")
     delete_group.add_argument("--id", type=int, help="Delete specific item by ID")
 
+    # Stats command
+    stats_parser = subparsers.add_parser("stats", help="Show queue counts by status")
+    stats_parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Recompute the stats counters from the tables first",
+    )
+
+    # Archive command
+    archive_parser = subparsers.add_parser(
+        "archive", help="Archive completed/flushed queue items and old messages"
+    )
+    archive_parser.add_argument(
+        "--queue-hours", type=float, help="Archive queue items older than N hours"
+    )
+    archive_parser.add_argument(
+        "--message-days", type=float, help="Archive messages older than N days"
+    )
+    archive_parser.add_argument("--batch-size", type=int, help="Rows per transaction")
+    archive_parser.add_argument(
+        "--archive-path", help="Archive into this SQLite file instead of the main DB"
+    )
+    archive_parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Run a full VACUUM afterwards (rewrites the database file)",
+    )
+
+    # Dead-letter commands
+    dead_letters_parser = subparsers.add_parser(
+        "dead-letters", help="List items that exhausted their attempts"
+    )
+    add_dead_letter_filters(dead_letters_parser)
+    dead_letters_parser.add_argument(
+        "--limit", type=int, default=100, help="Maximum rows to show"
+    )
+    for name, help_text in (
+        ("replay", "Re-enqueue dead-lettered items"),
+        ("purge", "Delete dead-lettered items"),
+    ):
+        dead_letter_parser = subparsers.add_parser(name, help=help_text)
+        add_dead_letter_filters(dead_letter_parser)
+        dead_letter_parser.add_argument(
+            "--all", action="store_true", help="Every dead-lettered item"
+        )
+        dead_letter_parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows per transaction"
+        )
+
     args = parser.parse_args()
 
     if args.command == "list":
@@ -112,6 +306,16 @@ def main():
         asyncio.run(flush_queue(args))
     elif args.command == "delete":
         asyncio.run(delete_queue(args))
+    elif args.command == "stats":
+        asyncio.run(queue_stats(args))
+    elif args.command == "archive":
+        asyncio.run(archive_queue(args))
+    elif args.command == "dead-letters":
+        asyncio.run(list_dead_letters(args))
+    elif args.command == "replay":
+        asyncio.run(replay_dead_letter_items(args))
+    elif args.command == "purge":
+        asyncio.run(purge_dead_letter_items(args))
     else:
         parser.print_help()
 
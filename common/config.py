@@ -42,6 +42,92 @@ class QueueProcessorConfig(BaseSettings):
         le=50,
         description="Maximum concurrent messages to process (1-50)",
     )
+    idle_poll_interval: float = Field(
+        default=5.0,
+        ge=0.1,
+        le=60.0,
+        description=(
+            "Fallback poll interval in seconds when the queue is idle (0.1-60); "
+            "in-process enqueues wake the processor immediately"
+        ),
+    )
+    block_idle_timeout: float = Field(
+        default=30.0,
+        ge=0.0,
+        le=3600.0,
+        description=(
+            "Seconds a user's core block stays attached after their turn so "
+            "follow-up messages skip attach/detach (0 detaches after every turn)"
+        ),
+    )
+    block_reconcile_interval: float = Field(
+        default=600.0,
+        ge=0.0,
+        le=86400.0,
+        description=(
+            "Seconds between checks of the agent's attached blocks and the "
+            "users' core blocks against Letta (0 checks only at startup)"
+        ),
+    )
+    lease_seconds: float = Field(
+        default=60.0,
+        ge=5.0,
+        le=3600.0,
+        description=(
+            "Seconds a claimed queue item stays leased without a heartbeat "
+            "before any consumer may reclaim it (5-3600)"
+        ),
+    )
+    heartbeat_interval: float = Field(
+        default=15.0,
+        ge=1.0,
+        le=600.0,
+        description=(
+            "Seconds between lease renewals for in-flight turns and sweeps for "
+            "expired leases (1-600; capped at half of lease_seconds)"
+        ),
+    )
+    scheduling_policy: Literal["fifo", "round_robin", "weighted"] = Field(
+        default="round_robin",
+        description=(
+            "Order in which users' next messages are claimed: fifo (oldest "
+            "first), round_robin (least recently served user first) or weighted "
+            "(fair share by user_weights); each user's own messages stay FIFO"
+        ),
+    )
+    user_weights: dict[int, float] = Field(
+        default_factory=dict,
+        description="letta_user_id -> fair-share weight for the weighted policy",
+    )
+    user_priorities: dict[int, int] = Field(
+        default_factory=dict,
+        description=(
+            "letta_user_id -> priority added to the user's queue rows; higher "
+            "priorities are claimed first under every policy (e.g. the owner)"
+        ),
+    )
+    max_attempts: int = Field(
+        default=5,
+        ge=1,
+        le=100,
+        description=(
+            "Failed turns before a queue item is moved to the dead-letter table "
+            "(1-100); timed-out turns are marked failed and never retried"
+        ),
+    )
+    coalesce_messages: bool = Field(
+        default=False,
+        description=(
+            "Merge a user's pending messages into one agent turn when their "
+            "next message is claimed; every merged row gets the same response"
+        ),
+    )
+    coalesce_max_messages: int = Field(
+        default=10,
+        ge=1,
+        le=100,
+        description="Most queued messages merged into one coalesced turn (1-100)",
+    )
 
 
 class DatabasePoolConfig(BaseSettings):
@@ -56,6 +142,226 @@ class DatabasePoolConfig(BaseSettings):
         le=50,
         description="Maximum overflow connections beyond pool_size (0-50)",
     )
+    auto_vacuum: Literal["NONE", "FULL", "INCREMENTAL"] = Field(
+        default="INCREMENTAL",
+        description=(
+            "SQLite auto_vacuum mode; only applies when the database file is "
+            "created (INCREMENTAL lets retention release freed pages)"
+        ),
+    )
+    journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = Field(
+        default="WAL",
+        description="SQLite journal mode; WAL lets readers run alongside the writer",
+    )
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = Field(
+        default="NORMAL",
+        description="SQLite synchronous level (NORMAL is durable enough under WAL)",
+    )
+    busy_timeout_ms: int = Field(
+        default=5000,
+        ge=0,
+        le=60000,
+        description="Milliseconds SQLite waits on a locked database (0-60000)",
+    )
+    mmap_size: int = Field(
+        default=268435456,
+        ge=0,
+        description="Bytes of the database file to memory-map (0 disables)",
+    )
+    cache_size: int = Field(
+        default=-16000,
+        description=(
+            "SQLite page cache per connection; negative values are KiB, "
+            "positive values are pages"
+        ),
+    )
+    write_coalesce_ms: float = Field(
+        default=2.0,
+        ge=0,
+        le=100,
+        description=(
+            "Milliseconds small writes wait to share a commit (0 commits each "
+            "batch as soon as the writer is free)"
+        ),
+    )
+    write_coalesce_max_batch: int = Field(
+        default=100,
+        ge=1,
+        le=10000,
+        description="Buffered writes that trigger an immediate group commit",
+    )
+    profile_cache_size: int = Field(
+        default=1024,
+        ge=0,
+        le=1_000_000,
+        description=(
+            "Platform profiles cached for the message ingest path (LRU; 0 "
+            "disables the cache)"
+        ),
+    )
+    profile_flush_interval: float = Field(
+        default=30.0,
+        ge=0,
+        le=3600,
+        description=(
+            "Seconds between batched writes of profile last_active bumps (0 "
+            "writes them on every message)"
+        ),
+    )
+
+    def pragmas(self) -> dict[str, str | int]:
+        """Return the PRAGMA settings applied to every pooled connection."""
+        return {
+            # auto_vacuum before journal_mode: switching to WAL writes the header
+            "auto_vacuum": self.auto_vacuum,
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "busy_timeout": self.busy_timeout_ms,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+        }
+
+
+class RetentionConfig(BaseSettings):
+    """Configuration for queue/message retention and archival."""
+
+    enabled: bool = Field(
+        default=False,
+        description=(
+            "Run the background retention job (opt-in: it moves old messages "
+            "out of the messages table)"
+        ),
+    )
+    interval_seconds: float = Field(
+        default=3600.0,
+        ge=60.0,
+        le=86400.0,
+        description="Seconds between background retention runs (60-86400)",
+    )
+    queue_retention_hours: float = Field(
+        default=24.0,
+        ge=0.0,
+        description="Archive completed/flushed queue rows older than this many hours",
+    )
+    message_retention_days: float = Field(
+        default=30.0,
+        ge=0.0,
+        description=(
+            "Archive messages older than this many days once no queue row "
+            "references them"
+        ),
+    )
+    batch_size: int = Field(
+        default=500,
+        ge=1,
+        le=10000,
+        description="Rows moved per write transaction (1-10000)",
+    )
+    archive_path: str | None = Field(
+        default=None,
+        description=(
+            "Separate SQLite file for archived rows; unset keeps the archive "
+            "tables in the main database"
+        ),
+    )
+    vacuum_pages: int = Field(
+        default=2000,
+        ge=0,
+        description=(
+            "Free pages returned to the OS per run with incremental vacuum "
+            "(0 disables)"
+        ),
+    )
+
+
+class ProvisioningConfig(BaseSettings):
+    """Configuration for the warm pool of pre-created Letta identities/blocks."""
+
+    pool_size: int = Field(
+        default=0,
+        ge=0,
+        le=10000,
+        description=(
+            "Unassigned identity and core block pairs kept ready for new users "
+            "(0 disables the pool)"
+        ),
+    )
+    refill_interval: float = Field(
+        default=10.0,
+        ge=1.0,
+        le=3600.0,
+        description="Seconds between pool refills (1-3600)",
+    )
+    refill_batch: int = Field(
+        default=10,
+        ge=1,
+        le=500,
+        description="Most pairs created per refill, bounding the Letta call rate",
+    )
+
+
+class DeliveryConfig(BaseSettings):
+    """Configuration for outbound response delivery (the outbox workers)."""
+
+    enabled: bool = Field(
+        default=False,
+        description=(
+            "Deliver responses through the outbox and per-platform workers "
+            "(opt-in); false sends them inline at the end of each agent turn"
+        ),
+    )
+    workers_per_platform: int = Field(
+        default=2,
+        ge=1,
+        le=50,
+        description="Concurrent delivery workers per platform (1-50)",
+    )
+    max_attempts: int = Field(
+        default=5,
+        ge=1,
+        le=100,
+        description="Failed sends before a response is marked failed (1-100)",
+    )
+    base_delay: float = Field(
+        default=2.0,
+        ge=0.0,
+        le=600.0,
+        description="Seconds before the first resend; doubles per attempt",
+    )
+    max_delay: float = Field(
+        default=300.0,
+        ge=0.0,
+        le=3600.0,
+        description="Longest delay between resends in seconds",
+    )
+    lease_seconds: float = Field(
+        default=300.0,
+        ge=5.0,
+        le=3600.0,
+        description=(
+            "Seconds a claimed response stays leased before another worker may "
+            "reclaim it (a crashed worker's sends are retried after this)"
+        ),
+    )
+    send_timeout: float = Field(
+        default=240.0,
+        ge=1.0,
+        le=3600.0,
+        description=(
+            "Seconds a platform send may take before it counts as failed "
+            "(capped at 80% of lease_seconds, so a timed-out send is recorded "
+            "before its lease can be reclaimed and the response sent again)"
+        ),
+    )
+    idle_poll_interval: float = Field(
+        default=5.0,
+        ge=0.1,
+        le=60.0,
+        description=(
+            "Fallback poll interval in seconds when the outbox is idle; "
+            "in-process enqueues wake the workers immediately"
+        ),
+    )
 
 
 class Settings(BaseSettings):
@@ -89,6 +395,18 @@ class Settings(BaseSettings):
         default_factory=dict,
         description="Database connection pool configuration",
     )
+    retention: RetentionConfig | dict | None = Field(
+        default_factory=dict,
+        description="Queue and message retention/archival configuration",
+    )
+    delivery: DeliveryConfig | dict | None = Field(
+        default_factory=dict,
+        description="Outbound response delivery (outbox workers) configuration",
+    )
+    provisioning: ProvisioningConfig | dict | None = Field(
+        default_factory=dict,
+        description="New-user provisioning (warm identity/block pool) configuration",
+    )
 
     @field_validator("queue_refresh")
     @classmethod
@@ -126,6 +444,30 @@ class Settings(BaseSettings):
             return DatabasePoolConfig(**v)
         return v
 
+    @field_validator("retention", mode="before")
+    @classmethod
+    def validate_retention(cls, v):
+        """Convert dict to RetentionConfig if needed."""
+        if isinstance(v, dict):
+            return RetentionConfig(**v)
+        return v
+
+    @field_validator("delivery", mode="before")
+    @classmethod
+    def validate_delivery(cls, v):
+        """Convert dict to DeliveryConfig if needed."""
+        if isinstance(v, dict):
+            return DeliveryConfig(**v)
+        return v
+
+    @field_validator("provisioning", mode="before")
+    @classmethod
+    def validate_provisioning(cls, v):
+        """Convert dict to ProvisioningConfig if needed."""
+        if isinstance(v, dict):
+            return ProvisioningConfig(**v)
+        return v
+
     model_config = SettingsConfigDict(
         env_prefix="BROCA_",
         case_sensitive=False,
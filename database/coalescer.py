@@ -0,0 +1,145 @@
+"""Group commit for small writes on the pool's writer connection."""
+
+import asyncio
+import logging
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    """Buffer small writes for a few milliseconds and commit them together.
+
+    Statements run on the writer connection in submission order, one batch per
+    transaction, so a burst of status updates costs one commit instead of one
+    each. Every statement runs in its own SAVEPOINT: a failing statement only
+    fails its own caller and the rest of the batch still commits.
+
+    Because batches commit in order, awaiting a write (or flush()) is a
+    durability barrier for everything submitted before it. Do not await a
+    durable write while holding write_connection() - it would wait on itself.
+    """
+
+    def __init__(
+        self, pool: "ConnectionPool", window_ms: float = 2.0, max_batch: int = 100
+    ):
+        """Initialize the coalescer.
+
+        Args:
+            pool: Pool whose writer connection commits the batches
+            window_ms: How long the first write of a batch waits for company
+            max_batch: Commit immediately once this many writes are buffered
+        """
+        self.pool = pool
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: list[tuple[str, tuple, asyncio.Future]] = []
+        self._timer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.commits = 0
+        self.statements = 0
+
+    def submit(self, sql: str, params: Sequence[Any] = ()) -> asyncio.Future:
+        """Buffer a write and return a future for its row count after commit."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((sql, tuple(params), future))
+        if len(self._pending) >= self.max_batch or self.window <= 0:
+            self._spawn(self._commit_pending())
+        elif self._timer is None:
+            self._timer = self._spawn(self._commit_after_window())
+        return future
+
+    async def execute(
+        self, sql: str, params: Sequence[Any] = (), durable: bool = True
+    ) -> int | None:
+        """Buffer a write, waiting for its commit unless durable is False.
+
+        Non-durable writes return immediately; they are committed no later
+        than the next durable write or flush(), possibly in an earlier batch
+        (once max_batch writes are buffered), and failures are only logged.
+        Writes that must commit together need one write_connection()
+        transaction instead.
+
+        Returns:
+            Rows changed by the statement (None for non-durable writes)
+        """
+        future = self.submit(sql, params)
+        if durable:
+            return await future
+        future.add_done_callback(_log_failure)
+        return None
+
+    async def flush(self) -> None:
+        """Commit everything submitted so far (an explicit durability barrier)."""
+        await self._commit_pending()
+
+    async def close(self) -> None:
+        """Commit outstanding writes and stop the window timer."""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run coro as a task tracked until it finishes (awaited by close())."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _commit_after_window(self) -> None:
+        """Commit the pending batch once the coalescing window has passed."""
+        await asyncio.sleep(self.window)
+        self._timer = None
+        if self._pending:
+            await self._commit_pending()
+
+    async def _commit_pending(self) -> None:
+        """Run and commit the current batch on the writer connection.
+
+        The batch is taken before waiting for the writer lock, which hands out
+        the connection in FIFO order, so batches commit in submission order.
+        Called with nothing pending it still waits for in-flight batches.
+        """
+        batch, self._pending = self._pending, []
+        async with self.pool.write_connection() as db:
+            if not batch:
+                return
+            results: list[int | BaseException] = []
+            try:
+                if not db.in_transaction:
+                    await db.execute("BEGIN")
+                for sql, params, _ in batch:
+                    await db.execute("SAVEPOINT coalesced_write")
+                    try:
+                        cursor = await db.execute(sql, params)
+                        results.append(cursor.rowcount)
+                    except Exception as e:
+                        await db.execute("ROLLBACK TO coalesced_write")
+                        results.append(e)
+                    await db.execute("RELEASE coalesced_write")
+                await db.commit()
+            except Exception as e:
+                logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+                results = [e] * len(batch)
+            else:
+                self.commits += 1
+                self.statements += len(batch)
+
+        for (_, _, future), result in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    """Done callback for non-durable writes: nobody awaits them, so log errors."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Coalesced write failed: {future.exception()}")
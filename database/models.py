@@ -18,6 +18,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from dataclasses import dataclass
+from typing import Any
 
 
 @dataclass
@@ -32,6 +33,8 @@ class LettaUser:
     agent_preferences: str | None = None  # JSON string
     custom_instructions: str | None = None
     is_active: bool = True
+    # 'pending' until the identity and core block exist (see provisioning.py)
+    provision_status: str = "ready"
 
 
 @dataclass
@@ -75,6 +78,33 @@ class QueueItem:
     timestamp: str | None = None
 
 
+@dataclass
+class DeadLetterItem:
+    """A queue item that ran out of attempts, with why it failed."""
+
+    id: int
+    queue_id: int
+    letta_user_id: int | None
+    message_id: int | None
+    failure_class: str
+    last_error: str | None
+    attempts: int
+    attempt_history: list[dict[str, Any]]
+    dead_at: int  # epoch ms
+
+
+@dataclass
+class OutboxItem:
+    """A completed turn's response waiting to be delivered to its platform."""
+
+    id: int
+    letta_user_id: int | None
+    message_id: int  # the message the response replies to
+    platform: str
+    response: str
+    attempts: int = 0
+
+
 @dataclass
 class QueueItemDisplay:
     """Queue item model with additional display information for the UI."""
@@ -90,6 +120,23 @@ class QueueItemDisplay:
     first_name: str
 
 
+@dataclass
+class QueueItemContext:
+    """Everything the queue processor needs for one item, fetched in one JOIN.
+
+    message is None when the message row is missing; profile is None when the
+    message's platform profile is missing (orphaned queue item).
+    """
+
+    queue_id: int
+    letta_user_id: int
+    message_id: int
+    message: str | None
+    profile: PlatformProfile | None
+    letta_block_id: str | None = None
+    letta_identity_id: str | None = None
+
+
 # Database schema definitions
 SCHEMA = {
     # Table definitions for all core entities in the application database.
@@ -102,7 +149,8 @@ SCHEMA = {
             letta_block_id TEXT,
             agent_preferences TEXT,
             custom_instructions TEXT,
-            is_active INTEGER DEFAULT 1
+            is_active INTEGER DEFAULT 1,
+            provision_status TEXT NOT NULL DEFAULT 'ready'
         )
     """,
     "platform_profiles": """
@@ -146,4 +194,370 @@ SCHEMA = {
             FOREIGN KEY (message_id) REFERENCES messages(id)
         )
     """,
+    # Row counts maintained by triggers (see STATS_COUNTER_TRIGGERS below):
+    # 'letta_users', 'messages' and 'queue:<status>'.
+    "stats_counters": """
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    # Per-user scheduler state for fair-share dequeue (see atomic_dequeue_batch)
+    "queue_fair_share": """
+        CREATE TABLE IF NOT EXISTS queue_fair_share (
+            letta_user_id INTEGER PRIMARY KEY,
+            last_served_at INTEGER,
+            virtual_time REAL NOT NULL DEFAULT 0,
+            served INTEGER NOT NULL DEFAULT 0,
+            backlogged_since INTEGER
+        )
+    """,
+    # Queue items that exhausted queue_processor.max_attempts, moved out of
+    # queue by requeue_failed_item; replayed or purged with qtool
+    "queue_dead_letter": """
+        CREATE TABLE IF NOT EXISTS queue_dead_letter (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            queue_id INTEGER NOT NULL,
+            letta_user_id INTEGER,
+            message_id INTEGER,
+            priority INTEGER NOT NULL DEFAULT 0,
+            failure_class TEXT NOT NULL,
+            last_error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            attempt_history TEXT,
+            enqueued_at INTEGER,
+            dead_at INTEGER NOT NULL
+        )
+    """,
+    # Warm pool of Letta identity/core block pairs created ahead of new users
+    # (see provisioning.py); a row missing either ID is completed on refill
+    "letta_resource_pool": """
+        CREATE TABLE IF NOT EXISTS letta_resource_pool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            letta_identity_id TEXT,
+            letta_block_id TEXT,
+            created_at INTEGER NOT NULL
+        )
+    """,
+    # Responses of completed turns, delivered to the platform by the outbox
+    # workers (runtime/core/delivery.py) independently of agent turns
+    "outbox": """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            letta_user_id INTEGER,
+            message_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            response TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            not_before INTEGER,
+            last_error TEXT,
+            lease_owner TEXT,
+            lease_expires_at INTEGER,
+            created_at INTEGER NOT NULL,
+            delivered_at INTEGER,
+            FOREIGN KEY (message_id) REFERENCES messages(id)
+        )
+    """,
+    # Applied schema migrations (see MIGRATIONS below).
+    "schema_version": """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
 }
+
+
+def _counter_upsert(name_sql: str, delta: int) -> str:
+    """Trigger statement adding delta to the counter named by name_sql."""
+    return f"""
+        INSERT INTO stats_counters (name, value) VALUES ({name_sql}, {delta})
+        ON CONFLICT(name) DO UPDATE SET value = value + {delta};
+    """
+
+
+# Triggers keeping stats_counters in step with every insert, delete and
+# queue status change, whichever code path (or CLI tool) makes it.
+STATS_COUNTER_TRIGGERS: list[str] = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_letta_users_insert
+    AFTER INSERT ON letta_users BEGIN {_counter_upsert("'letta_users'", 1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_letta_users_delete
+    AFTER DELETE ON letta_users BEGIN {_counter_upsert("'letta_users'", -1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_messages_insert
+    AFTER INSERT ON messages BEGIN {_counter_upsert("'messages'", 1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_messages_delete
+    AFTER DELETE ON messages BEGIN {_counter_upsert("'messages'", -1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_queue_insert
+    AFTER INSERT ON queue BEGIN
+        {_counter_upsert("'queue:' || COALESCE(NEW.status, '')", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_queue_delete
+    AFTER DELETE ON queue BEGIN
+        {_counter_upsert("'queue:' || COALESCE(OLD.status, '')", -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_queue_status
+    AFTER UPDATE OF status ON queue WHEN OLD.status IS NOT NEW.status BEGIN
+        {_counter_upsert("'queue:' || COALESCE(OLD.status, '')", -1)}
+        {_counter_upsert("'queue:' || COALESCE(NEW.status, '')", 1)}
+    END
+    """,
+]
+
+# Recompute stats_counters from the tables (initial fill and drift repair)
+STATS_COUNTER_RECONCILE: list[str] = [
+    "DELETE FROM stats_counters",
+    """
+    INSERT INTO stats_counters (name, value)
+    SELECT 'letta_users', COUNT(*) FROM letta_users
+    """,
+    """
+    INSERT INTO stats_counters (name, value)
+    SELECT 'messages', COUNT(*) FROM messages
+    """,
+    """
+    INSERT INTO stats_counters (name, value)
+    SELECT 'queue:' || COALESCE(status, ''), COUNT(*) FROM queue GROUP BY status
+    """,
+]
+
+
+def _text_to_epoch_ms(column_sql: str) -> str:
+    """SQL converting a TEXT timestamp to epoch milliseconds (now if unparseable).
+
+    Handles the isoformat strings the queue writes and the "%Y-%m-%d %H:%M UTC"
+    strings the Telegram plugin passes to insert_message.
+    """
+    return f"""CAST(ROUND((COALESCE(
+        julianday({column_sql}),
+        julianday(substr({column_sql}, 1, 16)),
+        julianday('now')
+    ) - 2440587.5) * 86400000) AS INTEGER)"""
+
+
+# Integer epoch-millisecond columns replacing TEXT timestamp comparisons:
+# queue.enqueued_at (set once), queue.claimed_at (set on dequeue, cleared on
+# requeue) and messages.received_at. Rows inserted without them (CLI tools,
+# older code) are filled from their TEXT timestamp by trigger.
+EPOCH_MS_COLUMNS: list[str] = [
+    "ALTER TABLE queue ADD COLUMN enqueued_at INTEGER",
+    "ALTER TABLE queue ADD COLUMN claimed_at INTEGER",
+    "ALTER TABLE messages ADD COLUMN received_at INTEGER",
+    f"""
+    UPDATE queue SET enqueued_at = {_text_to_epoch_ms('timestamp')}
+    WHERE enqueued_at IS NULL
+    """,
+    f"""
+    UPDATE queue SET claimed_at = {_text_to_epoch_ms('timestamp')}
+    WHERE status = 'processing' AND claimed_at IS NULL
+    """,
+    f"""
+    UPDATE messages SET received_at = {_text_to_epoch_ms('timestamp')}
+    WHERE received_at IS NULL
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_queue_enqueued_at_default
+    AFTER INSERT ON queue WHEN NEW.enqueued_at IS NULL BEGIN
+        UPDATE queue SET enqueued_at = {_text_to_epoch_ms('NEW.timestamp')}
+        WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_messages_received_at_default
+    AFTER INSERT ON messages WHEN NEW.received_at IS NULL BEGIN
+        UPDATE messages SET received_at = {_text_to_epoch_ms('NEW.timestamp')}
+        WHERE id = NEW.id;
+    END
+    """,
+    # Dequeue order and retention (status = ? ORDER BY / < enqueued_at)
+    """
+    CREATE INDEX IF NOT EXISTS idx_queue_status_enqueued_at
+    ON queue (status, enqueued_at, id)
+    """,
+    # Per-user lane lookups in atomic_dequeue_batch
+    """
+    CREATE INDEX IF NOT EXISTS idx_queue_user_status_enqueued_at
+    ON queue (letta_user_id, status, enqueued_at, id)
+    """,
+    # requeue_stale_processing_items: status = 'processing' AND claimed_at < ?
+    """
+    CREATE INDEX IF NOT EXISTS idx_queue_status_claimed_at
+    ON queue (status, claimed_at)
+    """,
+    # get_messages / get_message_history ordering and message retention
+    """
+    CREATE INDEX IF NOT EXISTS idx_messages_user_profile_received_at
+    ON messages (letta_user_id, platform_profile_id, received_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_messages_processed_received_at
+    ON messages (processed, received_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_messages_received_at
+    ON messages (received_at)
+    """,
+    # Superseded by the epoch-ms indexes above
+    "DROP INDEX IF EXISTS idx_queue_status_timestamp",
+    "DROP INDEX IF EXISTS idx_queue_user_status_timestamp",
+    "DROP INDEX IF EXISTS idx_messages_user_profile_timestamp",
+    "DROP INDEX IF EXISTS idx_messages_processed_timestamp",
+]
+
+
+# Versioned schema migrations, applied in order on top of SCHEMA by
+# database.operations.shared.apply_migrations(). Each entry is
+# (version, description, statements). Never edit a released entry; append a
+# new version instead. ALTER TABLE ... ADD COLUMN statements are skipped when
+# the column already exists.
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (
+        1,
+        "Indexes for dequeue, stale requeue, message lookups and profile joins",
+        [
+            # atomic_dequeue_* (status = 'pending' ORDER BY timestamp) and
+            # requeue_stale_processing_items (status = 'processing')
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_status_timestamp
+            ON queue (status, timestamp)
+            """,
+            # Per-user lane lookups in atomic_dequeue_batch
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_user_status_timestamp
+            ON queue (letta_user_id, status, timestamp)
+            """,
+            # NOT EXISTS (... q.message_id = m.id) in get_message_history
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_message_id
+            ON queue (message_id, status)
+            """,
+            # get_messages(letta_user_id, platform_profile_id) ORDER BY timestamp
+            """
+            CREATE INDEX IF NOT EXISTS idx_messages_user_profile_timestamp
+            ON messages (letta_user_id, platform_profile_id, timestamp)
+            """,
+            # get_message_history: processed = 1 ORDER BY timestamp DESC
+            """
+            CREATE INDEX IF NOT EXISTS idx_messages_processed_timestamp
+            ON messages (processed, timestamp)
+            """,
+            # get_user_details / get_platform_profile_id by letta_user_id
+            """
+            CREATE INDEX IF NOT EXISTS idx_platform_profiles_letta_user_id
+            ON platform_profiles (letta_user_id)
+            """,
+        ],
+    ),
+    (
+        2,
+        "Trigger-maintained stats_counters for queue and dashboard statistics",
+        STATS_COUNTER_TRIGGERS + STATS_COUNTER_RECONCILE,
+    ),
+    (
+        3,
+        "Integer epoch-ms enqueued_at/claimed_at/received_at columns and indexes",
+        EPOCH_MS_COLUMNS,
+    ),
+    (
+        4,
+        "Queue claim leases (lease_owner, lease_expires_at)",
+        [
+            "ALTER TABLE queue ADD COLUMN lease_owner TEXT",
+            "ALTER TABLE queue ADD COLUMN lease_expires_at INTEGER",
+            # reclaim_expired_leases: status = 'processing' AND lease_expires_at < ?
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_status_lease_expires_at
+            ON queue (status, lease_expires_at)
+            """,
+        ],
+    ),
+    (
+        5,
+        "Per-item queue priority",
+        ["ALTER TABLE queue ADD COLUMN priority INTEGER NOT NULL DEFAULT 0"],
+    ),
+    (
+        6,
+        "Retry backoff: queue.not_before",
+        [
+            # Epoch ms before which a requeued item may not be claimed
+            "ALTER TABLE queue ADD COLUMN not_before INTEGER",
+            # next_retry_delay: status = 'pending' AND not_before > ?
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_status_not_before
+            ON queue (status, not_before)
+            """,
+        ],
+    ),
+    (
+        7,
+        "Failure history on queue rows and dead-letter indexes",
+        [
+            "ALTER TABLE queue ADD COLUMN last_error TEXT",
+            # JSON list of {attempt, at, class, error}, newest last
+            "ALTER TABLE queue ADD COLUMN attempt_history TEXT",
+            # qtool replay/purge filters
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_dead_letter_failure_class
+            ON queue_dead_letter (failure_class, id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_dead_letter_letta_user_id
+            ON queue_dead_letter (letta_user_id, id)
+            """,
+            # Retention keeps messages a dead letter still points at
+            """
+            CREATE INDEX IF NOT EXISTS idx_queue_dead_letter_message_id
+            ON queue_dead_letter (message_id)
+            """,
+        ],
+    ),
+    (
+        8,
+        "Background user provisioning: letta_users.provision_status",
+        [
+            # 'pending' | 'ready' | 'failed'; existing users are ready
+            "ALTER TABLE letta_users ADD COLUMN provision_status TEXT NOT NULL "
+            "DEFAULT 'ready'",
+        ],
+    ),
+    (
+        9,
+        "Outbox indexes for response delivery",
+        [
+            # claim_outbox: platform = ? AND status = 'pending', oldest first
+            """
+            CREATE INDEX IF NOT EXISTS idx_outbox_platform_status_id
+            ON outbox (platform, status, id)
+            """,
+            # Per-user delivery order and reclaim of expired leases
+            """
+            CREATE INDEX IF NOT EXISTS idx_outbox_user_status
+            ON outbox (letta_user_id, status)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_outbox_status_lease_expires_at
+            ON outbox (status, lease_expires_at)
+            """,
+            # Retention keeps messages an outbox row points at
+            """
+            CREATE INDEX IF NOT EXISTS idx_outbox_message_id
+            ON outbox (message_id)
+            """,
+        ],
+    ),
+]
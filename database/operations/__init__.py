@@ -11,37 +11,115 @@ users.py:
 
 messages.py:
     - Message operations (insert_message, get_message_text)
+    - Bulk ingest with queue rows in one transaction (insert_messages_many)
     - Message updates (update_message_with_response)
+    - A turn's response and queue status in one transaction (save_turn_response)
     - Message history (get_message_history)
 
 queue.py:
-    - Queue management (add_to_queue, get_pending_queue_item)
-    - Queue status (update_queue_status)
+    - Queue management (add_to_queue, add_to_queue_many, get_pending_queue_item)
+    - Queue status (update_queue_status, set_queue_status)
+    - Per-item processing context (get_queue_item_context)
+    - Coalesced turns (claim_user_pending, get_queue_messages, release_queue_items)
+    - Consumer leases (renew_leases, reclaim_expired_leases)
+    - Retry backoff (next_retry_delay)
     - Queue monitoring (get_all_queue_items, flush_all_queue_items)
 
+outbox.py:
+    - Responses awaiting platform delivery (enqueue_outbox, claim_outbox)
+    - Delivery outcome and backoff (complete_outbox, fail_outbox)
+    - Crashed-worker recovery (reclaim_expired_outbox)
+
+provisioning.py:
+    - Background Letta identity/block creation for new users (schedule_provisioning)
+    - Startup resume and shutdown (resume_provisioning, cancel_provisioning)
+    - Warm identity/block pool (refill_resource_pool, get_resource_pool_stats)
+
+dead_letter.py:
+    - Items that exhausted their attempts (get_dead_letters)
+    - Filtered batch replay and purge (replay_dead_letters, purge_dead_letters)
+
+retention.py:
+    - Archival of terminal queue rows and old messages (run_retention)
+    - Cleanup of delivered outbox rows (purge_delivered_outbox)
+    - Space reclamation (incremental_vacuum, full_vacuum)
+
+stats.py:
+    - Trigger-maintained row counters (get_stats_counters)
+    - Drift repair (reconcile_stats_counters)
+
 shared.py:
     - Database initialization (initialize_database, check_and_migrate_db)
+    - Versioned migrations (apply_migrations, get_schema_version)
     - Utility functions (get_dashboard_stats)
 
 All functions are re-exported here for convenience, but can also be imported
 directly from their respective submodules for better code organization.
 """
 
+from .dead_letter import (
+    get_dead_letters,
+    purge_dead_letters,
+    replay_dead_letters,
+)
 from .messages import (
     get_message_history,
     get_message_text,
     insert_message,
+    insert_messages_many,
+    save_turn_response,
     update_message_with_response,
 )
+from .outbox import (
+    claim_outbox,
+    complete_outbox,
+    enqueue_outbox,
+    fail_outbox,
+    next_outbox_delay,
+    reclaim_expired_outbox,
+)
+from .provisioning import (
+    ResourcePoolStats,
+    cancel_provisioning,
+    get_resource_pool_stats,
+    refill_resource_pool,
+    resume_provisioning,
+    schedule_provisioning,
+)
 from .queue import (
     add_to_queue,
+    add_to_queue_many,
+    claim_user_pending,
     delete_queue_item,
     flush_all_queue_items,
     get_all_queue_items,
     get_pending_queue_item,
+    get_queue_item_context,
+    get_queue_messages,
+    next_retry_delay,
+    reclaim_expired_leases,
+    release_queue_items,
+    renew_leases,
+    set_queue_status,
     update_queue_status,
 )
-from .shared import check_and_migrate_db, get_dashboard_stats, initialize_database
+from .retention import (
+    RetentionResult,
+    archive_messages,
+    archive_queue_items,
+    full_vacuum,
+    incremental_vacuum,
+    purge_delivered_outbox,
+    run_retention,
+)
+from .shared import (
+    apply_migrations,
+    check_and_migrate_db,
+    get_dashboard_stats,
+    get_schema_version,
+    initialize_database,
+)
+from .stats import get_stats_counters, reconcile_stats_counters
 from .users import (
     get_all_users,
     get_letta_user_block_id,
@@ -66,18 +144,60 @@ __all__ = [
     "upsert_user",
     # Messages
     "insert_message",
+    "insert_messages_many",
     "get_message_text",
     "update_message_with_response",
+    "save_turn_response",
     "get_message_history",
     # Queue
     "add_to_queue",
+    "add_to_queue_many",
     "get_pending_queue_item",
+    "get_queue_item_context",
+    "claim_user_pending",
+    "get_queue_messages",
+    "release_queue_items",
+    "next_retry_delay",
+    "renew_leases",
+    "reclaim_expired_leases",
     "update_queue_status",
+    "set_queue_status",
     "get_all_queue_items",
     "flush_all_queue_items",
     "delete_queue_item",
+    # Outbox
+    "enqueue_outbox",
+    "claim_outbox",
+    "complete_outbox",
+    "fail_outbox",
+    "reclaim_expired_outbox",
+    "next_outbox_delay",
+    # Provisioning
+    "schedule_provisioning",
+    "resume_provisioning",
+    "cancel_provisioning",
+    "ResourcePoolStats",
+    "refill_resource_pool",
+    "get_resource_pool_stats",
+    # Dead letters
+    "get_dead_letters",
+    "replay_dead_letters",
+    "purge_dead_letters",
+    # Retention
+    "RetentionResult",
+    "archive_queue_items",
+    "archive_messages",
+    "purge_delivered_outbox",
+    "incremental_vacuum",
+    "full_vacuum",
+    "run_retention",
+    # Stats
+    "get_stats_counters",
+    "reconcile_stats_counters",
     # Shared
     "initialize_database",
     "check_and_migrate_db",
+    "apply_migrations",
+    "get_schema_version",
     "get_dashboard_stats",
 ]
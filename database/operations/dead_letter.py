@@ -0,0 +1,173 @@
+"""Dead letters: queue items that ran out of attempts.
+
+requeue_failed_item moves an item here, with its failure class, last error
+and attempt history, once it has failed queue_processor.max_attempts turns,
+so poison messages stop consuming agent capacity. Operators inspect, replay
+(back into the queue) or purge them in filtered batches - one transaction per
+batch - with ``qtool dead-letters`` / ``replay`` / ``purge``.
+"""
+
+import json
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from ..models import DeadLetterItem
+from ..pool import get_pool
+from .queue import notify_queue_activity
+from .shared import now_ms
+
+logger = logging.getLogger(__name__)
+
+
+def _dead_letter_filter(
+    ids: Iterable[int] | None = None,
+    failure_class: str | None = None,
+    letta_user_id: int | None = None,
+    older_than_ms: int | None = None,
+) -> tuple[str, list[Any]]:
+    """WHERE clause (always non-empty) and parameters for the given filters."""
+    clauses = ["1 = 1"]
+    params: list[Any] = []
+    if ids is not None:
+        ids = sorted(set(ids))
+        clauses.append(f"id IN ({', '.join('?' for _ in ids) or 'NULL'})")
+        params.extend(ids)
+    if failure_class is not None:
+        clauses.append("failure_class = ?")
+        params.append(failure_class)
+    if letta_user_id is not None:
+        clauses.append("letta_user_id = ?")
+        params.append(letta_user_id)
+    if older_than_ms is not None:
+        clauses.append("dead_at < ?")
+        params.append(now_ms() - older_than_ms)
+    return " AND ".join(clauses), params
+
+
+async def get_dead_letters(
+    ids: Iterable[int] | None = None,
+    failure_class: str | None = None,
+    letta_user_id: int | None = None,
+    older_than_ms: int | None = None,
+    limit: int = 100,
+) -> list[DeadLetterItem]:
+    """List dead letters matching every given filter, oldest first.
+
+    Args:
+        ids: Only these dead-letter IDs
+        failure_class: Only this failure class
+        letta_user_id: Only this user's items
+        older_than_ms: Only items dead-lettered at least this long ago
+        limit: Maximum number of rows returned
+    """
+    where, params = _dead_letter_filter(
+        ids, failure_class, letta_user_id, older_than_ms
+    )
+    async with get_pool().connection() as db:
+        async with db.execute(
+            f"""
+            SELECT id, queue_id, letta_user_id, message_id, failure_class,
+                   last_error, attempts, attempt_history, dead_at
+            FROM queue_dead_letter
+            WHERE {where}
+            ORDER BY id
+            LIMIT ?
+        """,
+            (*params, limit),
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+    return [
+        DeadLetterItem(
+            id=row[0],
+            queue_id=row[1],
+            letta_user_id=row[2],
+            message_id=row[3],
+            failure_class=row[4],
+            last_error=row[5],
+            attempts=row[6],
+            attempt_history=json.loads(row[7]) if row[7] else [],
+            dead_at=row[8],
+        )
+        for row in rows
+    ]
+
+
+async def replay_dead_letters(
+    ids: Iterable[int] | None = None,
+    failure_class: str | None = None,
+    letta_user_id: int | None = None,
+    older_than_ms: int | None = None,
+    limit: int = 1000,
+) -> int:
+    """Move up to limit matching dead letters back into the queue as pending.
+
+    One transaction: the items are re-enqueued (attempts reset, history kept)
+    in the order they died and removed from queue_dead_letter.
+
+    Returns:
+        Number of items replayed
+    """
+    where, params = _dead_letter_filter(
+        ids, failure_class, letta_user_id, older_than_ms
+    )
+    batch = f"SELECT id FROM queue_dead_letter WHERE {where} ORDER BY id LIMIT ?"
+    async with get_pool().write_connection() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            f"""
+            INSERT INTO queue (
+                letta_user_id, message_id, status, attempts, priority,
+                last_error, attempt_history
+            )
+            SELECT letta_user_id, message_id, 'pending', 0, priority,
+                   last_error, attempt_history
+            FROM queue_dead_letter
+            WHERE id IN ({batch})
+            ORDER BY id
+        """,
+            (*params, limit),
+        )
+        replayed = cursor.rowcount
+        await db.execute(
+            f"DELETE FROM queue_dead_letter WHERE id IN ({batch})", (*params, limit)
+        )
+        await db.commit()
+
+    if replayed:
+        notify_queue_activity()
+        logger.info(f"Replayed {replayed} dead-lettered queue items")
+    return replayed
+
+
+async def purge_dead_letters(
+    ids: Iterable[int] | None = None,
+    failure_class: str | None = None,
+    letta_user_id: int | None = None,
+    older_than_ms: int | None = None,
+    limit: int = 1000,
+) -> int:
+    """Delete up to limit matching dead letters in one transaction.
+
+    Returns:
+        Number of dead letters deleted
+    """
+    where, params = _dead_letter_filter(
+        ids, failure_class, letta_user_id, older_than_ms
+    )
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute(
+            f"""
+            DELETE FROM queue_dead_letter WHERE id IN (
+                SELECT id FROM queue_dead_letter WHERE {where} ORDER BY id LIMIT ?
+            )
+        """,
+            (*params, limit),
+        )
+        purged = cursor.rowcount
+        await db.commit()
+
+    if purged:
+        logger.info(f"Purged {purged} dead-lettered queue items")
+    return purged
@@ -1,10 +1,14 @@
 """Message-related database operations (insert, update, history, etc)."""
 
+from collections.abc import Mapping, Sequence
 from datetime import datetime
 from typing import Any
 
 from ..models import PlatformProfile
 from ..pool import get_pool
+from .outbox import _insert_outbox_row, notify_outbox_activity
+from .queue import _insert_queue_rows, _last_inserted_ids, notify_queue_activity
+from .shared import now_ms
 
 
 async def insert_message(
@@ -17,7 +21,7 @@ async def insert_message(
     """Insert a new message into the database."""
     now = timestamp or datetime.utcnow().isoformat()
 
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         cursor = await db.execute(
             """
             INSERT INTO messages (
@@ -25,15 +29,83 @@ async def insert_message(
                 platform_profile_id,
                 role,
                 message,
-                timestamp
-            ) VALUES (?, ?, ?, ?, ?)
+                timestamp,
+                received_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
         """,
-            (letta_user_id, platform_profile_id, role, message, now),
+            (letta_user_id, platform_profile_id, role, message, now, now_ms()),
         )
         await db.commit()
         return cursor.lastrowid
 
 
+async def insert_messages_many(
+    messages: Sequence[Mapping[str, Any]], enqueue: bool = True
+) -> list[int]:
+    """Insert many messages (and their queue rows) in one transaction.
+
+    Each message is a mapping with letta_user_id, platform_profile_id, role,
+    message and an optional timestamp (ISO string or datetime). With enqueue,
+    every message also gets a pending queue row, committed together with it.
+
+    Returns:
+        The new message ids, in input order
+    """
+    if not messages:
+        return []
+    now = datetime.utcnow().isoformat()
+    received_at = now_ms()
+    rows = []
+    for msg in messages:
+        timestamp = msg.get("timestamp") or now
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        rows.append(
+            (
+                msg["letta_user_id"],
+                msg["platform_profile_id"],
+                msg["role"],
+                msg["message"],
+                timestamp,
+                received_at,
+            )
+        )
+
+    async with get_pool().write_connection() as db:
+        try:
+            await db.executemany(
+                """
+                INSERT INTO messages (
+                    letta_user_id,
+                    platform_profile_id,
+                    role,
+                    message,
+                    timestamp,
+                    received_at
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+            message_ids = await _last_inserted_ids(db, len(rows))
+            if enqueue:
+                await _insert_queue_rows(
+                    db,
+                    [
+                        (row[0], message_id)
+                        for row, message_id in zip(rows, message_ids, strict=True)
+                    ],
+                    now,
+                )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    if enqueue:
+        notify_queue_activity()
+    return message_ids
+
+
 async def get_message_text(message_id: int) -> tuple[str, str] | None:
     """Get the message text and role for a message ID."""
     async with get_pool().connection() as db:
@@ -51,19 +123,78 @@ async def get_message_text(message_id: int) -> tuple[str, str] | None:
             return None
 
 
-async def update_message_with_response(message_id: int, agent_response: str) -> None:
-    """Update a message with the agent's response and mark as processed."""
-    async with get_pool().connection() as db:
-        await db.execute(
-            """
-            UPDATE messages
-            SET agent_response = ?,
-                processed = 1
-            WHERE id = ?
-        """,
-            (agent_response, message_id),
-        )
-        await db.commit()
+async def update_message_with_response(
+    message_id: int, agent_response: str, durable: bool = True
+) -> None:
+    """Update a message with the agent's response and mark as processed.
+
+    The write goes through the pool's group-commit coalescer. With
+    durable=False it returns once buffered and is committed no later than the
+    next durable write, but not atomically with it (a full batch commits
+    early, and a failure is only logged). Use save_turn_response to record a
+    turn's response together with its queue status.
+    """
+    await get_pool().coalescer.execute(
+        """
+        UPDATE messages
+        SET agent_response = ?,
+            processed = 1
+        WHERE id = ?
+    """,
+        (agent_response, message_id),
+        durable=durable,
+    )
+
+
+async def save_turn_response(
+    message_ids: Sequence[int],
+    queue_ids: Sequence[int],
+    agent_response: str,
+    status: str = "completed",
+    outbox_platform: str | None = None,
+    letta_user_id: int | None = None,
+) -> None:
+    """Store a turn's response and set its queue rows' status in one transaction.
+
+    Either everything commits or nothing does, so a queue row is never
+    completed without the response it produced (a failure here leaves the
+    rows processing for the caller to requeue).
+
+    Args:
+        message_ids: Messages answered by the turn (all get the response)
+        queue_ids: Queue rows of those messages
+        agent_response: The agent's response
+        status: Queue status to set
+        outbox_platform: Also add the response to the outbox for delivery on
+            this platform, as a reply to the last of message_ids
+        letta_user_id: The turn's user, for the outbox row's delivery order
+    """
+    now = datetime.utcnow().isoformat()
+    async with get_pool().write_connection() as db:
+        try:
+            await db.executemany(
+                "UPDATE messages SET agent_response = ?, processed = 1 WHERE id = ?",
+                [(agent_response, message_id) for message_id in message_ids],
+            )
+            await db.executemany(
+                "UPDATE queue SET status = ?, timestamp = ? WHERE id = ?",
+                [(status, now, queue_id) for queue_id in queue_ids],
+            )
+            if outbox_platform:
+                await _insert_outbox_row(
+                    db,
+                    letta_user_id,
+                    message_ids[-1],
+                    outbox_platform,
+                    agent_response,
+                )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    if outbox_platform:
+        notify_outbox_activity()
 
 
 async def get_message_history() -> list[dict]:
@@ -89,7 +220,7 @@ async def get_message_history() -> list[dict]:
                 WHERE q.message_id = m.id
                 AND q.status IN ('pending', 'processing', 'failed')
             )
-            ORDER BY m.timestamp DESC
+            ORDER BY m.received_at DESC, m.id DESC
             LIMIT 100
         """) as cursor:
             rows = await cursor.fetchall()
@@ -122,7 +253,7 @@ async def get_messages(
                 m.role, m.message, m.agent_response, m.timestamp
             FROM messages m
             WHERE m.letta_user_id = ? AND m.platform_profile_id = ?
-            ORDER BY m.timestamp DESC
+            ORDER BY m.received_at DESC, m.id DESC
             LIMIT ?
         """,
             (letta_user_id, platform_profile_id, limit),
@@ -192,7 +323,7 @@ async def update_message_status(
     """
     processed = 1 if status == "success" else 0
 
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         await db.execute(
             """
             UPDATE messages
@@ -0,0 +1,209 @@
+"""Outbox: responses of completed turns waiting for platform delivery.
+
+The queue processor writes a turn's response here in the same transaction as
+its queue status (save_turn_response), and per-platform delivery workers
+(runtime/core/delivery.py) send it, so slow or rate-limited platform APIs
+never hold an agent turn's concurrency slot. Rows go pending -> delivering -> delivered, or back to
+pending with a backoff (not_before) after a failed send, and to failed after
+max_attempts. A user's responses are delivered strictly in order.
+"""
+
+import logging
+
+import aiosqlite
+
+from ..models import OutboxItem
+from ..pool import get_pool
+from .queue import QueueNotifier
+from .shared import now_ms
+
+logger = logging.getLogger(__name__)
+
+_outbox_notifier = QueueNotifier()
+
+
+def notify_outbox_activity() -> None:
+    """Signal in-process delivery workers that responses may be waiting."""
+    _outbox_notifier.notify()
+
+
+async def wait_for_outbox_activity(timeout: float) -> bool:
+    """Wait until outbox activity is signalled or timeout seconds pass.
+
+    Returns:
+        True if woken by a notification, False on timeout
+    """
+    return await _outbox_notifier.wait(timeout)
+
+
+_INSERT_OUTBOX = """
+    INSERT INTO outbox (
+        letta_user_id, message_id, platform, response, status, created_at
+    ) VALUES (?, ?, ?, ?, 'pending', ?)
+"""
+
+
+async def _insert_outbox_row(
+    db: aiosqlite.Connection,
+    letta_user_id: int | None,
+    message_id: int,
+    platform: str,
+    response: str,
+) -> None:
+    """Insert a pending outbox row inside the caller's transaction.
+
+    Used by save_turn_response so the response is queued for delivery in the
+    same commit as the turn's queue status; the caller commits and then
+    calls notify_outbox_activity().
+    """
+    await db.execute(
+        _INSERT_OUTBOX, (letta_user_id, message_id, platform, response, now_ms())
+    )
+
+
+async def enqueue_outbox(
+    letta_user_id: int | None,
+    message_id: int,
+    platform: str,
+    response: str,
+) -> None:
+    """Add a response for delivery as a reply to message_id.
+
+    Returns once committed. A finished turn's response is queued by
+    save_turn_response instead, atomically with the turn's queue status.
+    """
+    await get_pool().coalescer.execute(
+        _INSERT_OUTBOX, (letta_user_id, message_id, platform, response, now_ms())
+    )
+    notify_outbox_activity()
+
+
+async def claim_outbox(
+    platform: str, lease_owner: str, lease_seconds: float = 300.0
+) -> OutboxItem | None:
+    """Claim the next deliverable response for a platform.
+
+    Takes the oldest pending row whose backoff has expired, skipping users
+    with a delivery in flight or an older response still pending, so each
+    user's responses arrive in order. The claim is leased; an expired lease
+    is reclaimed by reclaim_expired_outbox().
+
+    Returns:
+        The claimed item (status 'delivering'), or None if nothing is due
+    """
+    now = now_ms()
+    async with get_pool().write_connection() as db:
+        async with db.execute(
+            """
+            UPDATE outbox
+            SET status = 'delivering', lease_owner = ?, lease_expires_at = ?
+            WHERE id = (
+                SELECT o.id FROM outbox o
+                WHERE o.platform = ? AND o.status = 'pending'
+                AND (o.not_before IS NULL OR o.not_before <= ?)
+                AND NOT EXISTS (
+                    SELECT 1 FROM outbox e
+                    WHERE e.letta_user_id IS o.letta_user_id
+                    AND e.platform = o.platform
+                    AND (
+                        e.status = 'delivering'
+                        OR (e.status = 'pending' AND e.id < o.id)
+                    )
+                )
+                ORDER BY o.id
+                LIMIT 1
+            )
+            RETURNING id, letta_user_id, message_id, platform, response, attempts
+        """,
+            (lease_owner, now + int(lease_seconds * 1000), platform, now),
+        ) as cursor:
+            row = await cursor.fetchone()
+        await db.commit()
+    return OutboxItem(*row) if row else None
+
+
+async def complete_outbox(outbox_id: int) -> None:
+    """Mark a claimed response as delivered."""
+    await get_pool().coalescer.execute(
+        """
+        UPDATE outbox
+        SET status = 'delivered', delivered_at = ?, lease_owner = NULL,
+            lease_expires_at = NULL
+        WHERE id = ?
+    """,
+        (now_ms(), outbox_id),
+    )
+
+
+async def fail_outbox(
+    item: OutboxItem,
+    error: str,
+    max_attempts: int = 5,
+    base_delay: float = 2.0,
+    max_delay: float = 300.0,
+) -> bool:
+    """Record a failed delivery: retry after a backoff, or give up.
+
+    The delay is base_delay doubled per earlier attempt, capped at max_delay.
+
+    Returns:
+        True if the response will be retried, False if it was marked failed
+    """
+    attempts = item.attempts + 1
+    retry = attempts < max_attempts
+    delay = min(base_delay * (2 ** (attempts - 1)), max_delay)
+    await get_pool().coalescer.execute(
+        """
+        UPDATE outbox
+        SET status = ?, attempts = ?, not_before = ?, last_error = ?,
+            lease_owner = NULL, lease_expires_at = NULL
+        WHERE id = ?
+    """,
+        (
+            "pending" if retry else "failed",
+            attempts,
+            now_ms() + int(delay * 1000) if retry else None,
+            error,
+            item.id,
+        ),
+    )
+    return retry
+
+
+async def reclaim_expired_outbox() -> int:
+    """Return deliveries whose lease expired (crashed worker) to pending.
+
+    Returns:
+        Number of rows reclaimed
+    """
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute(
+            """
+            UPDATE outbox
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'delivering' AND lease_expires_at < ?
+        """,
+            (now_ms(),),
+        )
+        reclaimed = cursor.rowcount
+        await db.commit()
+    if reclaimed:
+        logger.warning(f"Reclaimed {reclaimed} outbox deliveries with expired leases")
+        notify_outbox_activity()
+    return reclaimed
+
+
+async def next_outbox_delay(platform: str) -> float | None:
+    """Seconds until the platform's earliest backed-off response is due."""
+    now = now_ms()
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT MIN(not_before) FROM outbox
+            WHERE platform = ? AND status = 'pending' AND not_before > ?
+        """,
+            (platform, now),
+        ) as cursor:
+            (earliest,) = await cursor.fetchone()
+    return None if earliest is None else (earliest - now) / 1000
+
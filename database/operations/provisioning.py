@@ -0,0 +1,570 @@
+"""Provisioning of first-time users' Letta identity and core block.
+
+get_or_create_platform_profile records a new user as a letta_users row with
+provision_status 'pending' and returns at once, so the inbound message is
+stored and queued without waiting on Letta. schedule_provisioning then
+creates the identity and the core block concurrently in a background task
+that holds no DB connection while the API calls are in flight, and marks the
+row 'ready' (the queue does not claim a user's items before that) or, once
+its retries are exhausted, 'failed'.
+
+Provisioning is single-flight per (platform, platform_user_id): concurrent
+requests for the same user share one task. Resource IDs are saved as soon as
+they exist and only missing ones are created, so retries and restarts
+(resume_provisioning) never create a second identity or block for a user.
+
+With provisioning.pool_size set, refill_resource_pool keeps that many
+unassigned identity/block pairs created ahead of time (letta_resource_pool),
+and a new user claims one and only renames it, instead of waiting on two
+creates. Claims that find the pool empty fall back to creating inline and are
+counted in ResourcePoolStats.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any
+
+from common.retry import RetryConfig, exponential_backoff
+from runtime.core.letta_client import get_letta_client
+
+from ..pool import get_pool
+from .queue import notify_queue_activity
+from .shared import now_ms
+
+logger = logging.getLogger(__name__)
+
+PROVISION_PENDING = "pending"
+PROVISION_READY = "ready"
+PROVISION_FAILED = "failed"
+
+# Retries of the background task; a failed user is retried on their next
+# message and at startup
+PROVISION_RETRY_CONFIG = RetryConfig(
+    max_retries=4,
+    base_delay=1.0,
+    max_delay=30.0,
+    jitter=True,
+)
+
+# Name of pooled identities and blocks until a user claims them
+POOLED_NAME = "Unassigned Broca user"
+
+
+@dataclass
+class ResourcePoolStats:
+    """Warm pool size, depth and counters since startup."""
+
+    size: int = 0  # configured number of pairs (0: pool disabled)
+    depth: int = 0  # complete pairs waiting to be claimed
+    claimed: int = 0  # new users served from the pool
+    depleted: int = 0  # new users that found the pool empty
+    created: int = 0  # pairs completed by refills
+    refill_errors: int = 0  # failed Letta calls during refills
+    last_depleted_at: int | None = None  # epoch ms of the last empty claim
+
+
+# (platform, platform_user_id) -> in-flight provisioning task
+_inflight: dict[tuple[str, str], asyncio.Task[bool]] = {}
+
+# Warm pool state, set by refill_resource_pool
+_pool_size = 0
+_pool_empty = False
+_pool_metrics = ResourcePoolStats()
+
+
+def identity_request(
+    username: str | None, display_name: str | None, platform_user_id: str | None
+) -> dict[str, Any]:
+    """Keyword arguments for client.create_identity for a new user."""
+    unique_id = str(uuid.uuid4())[:8]
+    return {
+        "identifier_key": f"broca_user_{unique_id}",
+        "name": display_name or username or f"Unknown User {platform_user_id}",
+        "identity_type": "user",
+    }
+
+
+def block_request(
+    username: str | None, display_name: str | None, platform_user_id: str | None
+) -> dict[str, Any]:
+    """Keyword arguments for client.aio.blocks.create (the user's core block)."""
+    name_parts = (display_name or username or "Unknown User").split()
+    first_name = name_parts[0]
+    last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else None
+
+    block_content = []
+    if first_name and last_name:
+        block_content.append(f"About Me ({first_name}, {last_name})")
+    elif first_name:
+        block_content.append(f"About Me ({first_name})")
+    else:
+        block_content.append(f"About Me ({username or 'Unknown User'})")
+
+    block_content.append(f"This user's Telegram ID is: {platform_user_id}")
+    if username:
+        block_content.append(f"This user's Telegram Username is: {username}")
+
+    return {
+        "label": "human",  # Always use "human" as the label
+        "value": json.dumps(
+            {
+                "type": "human_core",
+                "data": {
+                    "name": display_name
+                    or username
+                    or f"Unknown User {platform_user_id}",
+                    "created_at": datetime.utcnow().isoformat(),
+                    "content": "\n".join(block_content),
+                },
+            }
+        ),
+    }
+
+
+async def _create_missing(
+    client: Any,
+    identity_kwargs: dict[str, Any],
+    block_kwargs: dict[str, Any],
+    identity_id: str | None,
+    block_id: str | None,
+) -> tuple[str | None, str | None, Exception | None]:
+    """Create the identity and/or block whose ID is None, concurrently."""
+    calls: dict[str, Any] = {}
+    if identity_id is None:
+        calls["identity"] = client.create_identity(**identity_kwargs)
+    if block_id is None:
+        calls["block"] = client.aio.blocks.create(**block_kwargs)
+
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    error = None
+    for name, result in zip(calls, results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, Exception):
+                raise result
+            error = error or result
+        elif name == "identity":
+            identity_id = result.id
+        else:
+            block_id = result.id
+    return identity_id, block_id, error
+
+
+async def create_letta_resources(
+    client: Any,
+    username: str | None,
+    display_name: str | None,
+    platform_user_id: str | None,
+    identity_id: str | None = None,
+    block_id: str | None = None,
+) -> tuple[str | None, str | None, Exception | None]:
+    """Create whichever of the identity and core block is missing, concurrently.
+
+    Args:
+        client: The Letta client
+        username: Platform username
+        display_name: Platform display name
+        platform_user_id: Platform user ID (written into the block)
+        identity_id: Existing identity ID; not created again if set
+        block_id: Existing block ID; not created again if set
+
+    Returns:
+        (identity_id, block_id, error): the IDs that exist after the calls and
+        the first error, if any call failed (the other call's result is kept)
+    """
+    return await _create_missing(
+        client,
+        identity_request(username, display_name, platform_user_id),
+        block_request(username, display_name, platform_user_id),
+        identity_id,
+        block_id,
+    )
+
+
+async def claim_pooled_resources(
+    client: Any,
+    username: str | None,
+    display_name: str | None,
+    platform_user_id: str | None,
+) -> tuple[str, str] | None:
+    """Take a pre-created identity and block from the warm pool for a user.
+
+    The identity is renamed and the block's value rewritten for the user
+    (concurrently); if either call fails the pair goes back to the pool and
+    the error is raised.
+
+    Returns:
+        (identity_id, block_id), or None if the pool is disabled or empty
+    """
+    global _pool_empty
+    if _pool_size <= 0:
+        return None
+    async with get_pool().write_connection() as db:
+        async with db.execute(
+            """
+            DELETE FROM letta_resource_pool WHERE id = (
+                SELECT id FROM letta_resource_pool
+                WHERE letta_identity_id IS NOT NULL AND letta_block_id IS NOT NULL
+                ORDER BY id LIMIT 1
+            )
+            RETURNING letta_identity_id, letta_block_id
+        """
+        ) as cursor:
+            row = await cursor.fetchone()
+        await db.commit()
+
+    if row is None:
+        _pool_metrics.depleted += 1
+        _pool_metrics.last_depleted_at = now_ms()
+        if not _pool_empty:
+            _pool_empty = True
+            logger.warning(
+                "Letta resource pool is empty; creating identities and blocks "
+                "inline until it is refilled"
+            )
+        return None
+
+    identity_id, block_id = row
+    name = identity_request(username, display_name, platform_user_id)["name"]
+    value = block_request(username, display_name, platform_user_id)["value"]
+    try:
+        await asyncio.gather(
+            client.update_identity(identity_id, name=name),
+            client.aio.blocks.update(block_id, value=value),
+        )
+    except Exception:
+        await _insert_pooled([(identity_id, block_id)])
+        raise
+    _pool_metrics.claimed += 1
+    return identity_id, block_id
+
+
+async def acquire_letta_resources(
+    client: Any,
+    username: str | None,
+    display_name: str | None,
+    platform_user_id: str | None,
+    identity_id: str | None = None,
+    block_id: str | None = None,
+) -> tuple[str | None, str | None, Exception | None]:
+    """A user's identity and block: from the warm pool if possible, else created.
+
+    The pool is only used when neither resource exists yet; arguments and
+    return value are as for create_letta_resources.
+    """
+    if identity_id is None and block_id is None:
+        try:
+            pooled = await claim_pooled_resources(
+                client, username, display_name, platform_user_id
+            )
+        except Exception as e:
+            return None, None, e
+        if pooled is not None:
+            return *pooled, None
+    return await create_letta_resources(
+        client, username, display_name, platform_user_id, identity_id, block_id
+    )
+
+
+async def _insert_pooled(pairs: list[tuple[str | None, str | None]]) -> None:
+    """Add identity/block pairs to the warm pool in one transaction.
+
+    Args:
+        pairs: (letta_identity_id, letta_block_id) per row; either may be None
+            when its create failed, to be completed by the next refill
+    """
+    async with get_pool().write_connection() as db:
+        await db.executemany(
+            """
+            INSERT INTO letta_resource_pool (
+                letta_identity_id, letta_block_id, created_at
+            ) VALUES (?, ?, ?)
+        """,
+            [(identity_id, block_id, now_ms()) for identity_id, block_id in pairs],
+        )
+        await db.commit()
+
+
+async def refill_resource_pool(size: int, batch: int) -> int:
+    """Top the warm pool up towards size, creating at most batch pairs.
+
+    Rows left incomplete by an earlier failed call are completed first. Sets
+    the pool size used by claim_pooled_resources (0 disables the pool).
+
+    Returns:
+        Number of complete pairs added
+    """
+    global _pool_size, _pool_empty
+    _pool_size = size
+    if size <= 0:
+        return 0
+
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT id, letta_identity_id, letta_block_id
+            FROM letta_resource_pool
+            WHERE letta_identity_id IS NULL OR letta_block_id IS NULL
+            ORDER BY id LIMIT ?
+        """,
+            (batch,),
+        ) as cursor:
+            partial = await cursor.fetchall()
+        async with db.execute("SELECT COUNT(*) FROM letta_resource_pool") as cursor:
+            (rows,) = await cursor.fetchone()
+    new = max(0, min(size - rows, batch - len(partial)))
+    if not partial and not new:
+        return 0
+
+    client = get_letta_client()
+    block_kwargs = {
+        "label": "human",
+        "value": json.dumps(
+            {"type": "human_core", "data": {"name": POOLED_NAME, "content": ""}}
+        ),
+    }
+    jobs = [(iid, bid) for _, iid, bid in partial] + [(None, None)] * new
+    results = await asyncio.gather(
+        *(
+            _create_missing(
+                client,
+                identity_request(None, POOLED_NAME, None),
+                block_kwargs,
+                iid,
+                bid,
+            )
+            for iid, bid in jobs
+        )
+    )
+
+    completed = sum(1 for iid, bid, _ in results if iid and bid)
+    errors = [error for _, _, error in results if error is not None]
+    async with get_pool().write_connection() as db:
+        await db.executemany(
+            """
+            UPDATE letta_resource_pool
+            SET letta_identity_id = ?, letta_block_id = ?
+            WHERE id = ?
+        """,
+            [(iid, bid, row[0]) for row, (iid, bid, _) in zip(partial, results)],
+        )
+        await db.commit()
+    await _insert_pooled(
+        [(iid, bid) for iid, bid, _ in results[len(partial) :] if iid or bid]
+    )
+
+    _pool_metrics.created += completed
+    _pool_metrics.refill_errors += len(errors)
+    if completed:
+        _pool_empty = False
+    if errors:
+        logger.warning(
+            f"Letta resource pool refill: {len(errors)} calls failed "
+            f"(first: {errors[0]})"
+        )
+    return completed
+
+
+async def get_resource_pool_stats() -> ResourcePoolStats:
+    """Warm pool counters since startup, with the current depth."""
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT COUNT(*) FROM letta_resource_pool
+            WHERE letta_identity_id IS NOT NULL AND letta_block_id IS NOT NULL
+        """
+        ) as cursor:
+            (depth,) = await cursor.fetchone()
+    return replace(_pool_metrics, size=_pool_size, depth=depth)
+
+
+async def _get_resources(letta_user_id: int) -> tuple[str | None, str | None, str]:
+    """(letta_identity_id, letta_block_id, provision_status) of a user."""
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT letta_identity_id, letta_block_id, provision_status
+            FROM letta_users WHERE id = ?
+        """,
+            (letta_user_id,),
+        ) as cursor:
+            row = await cursor.fetchone()
+    return tuple(row) if row else (None, None, PROVISION_PENDING)
+
+
+async def _save_resources(
+    letta_user_id: int,
+    identity_id: str | None,
+    block_id: str | None,
+    status: str,
+) -> None:
+    """Store a user's Letta IDs and provision status; drop their cached profile."""
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            """
+            UPDATE letta_users
+            SET letta_identity_id = ?, letta_block_id = ?, provision_status = ?
+            WHERE id = ?
+        """,
+            (identity_id, block_id, status, letta_user_id),
+        )
+        await db.commit()
+    get_pool().profile_cache.invalidate_user(letta_user_id)
+
+
+async def _provision(
+    letta_user_id: int,
+    username: str | None,
+    display_name: str | None,
+    platform_user_id: str | None,
+) -> bool:
+    """Create a user's missing Letta resources, retrying with backoff.
+
+    Returns:
+        True if the user is now 'ready', False if it was marked 'failed'
+    """
+    identity_id, block_id, status = await _get_resources(letta_user_id)
+    if status == PROVISION_READY:
+        return True
+    if status == PROVISION_FAILED:
+        # Hold the user's queued items again while this attempt runs
+        await _save_resources(letta_user_id, identity_id, block_id, PROVISION_PENDING)
+
+    async def attempt() -> None:
+        nonlocal identity_id, block_id
+        client = get_letta_client()
+        found = (identity_id, block_id)
+        identity_id, block_id, error = await acquire_letta_resources(
+            client, username, display_name, platform_user_id, identity_id, block_id
+        )
+        if (identity_id, block_id) != found and error is not None:
+            # Keep what was created so the next attempt does not recreate it
+            await _save_resources(
+                letta_user_id, identity_id, block_id, PROVISION_PENDING
+            )
+        if error is not None:
+            raise error
+
+    try:
+        await exponential_backoff(attempt, config=PROVISION_RETRY_CONFIG)
+    except Exception as e:
+        logger.error(f"Provisioning of Letta user {letta_user_id} failed: {e}")
+        await _save_resources(letta_user_id, identity_id, block_id, PROVISION_FAILED)
+        # Queued items are claimable again; they fail without a core block
+        notify_queue_activity()
+        return False
+
+    await _save_resources(letta_user_id, identity_id, block_id, PROVISION_READY)
+    logger.info(f"Provisioned Letta user {letta_user_id}")
+    notify_queue_activity()
+    return True
+
+
+def schedule_provisioning(
+    platform: str,
+    platform_user_id: str,
+    letta_user_id: int,
+    username: str | None = None,
+    display_name: str | None = None,
+) -> asyncio.Task[bool]:
+    """Provision a user in the background, single-flight per platform user.
+
+    Returns:
+        The provisioning task; a request for a user whose provisioning is
+        already in flight gets the existing task
+    """
+    key = (platform, platform_user_id)
+    task = _inflight.get(key)
+    if task is not None and not task.done():
+        return task
+
+    task = asyncio.create_task(
+        _provision(letta_user_id, username, display_name, platform_user_id)
+    )
+    _inflight[key] = task
+
+    def _done(finished: asyncio.Task[bool]) -> None:
+        if _inflight.get(key) is finished:
+            del _inflight[key]
+        if not finished.cancelled() and finished.exception() is not None:
+            logger.error(
+                f"Provisioning task for {platform}:{platform_user_id} crashed: "
+                f"{finished.exception()}"
+            )
+
+    task.add_done_callback(_done)
+    return task
+
+
+async def mark_blocks_missing(blocks: Iterable[tuple[int, str]]) -> int:
+    """Queue re-provisioning of users whose core block no longer exists.
+
+    Clears the block ID and sets the user back to 'pending', so their queued
+    items wait for a new block instead of failing; resume_provisioning()
+    then creates it (the identity is kept).
+
+    Args:
+        blocks: (letta_user_id, letta_block_id) pairs found missing; a user
+            whose block changed since is left alone
+
+    Returns:
+        Number of users marked
+    """
+    blocks = list(blocks)
+    if not blocks:
+        return 0
+    async with get_pool().write_connection() as db:
+        marked = 0
+        for letta_user_id, block_id in blocks:
+            cursor = await db.execute(
+                """
+                UPDATE letta_users
+                SET letta_block_id = NULL, provision_status = ?
+                WHERE id = ? AND letta_block_id = ?
+            """,
+                (PROVISION_PENDING, letta_user_id, block_id),
+            )
+            marked += cursor.rowcount
+        await db.commit()
+    for letta_user_id, _ in blocks:
+        get_pool().profile_cache.invalidate_user(letta_user_id)
+    return marked
+
+
+async def resume_provisioning() -> int:
+    """Schedule provisioning of every 'pending' or 'failed' user (at startup).
+
+    Returns:
+        Number of users scheduled
+    """
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT p.platform, p.platform_user_id, u.id, p.username, p.display_name
+            FROM letta_users u
+            JOIN platform_profiles p ON p.letta_user_id = u.id
+            WHERE u.provision_status != ?
+            GROUP BY u.id
+        """,
+            (PROVISION_READY,),
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+    for row in rows:
+        schedule_provisioning(*row)
+    if rows:
+        logger.info(f"Resumed provisioning of {len(rows)} Letta users")
+    return len(rows)
+
+
+async def cancel_provisioning() -> None:
+    """Cancel in-flight provisioning (shutdown); rows stay pending for resume."""
+    tasks = list(_inflight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _inflight.clear()
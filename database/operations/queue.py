@@ -1,13 +1,20 @@
 """Queue-related database operations (add, get, update, flush, etc)."""
 
+import asyncio
+import json
 import logging
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
+import aiosqlite
+
 from common.retry import RetryConfig, exponential_backoff, is_retryable_exception
 
-from ..models import QueueItem
+from ..models import PlatformProfile, QueueItem, QueueItemContext
 from ..pool import get_pool
+from .shared import now_ms
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -21,11 +28,80 @@ DB_RETRY_CONFIG = RetryConfig(
 )
 
 
-async def add_to_queue(letta_user_id: int, message_id: int) -> None:
-    """Add a message to the processing queue."""
+class QueueNotifier:
+    """In-process wakeup signal for queue consumers.
+
+    Producers in this process call notify() after committing pending rows so the
+    QueueProcessor can dequeue immediately instead of waiting for its next poll.
+    Rows written by other processes (the CLI tools) are still picked up by the
+    consumer's fallback poll.
+    """
+
+    def __init__(self) -> None:
+        self._event: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_event(self) -> asyncio.Event:
+        """Return the event bound to the running loop (lazy init, per loop)."""
+        loop = asyncio.get_running_loop()
+        if self._event is None or self._loop is not loop:
+            self._event = asyncio.Event()
+            self._loop = loop
+        return self._event
+
+    def notify(self) -> None:
+        """Wake any consumer waiting for queue activity."""
+        try:
+            self._get_event().set()
+        except RuntimeError:
+            # No running event loop (sync caller); consumers fall back to polling
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for queue activity or until timeout elapses.
+
+        Args:
+            timeout: Maximum seconds to wait (the fallback poll interval)
+
+        Returns:
+            True if woken by a notification, False on timeout
+        """
+        event = self._get_event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            event.clear()
+
+
+_queue_notifier = QueueNotifier()
+
+
+def notify_queue_activity() -> None:
+    """Signal in-process queue consumers that pending work may be available."""
+    _queue_notifier.notify()
+
+
+async def wait_for_queue_activity(timeout: float) -> bool:
+    """Wait until queue activity is signalled or timeout seconds pass.
+
+    Returns:
+        True if woken by a notification, False on timeout
+    """
+    return await _queue_notifier.wait(timeout)
+
+
+async def add_to_queue(letta_user_id: int, message_id: int, priority: int = 0) -> None:
+    """Add a message to the processing queue.
+
+    Higher priority rows are claimed ahead of other users' rows (each user's
+    own rows stay FIFO).
+    """
     now = datetime.utcnow().isoformat()
 
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         await db.execute(
             """
             INSERT INTO queue (
@@ -33,13 +109,79 @@ async def add_to_queue(letta_user_id: int, message_id: int) -> None:
                 message_id,
                 status,
                 timestamp,
-                attempts
-            ) VALUES (?, ?, 'pending', ?, 0)
+                attempts,
+                enqueued_at,
+                priority
+            ) VALUES (?, ?, 'pending', ?, 0, ?, ?)
         """,
-            (letta_user_id, message_id, now),
+            (letta_user_id, message_id, now, now_ms(), priority),
         )
         await db.commit()
 
+    notify_queue_activity()
+
+
+async def _insert_queue_rows(
+    db: aiosqlite.Connection, items: Sequence[tuple[int, int]], now: str
+) -> list[int]:
+    """INSERT pending queue rows with executemany on db (caller commits).
+
+    Returns:
+        The new queue ids, in input order
+    """
+    if not items:
+        return []
+    enqueued_at = now_ms()
+    await db.executemany(
+        """
+        INSERT INTO queue (
+            letta_user_id,
+            message_id,
+            status,
+            timestamp,
+            attempts,
+            enqueued_at
+        ) VALUES (?, ?, 'pending', ?, 0, ?)
+    """,
+        [
+            (letta_user_id, message_id, now, enqueued_at)
+            for letta_user_id, message_id in items
+        ],
+    )
+    return await _last_inserted_ids(db, len(items))
+
+
+async def _last_inserted_ids(db: aiosqlite.Connection, count: int) -> list[int]:
+    """Ids of the last count rows inserted by one executemany.
+
+    AUTOINCREMENT hands out consecutive ids inside the writer's transaction,
+    so they end at last_insert_rowid().
+    """
+    async with db.execute("SELECT last_insert_rowid()") as cursor:
+        last_id = (await cursor.fetchone())[0]
+    return list(range(last_id - count + 1, last_id + 1))
+
+
+async def add_to_queue_many(items: Sequence[tuple[int, int]]) -> list[int]:
+    """Add many messages to the processing queue in one transaction.
+
+    Args:
+        items: (letta_user_id, message_id) pairs
+
+    Returns:
+        The new queue ids, in input order
+    """
+    if not items:
+        return []
+    now = datetime.utcnow().isoformat()
+
+    async with get_pool().write_connection() as db:
+        queue_ids = await _insert_queue_rows(db, items, now)
+        await db.commit()
+
+    notify_queue_activity()
+    return queue_ids
+
 
 async def get_pending_queue_item() -> QueueItem | None:
     """Get the next pending item from the queue."""
@@ -47,7 +189,7 @@ async def get_pending_queue_item() -> QueueItem | None:
         async with db.execute("""
             SELECT * FROM queue
             WHERE status = 'pending'
-            ORDER BY timestamp ASC
+            ORDER BY enqueued_at ASC, id ASC
             LIMIT 1
         """) as cursor:
             row = await cursor.fetchone()
@@ -63,27 +205,112 @@ async def get_pending_queue_item() -> QueueItem | None:
             return None
 
 
-async def atomic_dequeue_item() -> QueueItem | None:
+async def get_queue_item_context(queue_id: int) -> QueueItemContext | None:
+    """Fetch a queue item's message, platform profile and Letta IDs in one query.
+
+    Replaces the per-item get_message_text / get_user_details /
+    get_platform_profile_id / get_platform_profile / get_letta_user_block_id /
+    get_letta_identity_id / get_message_platform_profile round-trips.
+
+    Args:
+        queue_id: ID of the queue item
+
+    Returns:
+        QueueItemContext, or None if the queue item does not exist
+    """
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT q.id, q.letta_user_id, q.message_id, m.message,
+                   p.id, p.letta_user_id, p.platform, p.platform_user_id,
+                   p.username, p.display_name, p.metadata, p.created_at,
+                   p.last_active, u.letta_block_id, u.letta_identity_id
+            FROM queue q
+            LEFT JOIN messages m ON m.id = q.message_id
+            LEFT JOIN platform_profiles p ON p.id = m.platform_profile_id
+            LEFT JOIN letta_users u ON u.id = q.letta_user_id
+            WHERE q.id = ?
+        """,
+            (queue_id,),
+        ) as cursor:
+            row = await cursor.fetchone()
+            if not row:
+                return None
+
+            profile = None
+            if row[4] is not None:
+                profile = PlatformProfile(
+                    id=row[4],
+                    letta_user_id=row[5],
+                    platform=row[6],
+                    platform_user_id=row[7],
+                    username=row[8],
+                    display_name=row[9],
+                    metadata=row[10],
+                    created_at=row[11],
+                    last_active=row[12],
+                )
+
+            return QueueItemContext(
+                queue_id=row[0],
+                letta_user_id=row[1],
+                message_id=row[2],
+                message=row[3],
+                profile=profile,
+                letta_block_id=row[13],
+                letta_identity_id=row[14],
+            )
+
+
+async def atomic_dequeue_item(
+    exclude_user_ids: Iterable[int] | None = None,
+) -> QueueItem | None:
     """Atomically dequeue the next pending item and mark it as processing.
 
     This prevents race conditions where multiple processes could pick up
     the same queue item. Uses a single transaction to both select and update.
 
+    Args:
+        exclude_user_ids: Letta user IDs whose turn is already in flight; their
+            pending rows are skipped so each user's messages stay strictly ordered
+
+    Users with an item waiting out a retry delay (not_before), or whose Letta
+    identity and block are still being provisioned, are skipped too.
+
     Returns:
         QueueItem if a pending item was found and marked as processing, None otherwise
     """
-    async with get_pool().connection() as db:
+    excluded = sorted(set(exclude_user_ids or ()))
+    user_filter = ""
+    if excluded:
+        placeholders = ", ".join("?" for _ in excluded)
+        user_filter = f"AND letta_user_id NOT IN ({placeholders})"
+
+    async with get_pool().write_connection() as db:
         # Start transaction
         await db.execute("BEGIN IMMEDIATE")
 
         try:
             # Find the next pending item
-            async with db.execute("""
+            async with db.execute(
+                f"""
                 SELECT * FROM queue
-                WHERE status = 'pending'
-                ORDER BY timestamp ASC
+                WHERE status = 'pending' {user_filter}
+                AND NOT EXISTS (
+                    SELECT 1 FROM queue d
+                    WHERE d.letta_user_id IS queue.letta_user_id
+                    AND d.status = 'pending' AND d.not_before > ?
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM letta_users u
+                    WHERE u.id = queue.letta_user_id
+                    AND u.provision_status = 'pending'
+                )
+                ORDER BY enqueued_at ASC, id ASC
                 LIMIT 1
-            """) as cursor:
+            """,
+                (*excluded, now_ms()),
+            ) as cursor:
                 row = await cursor.fetchone()
 
                 if not row:
@@ -93,17 +320,18 @@ async def atomic_dequeue_item() -> QueueItem | None:
                 queue_id = row[0]
 
                 # Atomically mark as processing
-                await db.execute(
+                update_cursor = await db.execute(
                     """
                     UPDATE queue
-                    SET status = 'processing', timestamp = ?
+                    SET status = 'processing', timestamp = ?, claimed_at = ?
                     WHERE id = ? AND status = 'pending'
                 """,
-                    (datetime.utcnow().isoformat(), queue_id),
+                    (datetime.utcnow().isoformat(), now_ms(), queue_id),
                 )
 
-                # Check if the update affected any rows (prevents race condition)
-                if db.total_changes == 0:
+                # Check if the update affected any rows (prevents race condition);
+                # total_changes is cumulative on the long-lived writer connection
+                if update_cursor.rowcount == 0:
                     await db.execute("ROLLBACK")
                     return None
 
@@ -126,62 +354,475 @@ async def atomic_dequeue_item() -> QueueItem | None:
             return None
 
 
-async def requeue_failed_item(queue_id: int, max_attempts: int | None = None) -> bool:
-    """Requeue a failed item, optionally enforcing max attempts.
+# Dequeue orderings across users (each user's own rows are always FIFO):
+#   fifo        - oldest head first
+#   round_robin - the user served least recently first
+#   weighted    - weighted fair share: smallest virtual finish time first, where
+#                 each claim advances a user's virtual time by 1 / weight
+SCHEDULING_POLICIES = ("fifo", "round_robin", "weighted")
+
+
+@dataclass
+class _Candidate:
+    """A user's oldest pending row plus that user's fair-share state."""
+
+    queue_id: int
+    letta_user_id: int
+    priority: int
+    enqueued_at: int
+    last_served_at: int | None
+    virtual_time: float | None
+    backlogged_since: int | None
+    start_time: float = 0.0
+    finish_time: float = 0.0
+
+    @property
+    def returning(self) -> bool:
+        """True if this head arrived after the user last had a turn or a tag."""
+        if self.virtual_time is None:
+            return True
+        seen = max(self.last_served_at or 0, self.backlogged_since or 0)
+        return self.enqueued_at > seen
+
+
+def _schedule(
+    candidates: list[_Candidate],
+    limit: int,
+    policy: str,
+    user_weights: Mapping[int, float],
+    user_priorities: Mapping[int, int],
+) -> list[_Candidate]:
+    """Pick up to limit candidates: highest priority first, then by policy."""
+    if policy not in SCHEDULING_POLICIES:
+        raise ValueError(f"Unknown scheduling policy: {policy}")
+
+    # Users returning from idle start at the system virtual time (the lowest
+    # tag among users that stayed backlogged) instead of cashing in credit for
+    # the time they had nothing queued
+    active = [c.virtual_time for c in candidates if not c.returning]
+    stored = [c.virtual_time for c in candidates if c.virtual_time is not None]
+    system_time = min(active, default=max(stored, default=0.0))
+    for c in candidates:
+        c.start_time = c.virtual_time
+        if c.returning:
+            c.start_time = max(c.virtual_time or 0.0, system_time)
+        weight = max(float(user_weights.get(c.letta_user_id, 1.0)), 1e-6)
+        c.finish_time = c.start_time + 1.0 / weight
+
+    def key(c: _Candidate) -> tuple:
+        priority = -(c.priority + user_priorities.get(c.letta_user_id, 0))
+        if policy == "round_robin":
+            return (priority, c.last_served_at or 0, c.enqueued_at, c.queue_id)
+        if policy == "weighted":
+            # Ties go to the user served least recently, not the oldest backlog
+            return (
+                priority,
+                c.finish_time,
+                c.last_served_at or 0,
+                c.enqueued_at,
+                c.queue_id,
+            )
+        return (priority, c.enqueued_at, c.queue_id)
+
+    return sorted(candidates, key=key)[:limit]
+
+
+async def atomic_dequeue_batch(
+    limit: int,
+    exclude_user_ids: Iterable[int] | None = None,
+    lease_owner: str | None = None,
+    lease_seconds: float = 60.0,
+    policy: str = "round_robin",
+    user_weights: Mapping[int, float] | None = None,
+    user_priorities: Mapping[int, int] | None = None,
+) -> list[QueueItem]:
+    """Atomically claim up to ``limit`` pending items in one write transaction.
+
+    Claims at most one item per Letta user (the user's oldest pending row) so
+    per-user ordering is preserved, and skips users whose turn is already in
+    flight - in this process (exclude_user_ids) or any other (a processing
+    row), whose oldest row is waiting out a retry delay (not_before), or
+    whose Letta identity and block are still being provisioned.
+    Users' head rows are ranked by priority (the row's priority plus
+    user_priorities), then by the scheduling policy, so one user with a long
+    backlog cannot starve everyone else. Filling every free concurrency slot
+    costs one write lock instead of one per message.
+
+    Args:
+        limit: Maximum number of items to claim
+        exclude_user_ids: Letta user IDs whose turn is already in flight
+        lease_owner: Consumer id recorded on the claimed rows; the claim expires
+            after lease_seconds unless renewed with renew_leases()
+        lease_seconds: Lease length for lease_owner claims
+        policy: One of SCHEDULING_POLICIES
+        user_weights: letta_user_id -> fair-share weight (default 1.0)
+        user_priorities: letta_user_id -> priority added to that user's rows
+
+    Returns:
+        Claimed QueueItems (status 'processing') in scheduled order; empty if none
+    """
+    if limit < 1:
+        return []
+
+    excluded = sorted(set(exclude_user_ids or ()))
+    user_filter = ""
+    if excluded:
+        placeholders = ", ".join("?" for _ in excluded)
+        user_filter = f"AND q.letta_user_id NOT IN ({placeholders})"
+
+    now = datetime.utcnow().isoformat()
+    claimed_at = now_ms()
+    lease_expires_at = None
+    if lease_owner is not None:
+        lease_expires_at = claimed_at + int(lease_seconds * 1000)
+    async with get_pool().write_connection() as db:
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            async with db.execute(
+                f"""
+                SELECT q.id, q.letta_user_id, q.priority, q.enqueued_at,
+                       f.last_served_at, f.virtual_time, f.backlogged_since
+                FROM queue q
+                LEFT JOIN queue_fair_share f ON f.letta_user_id = q.letta_user_id
+                WHERE q.status = 'pending' {user_filter}
+                AND q.id = (
+                    SELECT q2.id FROM queue q2
+                    WHERE q2.letta_user_id IS q.letta_user_id
+                    AND q2.status = 'pending'
+                    ORDER BY q2.enqueued_at ASC, q2.id ASC
+                    LIMIT 1
+                )
+                AND (q.not_before IS NULL OR q.not_before <= ?)
+                AND NOT EXISTS (
+                    SELECT 1 FROM queue q3
+                    WHERE q3.letta_user_id IS q.letta_user_id
+                    AND q3.status = 'processing'
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM letta_users u
+                    WHERE u.id = q.letta_user_id
+                    AND u.provision_status = 'pending'
+                )
+            """,
+                (*excluded, claimed_at),
+            ) as cursor:
+                candidates = [_Candidate(*row) for row in await cursor.fetchall()]
+
+            chosen = _schedule(
+                candidates,
+                limit,
+                policy,
+                user_weights or {},
+                user_priorities or {},
+            )
+            if not chosen:
+                await db.rollback()
+                return []
+
+            placeholders = ", ".join("?" for _ in chosen)
+            async with db.execute(
+                f"""
+                UPDATE queue
+                SET status = 'processing', timestamp = ?, claimed_at = ?,
+                    lease_owner = ?, lease_expires_at = ?
+                WHERE id IN ({placeholders}) AND status = 'pending'
+                RETURNING id, letta_user_id, message_id, status, attempts, timestamp
+            """,
+                (
+                    now,
+                    claimed_at,
+                    lease_owner,
+                    lease_expires_at,
+                    *(c.queue_id for c in chosen),
+                ),
+            ) as cursor:
+                rows = {row[0]: row for row in await cursor.fetchall()}
+
+            await db.executemany(
+                """
+                INSERT INTO queue_fair_share (
+                    letta_user_id, last_served_at, virtual_time, served
+                ) VALUES (?, ?, ?, 1)
+                ON CONFLICT(letta_user_id) DO UPDATE SET
+                    last_served_at = excluded.last_served_at,
+                    virtual_time = excluded.virtual_time,
+                    served = served + 1
+            """,
+                [
+                    (c.letta_user_id, claimed_at, c.finish_time)
+                    for c in chosen
+                    if c.letta_user_id is not None
+                ],
+            )
+            if policy == "weighted":
+                # Tag users that are now waiting so their start time holds
+                # until they are served
+                await db.executemany(
+                    """
+                    INSERT INTO queue_fair_share (
+                        letta_user_id, virtual_time, backlogged_since
+                    ) VALUES (?, ?, ?)
+                    ON CONFLICT(letta_user_id) DO UPDATE SET
+                        virtual_time = excluded.virtual_time,
+                        backlogged_since = excluded.backlogged_since
+                """,
+                    [
+                        (c.letta_user_id, c.start_time, claimed_at)
+                        for c in candidates
+                        if c.returning
+                        and c.queue_id not in rows
+                        and c.letta_user_id is not None
+                    ],
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error in atomic batch dequeue: {str(e)}")
+            return []
+
+    return [
+        QueueItem(
+            id=row[0],
+            letta_user_id=row[1],
+            message_id=row[2],
+            status=row[3],
+            attempts=row[4],
+            timestamp=row[5],
+        )
+        for row in (rows.get(c.queue_id) for c in chosen)
+        if row is not None
+    ]
+
+
+async def claim_user_pending(
+    letta_user_id: int,
+    limit: int,
+    lease_owner: str | None = None,
+    lease_seconds: float = 60.0,
+) -> list[QueueItem]:
+    """Claim up to ``limit`` more pending rows of a user whose turn is in flight.
+
+    Used to coalesce a burst of messages into the turn already claimed for the
+    user; the rows are claimed oldest first, so per-user order is preserved.
+    atomic_dequeue_batch never claims for a user with a processing row, so no
+    other consumer can race for these rows.
+
+    Returns:
+        Claimed QueueItems (status 'processing'), oldest first
+    """
+    if limit < 1:
+        return []
+
+    claimed_at = now_ms()
+    lease_expires_at = None
+    if lease_owner is not None:
+        lease_expires_at = claimed_at + int(lease_seconds * 1000)
+    async with get_pool().write_connection() as db:
+        async with db.execute(
+            """
+            UPDATE queue
+            SET status = 'processing', timestamp = ?, claimed_at = ?,
+                lease_owner = ?, lease_expires_at = ?
+            WHERE id IN (
+                SELECT id FROM queue
+                WHERE letta_user_id = ? AND status = 'pending'
+                ORDER BY enqueued_at ASC, id ASC
+                LIMIT ?
+            )
+            RETURNING id, letta_user_id, message_id, status, attempts, timestamp,
+                      enqueued_at
+        """,
+            (
+                datetime.utcnow().isoformat(),
+                claimed_at,
+                lease_owner,
+                lease_expires_at,
+                letta_user_id,
+                limit,
+            ),
+        ) as cursor:
+            rows = await cursor.fetchall()
+        await db.commit()
+
+    return [
+        QueueItem(
+            id=row[0],
+            letta_user_id=row[1],
+            message_id=row[2],
+            status=row[3],
+            attempts=row[4],
+            timestamp=row[5],
+        )
+        for row in sorted(rows, key=lambda row: (row[6], row[0]))
+    ]
+
+
+async def get_queue_messages(
+    queue_ids: Iterable[int],
+) -> dict[int, tuple[str | None, int | None]]:
+    """Fetch the message text and received_at (epoch ms) of several queue items.
+
+    Returns:
+        queue_id -> (message, received_at); ids that do not exist are missing
+    """
+    ids = sorted(set(queue_ids))
+    if not ids:
+        return {}
+    placeholders = ", ".join("?" for _ in ids)
+    async with get_pool().connection() as db:
+        async with db.execute(
+            f"""
+            SELECT q.id, m.message, m.received_at
+            FROM queue q
+            LEFT JOIN messages m ON m.id = q.message_id
+            WHERE q.id IN ({placeholders})
+        """,
+            ids,
+        ) as cursor:
+            return {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+
+async def release_queue_items(queue_ids: Iterable[int]) -> int:
+    """Return claimed items to pending without counting an attempt.
+
+    For rows that were claimed alongside a failed turn but were not its cause
+    (coalesced messages); their enqueue order is unchanged.
+
+    Returns:
+        Number of items released
+    """
+    ids = sorted(set(queue_ids))
+    if not ids:
+        return 0
+    placeholders = ", ".join("?" for _ in ids)
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute(
+            f"""
+            UPDATE queue
+            SET status = 'pending', timestamp = ?, claimed_at = NULL,
+                lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'processing' AND id IN ({placeholders})
+            """,
+            (datetime.utcnow().isoformat(), *ids),
+        )
+        released = cursor.rowcount
+        await db.commit()
+
+    if released:
+        notify_queue_activity()
+    return released
+
+
+# Entries kept in a queue row's attempt_history
+ATTEMPT_HISTORY_LIMIT = 20
+
+
+async def requeue_failed_item(
+    queue_id: int,
+    max_attempts: int | None = None,
+    base_delay: float = 5.0,
+    max_delay: float = 300.0,
+    error: str | None = None,
+    failure_class: str = "error",
+) -> bool:
+    """Requeue a failed item with backoff, or dead-letter it after max attempts.
+
+    The failure is appended to the row's attempt_history. The item is not
+    claimable again until base_delay * 2**attempts seconds (capped at
+    max_delay) have passed; it keeps its place at the head of its user's
+    queue, so that user waits while everyone else keeps flowing. Once
+    max_attempts turns have failed, the row moves to queue_dead_letter in the
+    same transaction.
 
     Args:
         queue_id: ID of the queue item to requeue
-        max_attempts: Maximum number of attempts before giving up; None for unlimited
+        max_attempts: Failed turns before the item is dead-lettered; None for
+            unlimited
+        base_delay: Backoff in seconds after the first failure
+        max_delay: Longest backoff in seconds
+        error: What went wrong this attempt
+        failure_class: Short category of the failure (e.g. the exception type)
 
     Returns:
-        True if item was requeued, False if max attempts exceeded
+        True if item was requeued, False if it was dead-lettered or not found
     """
 
     async def _requeue_operation():
-        async with get_pool().connection() as db:
-            # Check current attempts
+        async with get_pool().write_connection() as db:
             async with db.execute(
-                "SELECT attempts FROM queue WHERE id = ?", (queue_id,)
+                "SELECT attempts, attempt_history FROM queue WHERE id = ?",
+                (queue_id,),
             ) as cursor:
                 row = await cursor.fetchone()
-                if not row:
-                    return False
-
-                attempts = row[0]
-
-                if max_attempts is not None and attempts >= max_attempts:
-                    # Mark as permanently failed
-                    await db.execute(
-                        """
-                        UPDATE queue
-                        SET status = 'failed', timestamp = ?
-                        WHERE id = ?
-                    """,
-                        (datetime.utcnow().isoformat(), queue_id),
-                    )
-                    await db.commit()
-                    logger.warning(
-                        f"Queue item {queue_id} exceeded max attempts ({max_attempts}), marking as failed"
-                    )
-                    return False
+            if not row:
+                return False
+
+            attempts = row[0] or 0
+            history = json.loads(row[1]) if row[1] else []
+            history.append(
+                {
+                    "attempt": attempts + 1,
+                    "at": now_ms(),
+                    "class": failure_class,
+                    "error": error,
+                }
+            )
+            history = json.dumps(history[-ATTEMPT_HISTORY_LIMIT:])
 
-                # Requeue as pending and increment attempts
+            if max_attempts is not None and attempts + 1 >= max_attempts:
+                await db.execute("BEGIN IMMEDIATE")
                 await db.execute(
                     """
-                    UPDATE queue
-                    SET status = 'pending', timestamp = ?, attempts = attempts + 1
-                    WHERE id = ?
+                    INSERT INTO queue_dead_letter (
+                        queue_id, letta_user_id, message_id, priority,
+                        failure_class, last_error, attempts, attempt_history,
+                        enqueued_at, dead_at
+                    )
+                    SELECT id, letta_user_id, message_id, priority, ?, ?,
+                           attempts + 1, ?, enqueued_at, ?
+                    FROM queue WHERE id = ?
                 """,
-                    (datetime.utcnow().isoformat(), queue_id),
+                    (failure_class, error, history, now_ms(), queue_id),
                 )
+                await db.execute("DELETE FROM queue WHERE id = ?", (queue_id,))
                 await db.commit()
-                if max_attempts is None:
-                    logger.info(f"Requeued item {queue_id} (attempt {attempts + 1})")
-                else:
-                    logger.info(
-                        f"Requeued item {queue_id} (attempt {attempts + 1}/{max_attempts})"
-                    )
-                return True
+                logger.warning(
+                    f"Queue item {queue_id} failed {attempts + 1} times "
+                    f"({failure_class}: {error}); moved to dead letters"
+                )
+                return False
+
+            # Requeue as pending, increment attempts and defer the retry
+            delay = min(base_delay * (2**attempts), max_delay)
+            await db.execute(
+                """
+                UPDATE queue
+                SET status = 'pending', timestamp = ?, attempts = attempts + 1,
+                    claimed_at = NULL, lease_owner = NULL, lease_expires_at = NULL,
+                    not_before = ?, last_error = ?, attempt_history = ?
+                WHERE id = ?
+            """,
+                (
+                    datetime.utcnow().isoformat(),
+                    now_ms() + int(delay * 1000),
+                    error,
+                    history,
+                    queue_id,
+                ),
+            )
+            await db.commit()
+            notify_queue_activity()
+            if max_attempts is None:
+                logger.info(
+                    f"Requeued item {queue_id} (attempt {attempts + 1}), "
+                    f"retry in {delay:.0f}s"
+                )
+            else:
+                logger.info(
+                    f"Requeued item {queue_id} (attempt {attempts + 1}/"
+                    f"{max_attempts}), retry in {delay:.0f}s"
+                )
+            return True
 
     try:
         return await exponential_backoff(
@@ -194,13 +835,38 @@ async def requeue_failed_item(queue_id: int, max_attempts: int | None = None) ->
         return False
 
 
+async def next_retry_delay() -> float | None:
+    """Seconds until the earliest deferred pending item becomes claimable.
+
+    Returns:
+        The delay, or None if no pending item is waiting out a retry backoff
+    """
+    now = now_ms()
+    async with get_pool().connection() as db:
+        async with db.execute(
+            """
+            SELECT MIN(not_before) FROM queue
+            WHERE status = 'pending' AND not_before > ?
+        """,
+            (now,),
+        ) as cursor:
+            row = await cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    return (row[0] - now) / 1000
+
+
 async def update_queue_status(
     queue_id: int, status: str, increment_attempt: bool = False
 ) -> QueueItem:
-    """Update the status of a queue item."""
+    """Update the status of a queue item and return the updated row.
+
+    Callers that ignore the result should use set_queue_status, which skips
+    the read-back and shares a commit with concurrent writes.
+    """
     now = datetime.utcnow().isoformat()
 
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         if increment_attempt:
             await db.execute(
                 """
@@ -238,43 +904,102 @@ async def update_queue_status(
             raise ValueError(f"Queue item with ID {queue_id} not found")
 
 
+async def set_queue_status(
+    queue_id: int, status: str, increment_attempt: bool = False, durable: bool = True
+) -> None:
+    """Update the status of a queue item without reading it back.
+
+    The UPDATE goes through the pool's group-commit coalescer; with durable
+    (the default) this returns once it - and every write buffered before it -
+    is committed.
+    """
+    attempts = ", attempts = attempts + 1" if increment_attempt else ""
+    await get_pool().coalescer.execute(
+        f"UPDATE queue SET status = ?, timestamp = ?{attempts} WHERE id = ?",
+        (status, datetime.utcnow().isoformat(), queue_id),
+        durable=durable,
+    )
+
+
 async def requeue_stale_processing_items(max_age_seconds: int = 300) -> int:
-    """Requeue processing items that are older than max_age_seconds."""
-    cutoff = datetime.utcnow().timestamp() - max_age_seconds
+    """Requeue unleased processing items claimed more than max_age_seconds ago.
 
-    async with get_pool().connection() as db:
-        async with db.execute("""
-            SELECT id, timestamp
-            FROM queue
-            WHERE status = 'processing'
-            """) as cursor:
-            rows = await cursor.fetchall()
+    A single range UPDATE on (status, claimed_at); rows claimed before
+    claimed_at existed count as stale. Leased claims are left to
+    reclaim_expired_leases, so a long turn in another live consumer is
+    never requeued under it.
+    """
+    cutoff = now_ms() - max_age_seconds * 1000
 
-        stale_ids = []
-        for row_id, ts in rows:
-            try:
-                if ts:
-                    ts_value = datetime.fromisoformat(ts).timestamp()
-                    if ts_value < cutoff:
-                        stale_ids.append(row_id)
-            except Exception:
-                stale_ids.append(row_id)
-
-        if not stale_ids:
-            return 0
-
-        now = datetime.utcnow().isoformat()
-        await db.executemany(
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute(
             """
             UPDATE queue
-            SET status = 'pending', timestamp = ?
-            WHERE id = ?
+            SET status = 'pending', timestamp = ?, claimed_at = NULL
+            WHERE status = 'processing' AND lease_owner IS NULL
+            AND (claimed_at IS NULL OR claimed_at < ?)
             """,
-            [(now, row_id) for row_id in stale_ids],
+            (datetime.utcnow().isoformat(), cutoff),
         )
+        requeued = cursor.rowcount
         await db.commit()
-        logger.warning(f"Requeued {len(stale_ids)} stale processing items")
-        return len(stale_ids)
+
+    if not requeued:
+        return 0
+    notify_queue_activity()
+    logger.warning(f"Requeued {requeued} stale processing items")
+    return requeued
+
+
+async def renew_leases(
+    lease_owner: str, queue_ids: Iterable[int], lease_seconds: float
+) -> int:
+    """Extend lease_owner's claims on queue_ids (the consumer heartbeat).
+
+    Returns:
+        Number of claims renewed; fewer than requested means a lease was
+        lost (expired and reclaimed) or the item already finished
+    """
+    ids = sorted(set(queue_ids))
+    if not ids:
+        return 0
+    placeholders = ", ".join("?" for _ in ids)
+    renewed = await get_pool().coalescer.execute(
+        f"""
+        UPDATE queue SET lease_expires_at = ?
+        WHERE lease_owner = ? AND status = 'processing' AND id IN ({placeholders})
+        """,
+        (now_ms() + int(lease_seconds * 1000), lease_owner, *ids),
+    )
+    return renewed or 0
+
+
+async def reclaim_expired_leases() -> int:
+    """Return processing items whose lease has expired to pending.
+
+    Their consumer stopped heartbeating (crashed or hung), so any consumer may
+    claim them again.
+
+    Returns:
+        Number of items reclaimed
+    """
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute(
+            """
+            UPDATE queue
+            SET status = 'pending', timestamp = ?, claimed_at = NULL,
+                lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'processing' AND lease_expires_at < ?
+            """,
+            (datetime.utcnow().isoformat(), now_ms()),
+        )
+        reclaimed = cursor.rowcount
+        await db.commit()
+
+    if reclaimed:
+        notify_queue_activity()
+        logger.warning(f"Reclaimed {reclaimed} queue items with expired leases")
+    return reclaimed
 
 
 async def get_all_queue_items() -> list[dict[str, Any]]:
@@ -290,7 +1015,7 @@ async def get_all_queue_items() -> list[dict[str, Any]]:
             LEFT JOIN platform_profiles pp ON q.letta_user_id = pp.letta_user_id
             LEFT JOIN messages m ON q.message_id = m.id
             WHERE q.status IN ('pending', 'processing', 'failed')
-            ORDER BY q.timestamp DESC
+            ORDER BY q.enqueued_at DESC, q.id DESC
         """) as cursor:
             rows = await cursor.fetchall()
             return [
@@ -313,15 +1038,18 @@ async def get_all_queue_items() -> list[dict[str, Any]]:
 async def get_queue_statistics() -> dict[str, int]:
     """Get queue statistics by status.
 
+    Reads the trigger-maintained stats_counters rows instead of scanning the
+    queue (see reconcile_stats_counters to repair drift).
+
     Returns:
         Dictionary with counts for each status
     """
     async with get_pool().connection() as db:
         async with db.execute("""
-            SELECT status, COUNT(*) as count
-            FROM queue
-            WHERE status IN ('pending', 'processing', 'failed', 'completed', 'flushed')
-            GROUP BY status
+            SELECT substr(name, 7) AS status, value
+            FROM stats_counters
+            WHERE name IN ('queue:pending', 'queue:processing', 'queue:failed',
+                           'queue:completed', 'queue:flushed')
         """) as cursor:
             rows = await cursor.fetchall()
             stats = {row[0]: row[1] for row in rows}
@@ -337,7 +1065,7 @@ async def get_queue_statistics() -> dict[str, int]:
 
 async def flush_all_queue_items(current_mode: str) -> bool:
     """Flush all queue items for the current mode."""
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         try:
             await db.execute("""
                 UPDATE queue
@@ -353,7 +1081,7 @@ async def flush_all_queue_items(current_mode: str) -> bool:
 
 async def delete_queue_item(queue_id: int) -> bool:
     """Delete a specific queue item."""
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         try:
             await db.execute("DELETE FROM queue WHERE id = ?", (queue_id,))
             await db.commit()
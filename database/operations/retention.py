@@ -0,0 +1,325 @@
+"""Retention: move terminal queue rows and old messages into archive tables.
+
+Archived rows go to ``queue_archive`` / ``messages_archive``, either in the
+main database or in a separate SQLite file (attached as ``archive``). Rows
+are moved in bounded batches, one short write transaction each, so the
+queue processor is never blocked for long.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+from common.config import RetentionConfig
+
+from ..pool import get_pool
+from .shared import now_ms
+
+logger = logging.getLogger(__name__)
+
+# Queue statuses that never change again and can be archived
+ARCHIVABLE_QUEUE_STATUSES = ("completed", "flushed")
+
+_ARCHIVE_SCHEMA = "archive"
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@dataclass
+class RetentionResult:
+    """Rows moved (and pages vacuumed) by one retention run."""
+
+    queue_archived: int = 0
+    messages_archived: int = 0
+    outbox_purged: int = 0
+    vacuumed_pages: int = 0
+
+
+async def _attach_archive(db: aiosqlite.Connection, archive_path: str | None) -> str:
+    """Attach the archive file if configured; return the schema to archive into."""
+    if not archive_path:
+        return "main"
+    async with db.execute("PRAGMA database_list") as cursor:
+        attached = {row[1] for row in await cursor.fetchall()}
+    if _ARCHIVE_SCHEMA not in attached:
+        await db.execute(f"ATTACH DATABASE ? AS {_ARCHIVE_SCHEMA}", (archive_path,))
+    return _ARCHIVE_SCHEMA
+
+
+async def _detach_archive(db: aiosqlite.Connection, schema: str) -> None:
+    """Detach the archive file attached by _attach_archive."""
+    if schema == _ARCHIVE_SCHEMA:
+        await db.execute(f"DETACH DATABASE {_ARCHIVE_SCHEMA}")
+
+
+async def _table_columns(db: aiosqlite.Connection, schema: str, table: str) -> list:
+    """Column names of schema.table (empty if it does not exist)."""
+    async with db.execute(f"PRAGMA {schema}.table_info({table})") as cursor:
+        return [row[1] for row in await cursor.fetchall()]
+
+
+async def _ensure_archive_table(
+    db: aiosqlite.Connection, schema: str, table: str
+) -> list[str]:
+    """Create or widen schema.<table>_archive to match the live table.
+
+    The archive copies the live table's columns (without constraints) plus
+    archived_at, and picks up columns added by later migrations.
+
+    Returns:
+        The live table's columns, in order
+    """
+    archive = f"{table}_archive"
+    columns = await _table_columns(db, "main", table)
+    if not all(_IDENTIFIER.match(col) for col in columns):
+        raise ValueError(f"Unexpected column name in {table}")
+
+    archive_columns = await _table_columns(db, schema, archive)
+    if not archive_columns:
+        await db.execute(
+            f"CREATE TABLE {schema}.{archive} AS SELECT * FROM main.{table} WHERE 0"
+        )
+        await db.execute(f"ALTER TABLE {schema}.{archive} ADD COLUMN archived_at TEXT")
+        await db.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_{archive}_id ON {archive} (id)"
+        )
+    else:
+        for col in columns:
+            if col not in archive_columns:
+                await db.execute(f"ALTER TABLE {schema}.{archive} ADD COLUMN {col}")
+    return columns
+
+
+async def _archive_batch(
+    table: str,
+    select_ids_sql: str,
+    params: tuple,
+    batch_size: int,
+    archive_path: str | None,
+) -> int:
+    """Move one batch of rows from table to its archive table.
+
+    Args:
+        table: Live table name
+        select_ids_sql: SELECT of the candidate row ids, without LIMIT
+        params: Parameters for select_ids_sql
+        batch_size: Maximum rows to move
+        archive_path: Separate archive file, or None for the main database
+
+    Returns:
+        Number of rows moved
+    """
+    async with get_pool().write_connection() as db:
+        schema = await _attach_archive(db, archive_path)
+        try:
+            columns = await _ensure_archive_table(db, schema, table)
+            async with db.execute(
+                f"{select_ids_sql} LIMIT ?", (*params, batch_size)
+            ) as cursor:
+                ids = [row[0] for row in await cursor.fetchall()]
+            if not ids:
+                await db.commit()
+                return 0
+
+            column_list = ", ".join(columns)
+            placeholders = ", ".join("?" for _ in ids)
+            now = datetime.utcnow().isoformat()
+            await db.execute(
+                f"""
+                INSERT INTO {schema}.{table}_archive ({column_list}, archived_at)
+                SELECT {column_list}, ? FROM main.{table}
+                WHERE id IN ({placeholders})
+                """,
+                (now, *ids),
+            )
+            await db.execute(
+                f"DELETE FROM main.{table} WHERE id IN ({placeholders})", ids
+            )
+            await db.commit()
+            return len(ids)
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            await _detach_archive(db, schema)
+
+
+async def archive_queue_items(
+    older_than: timedelta,
+    batch_size: int = 500,
+    archive_path: str | None = None,
+    max_batches: int | None = None,
+) -> int:
+    """Archive completed/flushed queue rows enqueued before now - older_than.
+
+    Returns:
+        Number of queue rows archived
+    """
+    cutoff = now_ms() - int(older_than.total_seconds() * 1000)
+    statuses = ", ".join(f"'{status}'" for status in ARCHIVABLE_QUEUE_STATUSES)
+    select_ids = f"""
+        SELECT id FROM main.queue
+        WHERE status IN ({statuses}) AND enqueued_at < ?
+        ORDER BY id
+    """
+    return await _archive_all(
+        "queue", select_ids, (cutoff,), batch_size, archive_path, max_batches
+    )
+
+
+async def archive_messages(
+    older_than: timedelta,
+    batch_size: int = 500,
+    archive_path: str | None = None,
+    max_batches: int | None = None,
+) -> int:
+    """Archive messages older than now - older_than that no queue row references.
+
+    Returns:
+        Number of messages archived
+    """
+    cutoff = now_ms() - int(older_than.total_seconds() * 1000)
+    select_ids = """
+        SELECT m.id FROM main.messages m
+        WHERE m.received_at < ?
+          AND NOT EXISTS (SELECT 1 FROM main.queue q WHERE q.message_id = m.id)
+          AND NOT EXISTS (
+              SELECT 1 FROM main.queue_dead_letter d WHERE d.message_id = m.id
+          )
+          AND NOT EXISTS (SELECT 1 FROM main.outbox o WHERE o.message_id = m.id)
+        ORDER BY m.id
+    """
+    return await _archive_all(
+        "messages", select_ids, (cutoff,), batch_size, archive_path, max_batches
+    )
+
+
+async def purge_delivered_outbox(
+    older_than: timedelta,
+    batch_size: int = 500,
+    max_batches: int | None = None,
+) -> int:
+    """Delete outbox rows delivered before now - older_than.
+
+    The responses are kept on their messages (agent_response), so delivered
+    rows are deleted rather than archived. Failed rows stay for inspection.
+
+    Returns:
+        Number of outbox rows deleted
+    """
+    cutoff = now_ms() - int(older_than.total_seconds() * 1000)
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        async with get_pool().write_connection() as db:
+            cursor = await db.execute(
+                """
+                DELETE FROM outbox WHERE id IN (
+                    SELECT id FROM outbox
+                    WHERE status = 'delivered' AND delivered_at < ?
+                    ORDER BY id LIMIT ?
+                )
+            """,
+                (cutoff, batch_size),
+            )
+            deleted = cursor.rowcount
+            await db.commit()
+        total += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+    if total:
+        logger.info(f"Purged {total} delivered outbox rows")
+    return total
+
+
+async def _archive_all(
+    table: str,
+    select_ids_sql: str,
+    params: tuple,
+    batch_size: int,
+    archive_path: str | None,
+    max_batches: int | None,
+) -> int:
+    """Run _archive_batch until nothing is left (or max_batches is reached)."""
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = await _archive_batch(
+            table, select_ids_sql, params, batch_size, archive_path
+        )
+        total += moved
+        batches += 1
+        if moved < batch_size:
+            break
+    if total:
+        logger.info(f"Archived {total} rows from {table}")
+    return total
+
+
+async def incremental_vacuum(max_pages: int) -> int:
+    """Return up to max_pages free pages to the OS.
+
+    Only has an effect when the database uses auto_vacuum=INCREMENTAL (new
+    databases do; existing ones need one full VACUUM, e.g. qtool archive
+    --vacuum).
+
+    Returns:
+        Number of free pages released
+    """
+    if max_pages <= 0:
+        return 0
+    async with get_pool().write_connection() as db:
+        async with db.execute("PRAGMA auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode != 2:  # 2 = INCREMENTAL
+            return 0
+        async with db.execute("PRAGMA freelist_count") as cursor:
+            before = (await cursor.fetchone())[0]
+        async with db.execute(f"PRAGMA incremental_vacuum({int(max_pages)})") as cursor:
+            await cursor.fetchall()
+        async with db.execute("PRAGMA freelist_count") as cursor:
+            after = (await cursor.fetchone())[0]
+    return before - after
+
+
+async def full_vacuum() -> None:
+    """Rebuild the database file, switching it to auto_vacuum=INCREMENTAL.
+
+    Rewrites the whole file; run it from the CLI during quiet periods.
+    """
+    async with get_pool().write_connection() as db:
+        await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await db.execute("VACUUM")
+
+
+async def run_retention(config: RetentionConfig | None = None) -> RetentionResult:
+    """Archive terminal queue rows, then unreferenced old messages, then vacuum.
+
+    Queue rows and delivered outbox rows go first so the messages they
+    pointed at become archivable in the same run. Used by both the background
+    job and ``qtool archive``.
+
+    Args:
+        config: Retention settings (defaults to RetentionConfig())
+    """
+    config = config or RetentionConfig()
+    result = RetentionResult()
+    result.queue_archived = await archive_queue_items(
+        timedelta(hours=config.queue_retention_hours),
+        config.batch_size,
+        config.archive_path,
+    )
+    result.outbox_purged = await purge_delivered_outbox(
+        timedelta(hours=config.queue_retention_hours), config.batch_size
+    )
+    result.messages_archived = await archive_messages(
+        timedelta(days=config.message_retention_days),
+        config.batch_size,
+        config.archive_path,
+    )
+    if result.queue_archived or result.messages_archived or result.outbox_purged:
+        result.vacuumed_pages = await incremental_vacuum(config.vacuum_pages)
+    return result
@@ -2,10 +2,12 @@
 
 import logging
 import os
+import re
+import time
 
 import aiosqlite
 
-from ..models import SCHEMA
+from ..models import MIGRATIONS, SCHEMA
 from ..pool import get_pool
 
 # Whitelist of valid table names for SQL injection prevention
@@ -35,6 +37,11 @@ def validate_table_name(table_name: str) -> str:
     return table_name
 
 
+def now_ms() -> int:
+    """Current time as integer epoch milliseconds (enqueued_at, claimed_at...)."""
+    return time.time_ns() // 1_000_000
+
+
 def get_db_path() -> str:
     """Get the database path, respecting environment variables and test environment.
 
@@ -76,6 +83,9 @@ async def initialize_database():
         async with aiosqlite.connect(get_db_path()) as db:
             # Enable foreign keys
             await db.execute("PRAGMA foreign_keys = ON")
+            # Lets retention hand freed pages back with incremental_vacuum;
+            # only takes effect on a new (empty) database file
+            await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
             # Create tables if they don't exist
             for table_name, create_sql in SCHEMA.items():
@@ -87,6 +97,7 @@ async def initialize_database():
                     raise
 
             await db.commit()
+            await apply_migrations(db)
             logger.info("Database initialization completed successfully")
 
     except Exception as e:
@@ -94,9 +105,80 @@ async def initialize_database():
         raise
 
 
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """Return the highest applied migration version (0 if none)."""
+    async with db.execute("SELECT MAX(version) FROM schema_version") as cursor:
+        row = await cursor.fetchone()
+        return row[0] if row and row[0] is not None else 0
+
+
+_ADD_COLUMN = re.compile(
+    r"^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)", re.IGNORECASE
+)
+
+
+async def _column_already_added(db: aiosqlite.Connection, statement: str) -> bool:
+    """True if statement is an ALTER TABLE ... ADD COLUMN whose column exists.
+
+    SQLite has no ADD COLUMN IF NOT EXISTS; this keeps column migrations
+    re-runnable on databases that predate schema_version.
+    """
+    match = _ADD_COLUMN.match(statement)
+    if not match:
+        return False
+    table, column = match.groups()
+    async with db.execute(f"PRAGMA table_info({validate_table_name(table)})") as cur:
+        return column in {row[1] for row in await cur.fetchall()}
+
+
+async def apply_migrations(db: aiosqlite.Connection) -> int:
+    """Apply pending MIGRATIONS in order, one transaction per version.
+
+    Each version is applied under BEGIN IMMEDIATE and re-checked inside the
+    transaction, so concurrent starters (main process, CLI tools) never apply
+    the same migration twice.
+
+    Args:
+        db: Open connection; base tables from SCHEMA must already exist
+
+    Returns:
+        The schema version after applying migrations
+    """
+    await db.execute(SCHEMA["schema_version"])
+    await db.commit()
+
+    version = await get_schema_version(db)
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            if await get_schema_version(db) >= target:
+                await db.execute("ROLLBACK")
+                continue
+            for statement in statements:
+                if await _column_already_added(db, statement):
+                    continue
+                await db.execute(statement)
+            await db.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (target, description),
+            )
+            await db.execute("COMMIT")
+        except Exception as e:
+            await db.execute("ROLLBACK")
+            logger.error(f"Migration {target} ({description}) failed: {str(e)}")
+            raise
+        logger.info(f"Applied schema migration {target}: {description}")
+        version = target
+
+    return version
+
+
 async def check_and_migrate_db():
     """Check and migrate the database schema if needed."""
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         # Check if all tables exist
         for table_name in SCHEMA.keys():
             try:
@@ -109,27 +191,22 @@ async def check_and_migrate_db():
 
         await db.commit()
 
+        # Bring the schema up to the latest version
+        await apply_migrations(db)
+
 
 async def get_dashboard_stats() -> dict:
-    """Get statistics for the dashboard."""
+    """Get statistics for the dashboard from the stats_counters table."""
     async with get_pool().connection() as db:
-        stats = {}
-
-        # Get user count
-        async with db.execute("SELECT COUNT(*) FROM letta_users") as cursor:
-            stats["user_count"] = (await cursor.fetchone())[0]
-
-        # Get message count
-        async with db.execute("SELECT COUNT(*) FROM messages") as cursor:
-            stats["message_count"] = (await cursor.fetchone())[0]
-
-        # Get queue stats
-        async with db.execute("""
-            SELECT status, COUNT(*)
-            FROM queue
-            GROUP BY status
-        """) as cursor:
-            queue_stats = await cursor.fetchall()
-            stats["queue_stats"] = {row[0]: row[1] for row in queue_stats}
-
-        return stats
+        async with db.execute("SELECT name, value FROM stats_counters") as cursor:
+            counters = {row[0]: row[1] for row in await cursor.fetchall()}
+
+    return {
+        "user_count": counters.get("letta_users", 0),
+        "message_count": counters.get("messages", 0),
+        "queue_stats": {
+            name[len("queue:") :]: value
+            for name, value in counters.items()
+            if name.startswith("queue:") and value
+        },
+    }
@@ -0,0 +1,37 @@
+"""Trigger-maintained row counters (stats_counters) and their reconciliation."""
+
+import logging
+
+from ..models import STATS_COUNTER_RECONCILE
+from ..pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+async def get_stats_counters() -> dict[str, int]:
+    """Return all counters: 'letta_users', 'messages' and 'queue:<status>'."""
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT name, value FROM stats_counters") as cursor:
+            return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def reconcile_stats_counters() -> dict[str, int]:
+    """Recompute every counter from the tables, fixing any drift.
+
+    Runs as one write transaction, so concurrent writers wait and the
+    counters match the tables when it commits.
+
+    Returns:
+        The reconciled counters
+    """
+    async with get_pool().write_connection() as db:
+        try:
+            for statement in STATS_COUNTER_RECONCILE:
+                await db.execute(statement)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    counters = await get_stats_counters()
+    logger.info(f"Reconciled stats counters: {counters}")
+    return counters
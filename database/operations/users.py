@@ -1,16 +1,24 @@
 """User-related database operations (get_or_create_user, platform lookup, etc)."""
 
-import asyncio
 import json
 import logging
-import uuid
+import sqlite3
 from datetime import datetime
 from typing import Any
 
+import aiosqlite
+
 from runtime.core.letta_client import get_letta_client
 
 from ..models import LettaUser, PlatformProfile
 from ..pool import get_pool
+from .provisioning import (
+    PROVISION_FAILED,
+    PROVISION_PENDING,
+    acquire_letta_resources,
+    schedule_provisioning,
+)
+from .shared import now_ms
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -19,60 +27,27 @@ logger = logging.getLogger(__name__)
 async def get_or_create_letta_user(
     username: str = None, display_name: str = None, platform_user_id: str = None
 ) -> LettaUser:
-    """Create a new Letta user with default settings and associated Letta identity."""
+    """Create a new Letta user with default settings and associated Letta identity.
+
+    Claims an identity and core block from the warm pool, or creates them
+    concurrently, and waits for them; the ingest path uses
+    get_or_create_platform_profile, which provisions in the background instead.
+    """
     now = datetime.utcnow().isoformat()
 
     try:
         # Get the singleton Letta client
         client = get_letta_client()
 
-        # Parse name components
-        name_parts = (display_name or username or "Unknown User").split()
-        first_name = name_parts[0]
-        last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else None
-
-        # 1. Create Letta identity (SDK 1.7.x has no top-level identities; we use create_identity)
-        unique_id = str(uuid.uuid4())[:8]
-        identity_data = {
-            "identifier_key": f"broca_user_{unique_id}",
-            "name": display_name or username or f"Unknown User {platform_user_id}",
-            "identity_type": "user",
-        }
-        identity = await client.create_identity(**identity_data)
-
-        # 2. Create core block with standardized format
-        block_content = []
-        if first_name and last_name:
-            block_content.append(f"About Me ({first_name}, {last_name})")
-        elif first_name:
-            block_content.append(f"About Me ({first_name})")
-        else:
-            block_content.append(f"About Me ({username or 'Unknown User'})")
-
-        block_content.append(f"This user's Telegram ID is: {platform_user_id}")
-        if username:
-            block_content.append(f"This user's Telegram Username is: {username}")
-
-        block_data = {
-            "label": "human",  # Always use "human" as the label
-            "value": json.dumps(
-                {
-                    "type": "human_core",
-                    "data": {
-                        "name": display_name
-                        or username
-                        or f"Unknown User {platform_user_id}",
-                        "created_at": now,
-                        "content": "\n".join(block_content),
-                    },
-                }
-            ),
-        }
-        # Sync SDK call run in thread to avoid blocking the event loop
-        block = await asyncio.to_thread(client.blocks.create, **block_data)
+        # 1. Claim or create Letta identity and core block
+        identity_id, block_id, error = await acquire_letta_resources(
+            client, username, display_name, platform_user_id
+        )
+        if error is not None:
+            raise error
 
-        # 3. Create user record with Letta identity ID and block ID
-        async with get_pool().connection() as db:
+        # 2. Create user record with Letta identity ID and block ID
+        async with get_pool().write_connection() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO letta_users (
@@ -85,7 +60,7 @@ async def get_or_create_letta_user(
                     is_active
                 ) VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-                (now, now, identity.id, block.id, None, None, True),
+                (now, now, identity_id, block_id, None, None, True),
             )
             await db.commit()
 
@@ -94,8 +69,8 @@ async def get_or_create_letta_user(
                 id=user_id,
                 created_at=now,
                 last_active=now,
-                letta_identity_id=identity.id,
-                letta_block_id=block.id,
+                letta_identity_id=identity_id,
+                letta_block_id=block_id,
                 agent_preferences=None,
                 custom_instructions=None,
                 is_active=True,
@@ -106,6 +81,42 @@ async def get_or_create_letta_user(
         raise
 
 
+_PROFILE_SELECT = """
+    SELECT p.id, p.letta_user_id, p.platform, p.platform_user_id,
+           p.username, p.display_name, p.metadata, p.created_at,
+           p.last_active, u.id, u.created_at, u.last_active,
+           u.letta_identity_id, u.letta_block_id, u.agent_preferences,
+           u.custom_instructions, u.is_active, u.provision_status
+    FROM platform_profiles p
+    LEFT JOIN letta_users u ON u.id = p.letta_user_id
+    WHERE p.platform = ? AND p.platform_user_id = ?
+"""
+
+
+async def _select_profile(
+    db: aiosqlite.Connection, platform: str, platform_user_id: str
+) -> tuple[PlatformProfile, LettaUser] | None:
+    """Read a platform profile and its Letta user with one JOIN on db."""
+    async with db.execute(_PROFILE_SELECT, (platform, platform_user_id)) as cursor:
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    return (
+        PlatformProfile(*row[:9]),
+        LettaUser(
+            id=row[9],
+            created_at=row[10],
+            last_active=row[11],
+            letta_identity_id=row[12],
+            letta_block_id=row[13],
+            agent_preferences=row[14],
+            custom_instructions=row[15],
+            is_active=bool(row[16]),
+            provision_status=row[17],
+        ),
+    )
+
+
 async def get_or_create_platform_profile(
     platform: str,
     platform_user_id: str,
@@ -113,67 +124,105 @@ async def get_or_create_platform_profile(
     display_name: str,
     metadata: dict[str, Any] | None = None,
 ) -> tuple[PlatformProfile, LettaUser]:
-    """Get or create a platform profile and its associated Letta user."""
+    """Get or create a platform profile and its associated Letta user.
+
+    Known users are served from the pool's profile cache. Changed username,
+    display name or metadata are written through; otherwise only last_active
+    is bumped, and that write is batched by the cache (see ProfileCache).
+
+    A first-time user is stored with provision_status 'pending' and returned
+    without waiting on Letta: the identity and core block are created in the
+    background (see provisioning.py), and the user's queued messages are
+    claimed once that finishes. A user whose provisioning failed is retried.
+    """
     now = datetime.utcnow().isoformat()
     metadata_json = json.dumps(metadata) if metadata else None
+    cache = get_pool().profile_cache
 
-    async with get_pool().connection() as db:
-        # Check if profile exists
-        async with db.execute(
-            "SELECT * FROM platform_profiles WHERE platform = ? AND platform_user_id = ?",
-            (platform, platform_user_id),
-        ) as cursor:
-            profile_row = await cursor.fetchone()
-
-            if profile_row:
-                # Update existing profile
-                await db.execute(
-                    """
-                    UPDATE platform_profiles
-                    SET username = ?, display_name = ?, metadata = ?, last_active = ?
-                    WHERE id = ?
-                """,
-                    (username, display_name, metadata_json, now, profile_row[0]),
-                )
-                await db.commit()
-
-                # Get associated Letta user
-                async with db.execute(
-                    "SELECT * FROM letta_users WHERE id = ?",
-                    (profile_row[1],),  # letta_user_id
-                ) as user_cursor:
-                    user_row = await user_cursor.fetchone()
-                    letta_user = LettaUser(
-                        id=user_row[0],
-                        created_at=user_row[1],
-                        last_active=user_row[2],
-                        letta_identity_id=user_row[3],
-                        agent_preferences=user_row[4],
-                        custom_instructions=user_row[5],
-                        is_active=bool(user_row[6]),
-                    )
-
-                profile = PlatformProfile(
-                    id=profile_row[0],
-                    letta_user_id=profile_row[1],
-                    platform=profile_row[2],
-                    platform_user_id=profile_row[3],
-                    username=username,
-                    display_name=display_name,
-                    metadata=metadata_json,
-                    created_at=profile_row[7],
-                    last_active=now,
-                )
+    cached = cache.get(platform, platform_user_id)
+    if cached is None:
+        async with get_pool().connection() as db:
+            cached = await _select_profile(db, platform, platform_user_id)
 
-                return profile, letta_user
+    if cached is None:
+        cached = await _create_pending_profile(
+            platform, platform_user_id, username, display_name, metadata_json, now
+        )
+        if cached is not None:
+            profile, letta_user = cached
+            schedule_provisioning(
+                platform, platform_user_id, letta_user.id, username, display_name
+            )
+            cache.put(profile, letta_user)
+            return profile, letta_user
+        # Lost the race to a concurrent first message; use the winner's rows
+        async with get_pool().connection() as db:
+            cached = await _select_profile(db, platform, platform_user_id)
 
-            # Create new Letta user and profile
-            letta_user = await get_or_create_letta_user(
-                username=username,
-                display_name=display_name,
-                platform_user_id=platform_user_id,
+    profile, letta_user = cached
+    if letta_user.provision_status == PROVISION_FAILED:
+        schedule_provisioning(
+            platform, platform_user_id, letta_user.id, username, display_name
+        )
+    if (profile.username, profile.display_name, profile.metadata) == (
+        username,
+        display_name,
+        metadata_json,
+    ):
+        cache.touch(profile.id, now)
+        if cache.flush_due():
+            await cache.flush()
+    else:
+        # Write changed fields (and last_active) through
+        async with get_pool().write_connection() as db:
+            await db.execute(
+                """
+                UPDATE platform_profiles
+                SET username = ?, display_name = ?, metadata = ?,
+                    last_active = ?
+                WHERE id = ?
+            """,
+                (username, display_name, metadata_json, now, profile.id),
             )
+            await db.commit()
+        cache.discard_touch(profile.id)
+        profile.username = username
+        profile.display_name = display_name
+        profile.metadata = metadata_json
+    profile.last_active = now
+    cache.put(profile, letta_user)
+    return profile, letta_user
+
+
+async def _create_pending_profile(
+    platform: str,
+    platform_user_id: str,
+    username: str,
+    display_name: str,
+    metadata_json: str | None,
+    now: str,
+) -> tuple[PlatformProfile, LettaUser] | None:
+    """Insert a pending Letta user and its profile in one write transaction.
 
+    Returns:
+        The new rows, or None if the profile already exists (created by a
+        concurrent caller since the read)
+    """
+    async with get_pool().write_connection() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        if await _select_profile(db, platform, platform_user_id) is not None:
+            await db.rollback()
+            return None
+        try:
+            cursor = await db.execute(
+                """
+                INSERT INTO letta_users (
+                    created_at, last_active, is_active, provision_status
+                ) VALUES (?, ?, ?, ?)
+            """,
+                (now, now, True, PROVISION_PENDING),
+            )
+            letta_user_id = cursor.lastrowid
             cursor = await db.execute(
                 """
                 INSERT INTO platform_profiles (
@@ -188,7 +237,7 @@ async def get_or_create_platform_profile(
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
                 (
-                    letta_user.id,
+                    letta_user_id,
                     platform,
                     platform_user_id,
                     username,
@@ -198,21 +247,31 @@ async def get_or_create_platform_profile(
                     now,
                 ),
             )
-            await db.commit()
-
-            profile = PlatformProfile(
-                id=cursor.lastrowid,
-                letta_user_id=letta_user.id,
-                platform=platform,
-                platform_user_id=platform_user_id,
-                username=username,
-                display_name=display_name,
-                metadata=metadata_json,
-                created_at=now,
-                last_active=now,
-            )
+        except sqlite3.IntegrityError:
+            # Another process inserted the profile first
+            await db.rollback()
+            return None
+        await db.commit()
 
-            return profile, letta_user
+    return (
+        PlatformProfile(
+            id=cursor.lastrowid,
+            letta_user_id=letta_user_id,
+            platform=platform,
+            platform_user_id=platform_user_id,
+            username=username,
+            display_name=display_name,
+            metadata=metadata_json,
+            created_at=now,
+            last_active=now,
+        ),
+        LettaUser(
+            id=letta_user_id,
+            created_at=now,
+            last_active=now,
+            provision_status=PROVISION_PENDING,
+        ),
+    )
 
 
 async def update_letta_user(
@@ -249,7 +308,7 @@ async def update_letta_user(
     if not updates:
         raise ValueError("No updates specified")
 
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         query = f"""
             UPDATE letta_users
             SET {', '.join(updates)}
@@ -264,6 +323,7 @@ async def update_letta_user(
                 raise ValueError(f"User with ID {user_id} not found")
 
             await db.commit()
+            get_pool().profile_cache.invalidate_user(user_id)
             return LettaUser(
                 id=row[0],
                 created_at=row[1],
@@ -400,10 +460,47 @@ async def get_letta_user_block_id(letta_user_id: int) -> str | None:
             return None
 
 
+async def get_user_blocks(
+    recent_seconds: float = 0.0,
+) -> list[tuple[int, str, bool]]:
+    """Every user core block, for reconciling against Letta.
+
+    Args:
+        recent_seconds: Also count a user as busy when one of their completed
+            queue items was claimed, or still held its lease, this recently,
+            by any consumer; that consumer may still keep the block attached
+            for the user's next turn
+
+    Returns:
+        (letta_user_id, letta_block_id, busy) per user with a block; busy is
+        True while one of the user's queue items is being processed or one
+        was claimed or leased within recent_seconds
+    """
+    cutoff = now_ms() - int(recent_seconds * 1000)
+    async with get_pool().connection() as db:
+        # One pass over the (status, claimed_at) and (status, lease_expires_at)
+        # indexes instead of a per-user subquery
+        async with db.execute(
+            """
+            SELECT DISTINCT letta_user_id FROM queue
+            WHERE status = 'processing'
+                OR (status = 'completed' AND claimed_at >= ?)
+                OR (status = 'completed' AND lease_expires_at >= ?)
+        """,
+            (cutoff, cutoff),
+        ) as cursor:
+            busy = {row[0] for row in await cursor.fetchall()}
+        async with db.execute(
+            "SELECT id, letta_block_id FROM letta_users "
+            "WHERE letta_block_id IS NOT NULL"
+        ) as cursor:
+            return [(row[0], row[1], row[0] in busy) for row in await cursor.fetchall()]
+
+
 async def upsert_user(user_id: int, username: str, first_name: str) -> None:
     """Upsert a user's details."""
     now = datetime.utcnow().isoformat()
-    async with get_pool().connection() as db:
+    async with get_pool().write_connection() as db:
         await db.execute(
             """
             INSERT INTO platform_profiles (
@@ -418,3 +515,4 @@ async def upsert_user(user_id: int, username: str, first_name: str) -> None:
             (user_id, str(user_id), username, first_name, now, now),
         )
         await db.commit()
+    get_pool().profile_cache.invalidate("telegram", str(user_id))
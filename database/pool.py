@@ -4,9 +4,15 @@ import asyncio
 import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from typing import Any
 
 import aiosqlite
 
+from common.config import DatabasePoolConfig
+
+from .coalescer import WriteCoalescer
+from .profile_cache import ProfileCache
+
 logger = logging.getLogger(__name__)
 
 # Global pool instance
@@ -28,12 +34,26 @@ def get_pool() -> "ConnectionPool":
     return _pool
 
 
-def initialize_pool(pool_size: int = 5, max_overflow: int = 10) -> "ConnectionPool":
+def initialize_pool(
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pragmas: dict[str, Any] | None = None,
+    write_coalesce_ms: float = 2.0,
+    write_coalesce_max_batch: int = 100,
+    profile_cache_size: int = 1024,
+    profile_flush_interval: float = 30.0,
+) -> "ConnectionPool":
     """Initialize the global connection pool.
 
     Args:
         pool_size: Number of connections to maintain in pool
         max_overflow: Maximum additional connections beyond pool_size
+        pragmas: PRAGMA name -> value applied to every connection
+            (defaults to DatabasePoolConfig().pragmas())
+        write_coalesce_ms: Group-commit window of the write coalescer
+        write_coalesce_max_batch: Writes that trigger an immediate group commit
+        profile_cache_size: Platform profiles kept in the profile cache
+        profile_flush_interval: Seconds between batched last_active writes
 
     Returns:
         ConnectionPool: The initialized connection pool
@@ -43,27 +63,70 @@ def initialize_pool(pool_size: int = 5, max_overflow: int = 10) -> "ConnectionPo
         logger.warning("Connection pool already initialized")
         return _pool
 
-    _pool = ConnectionPool(pool_size=pool_size, max_overflow=max_overflow)
+    _pool = ConnectionPool(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pragmas=pragmas,
+        write_coalesce_ms=write_coalesce_ms,
+        write_coalesce_max_batch=write_coalesce_max_batch,
+        profile_cache_size=profile_cache_size,
+        profile_flush_interval=profile_flush_interval,
+    )
     return _pool
 
 
 class ConnectionPool:
-    """Connection pool for aiosqlite connections."""
+    """Connection pool for aiosqlite connections.
 
-    def __init__(self, pool_size: int = 5, max_overflow: int = 10):
+    Reads fan out across the pooled connections; writes go through a single
+    dedicated writer connection (see write_connection()) so they queue on an
+    asyncio lock instead of contending for SQLite's file lock. Small writes
+    that do not need their own transaction can share one via coalescer.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pragmas: dict[str, Any] | None = None,
+        write_coalesce_ms: float = 2.0,
+        write_coalesce_max_batch: int = 100,
+        profile_cache_size: int = 1024,
+        profile_flush_interval: float = 30.0,
+    ):
         """Initialize connection pool.
 
         Args:
             pool_size: Number of connections to maintain in pool
             max_overflow: Maximum additional connections beyond pool_size
+            pragmas: PRAGMA name -> value applied to every connection
+                (defaults to DatabasePoolConfig().pragmas())
+            write_coalesce_ms: Group-commit window of the write coalescer
+            write_coalesce_max_batch: Writes that trigger an immediate group commit
+            profile_cache_size: Platform profiles kept in the profile cache
+            profile_flush_interval: Seconds between batched last_active writes
         """
         self.pool_size = pool_size
         self.max_overflow = max_overflow
+        self.pragmas = dict(
+            DatabasePoolConfig().pragmas() if pragmas is None else pragmas
+        )
+        for name, value in self.pragmas.items():
+            if not name.isidentifier() or not str(value).lstrip("-").isalnum():
+                raise ValueError(f"Invalid PRAGMA setting: {name}={value!r}")
         self._pool: asyncio.Queue[aiosqlite.Connection] | None = (
             None  # Created in event loop
         )
         self._created = 0
         self._lock: asyncio.Lock | None = None  # Created in event loop
+        self._writer: aiosqlite.Connection | None = None  # Created on first write
+        self._write_lock: asyncio.Lock | None = None  # Created in event loop
+        self._coalescer = WriteCoalescer(
+            self, window_ms=write_coalesce_ms, max_batch=write_coalesce_max_batch
+        )
+        self._profile_cache = ProfileCache(
+            self, max_size=profile_cache_size, flush_interval=profile_flush_interval
+        )
         self._closed = False
 
     async def _create_connection(self) -> aiosqlite.Connection:
@@ -73,6 +136,10 @@ class ConnectionPool:
 
         db_path = get_db_path()
         conn = await aiosqlite.connect(db_path)
+        # busy_timeout first so a journal_mode switch waits out other writers
+        pragmas = sorted(self.pragmas.items(), key=lambda kv: kv[0] != "busy_timeout")
+        for name, value in pragmas:
+            await conn.execute(f"PRAGMA {name} = {value}")
         await conn.execute("PRAGMA foreign_keys = ON")
         return conn
 
@@ -81,6 +148,7 @@ class ConnectionPool:
         if self._pool is None:
             self._pool = asyncio.Queue(maxsize=self.pool_size)
             self._lock = asyncio.Lock()
+            self._write_lock = asyncio.Lock()
 
     @asynccontextmanager
     async def connection(self) -> AsyncGenerator[aiosqlite.Connection, None]:
@@ -138,9 +206,50 @@ class ConnectionPool:
                     async with self._lock:
                         self._created -= 1
 
+    @asynccontextmanager
+    async def write_connection(self) -> AsyncGenerator[aiosqlite.Connection, None]:
+        """Get the dedicated writer connection, serialized across tasks.
+
+        Callers must commit before leaving the block; an open transaction is
+        rolled back so the next writer starts clean. Do not nest
+        write_connection() within one task - it would wait on itself.
+
+        Yields:
+            aiosqlite.Connection: The writer connection
+        """
+        self._ensure_loop_objects()
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        async with self._write_lock:
+            if self._writer is None:
+                self._writer = await self._create_connection()
+                logger.debug("Created dedicated writer connection")
+            try:
+                yield self._writer
+            finally:
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+
+    @property
+    def coalescer(self) -> WriteCoalescer:
+        """Group-commit layer for small writes on the writer connection."""
+        return self._coalescer
+
+    @property
+    def profile_cache(self) -> ProfileCache:
+        """Platform profiles for the ingest path (see ProfileCache)."""
+        return self._profile_cache
+
     async def close(self):
         """Close all connections in the pool."""
+        if self._write_lock is not None and not self._closed:
+            await self._profile_cache.flush()
+            await self._coalescer.close()
         self._closed = True
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
         if self._pool is None:
             return
         while not self._pool.empty():
@@ -0,0 +1,127 @@
+"""In-process cache of platform profiles for the message ingest path."""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+from .models import LettaUser, PlatformProfile
+
+if TYPE_CHECKING:
+    from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileCache:
+    """Bounded LRU of platform profiles and their Letta users.
+
+    Keyed by (platform, platform_user_id). get_or_create_platform_profile
+    serves known users from here and writes changed profile fields through to
+    the database; the last_active bump of an unchanged profile is only
+    buffered and written for all profiles at once by flush(), at most every
+    flush_interval seconds and when the pool closes. last_active in the
+    database can therefore lag by up to flush_interval.
+
+    The cache only sees this process's writes: code that changes
+    platform_profiles or letta_users must call invalidate() /
+    invalidate_user().
+    """
+
+    def __init__(
+        self,
+        pool: "ConnectionPool",
+        max_size: int = 1024,
+        flush_interval: float = 30.0,
+    ):
+        """Initialize the cache.
+
+        Args:
+            pool: Pool whose writer connection flushes last_active bumps
+            max_size: Profiles kept; the least recently used is evicted (0
+                disables caching, bumps are still batched)
+            flush_interval: Seconds between last_active flushes
+        """
+        self.pool = pool
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[PlatformProfile, LettaUser]
+        ] = OrderedDict()
+        self._last_active: dict[int, str] = {}  # profile id -> last_active
+        self._last_flush = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, platform: str, platform_user_id: str
+    ) -> tuple[PlatformProfile, LettaUser] | None:
+        """Return copies of the cached profile and Letta user, if present."""
+        entry = self._entries.get((platform, platform_user_id))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end((platform, platform_user_id))
+        profile, letta_user = entry
+        return replace(profile), replace(letta_user)
+
+    def put(self, profile: PlatformProfile, letta_user: LettaUser) -> None:
+        """Cache a profile and its Letta user, evicting the least recently used."""
+        if self.max_size <= 0:
+            return
+        key = (profile.platform, profile.platform_user_id)
+        self._entries[key] = (replace(profile), replace(letta_user))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, platform: str, platform_user_id: str) -> None:
+        """Drop one profile (its row was changed outside the cache)."""
+        self._entries.pop((platform, platform_user_id), None)
+
+    def invalidate_user(self, letta_user_id: int) -> None:
+        """Drop every profile of a Letta user (the user row was changed)."""
+        for key, (profile, _) in list(self._entries.items()):
+            if profile.letta_user_id == letta_user_id:
+                del self._entries[key]
+
+    def touch(self, profile_id: int, last_active: str) -> None:
+        """Buffer a last_active bump for the next flush."""
+        self._last_active[profile_id] = last_active
+
+    def discard_touch(self, profile_id: int) -> None:
+        """Forget a buffered bump (last_active was just written through)."""
+        self._last_active.pop(profile_id, None)
+
+    def flush_due(self) -> bool:
+        """True if buffered bumps are older than flush_interval."""
+        return bool(self._last_active) and (
+            time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    async def flush(self) -> int:
+        """Write all buffered last_active bumps in one transaction.
+
+        Returns:
+            Number of profiles updated
+        """
+        self._last_flush = time.monotonic()
+        pending, self._last_active = self._last_active, {}
+        if not pending:
+            return 0
+        try:
+            async with self.pool.write_connection() as db:
+                await db.executemany(
+                    "UPDATE platform_profiles SET last_active = ? WHERE id = ?",
+                    [(last_active, pid) for pid, last_active in pending.items()],
+                )
+                await db.commit()
+        except Exception as e:
+            # Keep the bumps for the next flush unless newer ones arrived
+            for profile_id, last_active in pending.items():
+                self._last_active.setdefault(profile_id, last_active)
+            logger.error(f"Failed to flush profile last_active: {str(e)}")
+            return 0
+        return len(pending)
@@ -24,21 +24,34 @@ import logging
 import os
 import signal
 import sys
+from collections.abc import Awaitable, Callable
 from pathlib import Path
 
 import psutil
 from dotenv import load_dotenv
 
 from common.config import (
+    DatabasePoolConfig,
+    DeliveryConfig,
+    ProvisioningConfig,
+    RetentionConfig,
     get_config_manager,
     get_env_var,
     get_settings,
     validate_environment_variables,
 )
 from common.logging import setup_logging
+from database.operations.provisioning import (
+    cancel_provisioning,
+    get_resource_pool_stats,
+    refill_resource_pool,
+    resume_provisioning,
+)
+from database.operations.retention import run_retention
 from database.operations.shared import check_and_migrate_db, initialize_database
 from database.pool import initialize_pool
 from runtime.core.agent import AgentClient
+from runtime.core.delivery import OutboxDelivery
 from runtime.core.plugin import PluginManager
 from runtime.core.queue import QueueProcessor
 
@@ -196,6 +209,7 @@ class Application:
         self.queue_processor = QueueProcessor(
             message_processor=self._process_message, plugin_manager=self.plugin_manager
         )
+        self.outbox_delivery: OutboxDelivery | None = None
 
         self._settings_file = "settings.json"
         self._settings_mtime = 0
@@ -222,9 +236,19 @@ class Application:
         database_settings = {}
         if isinstance(settings, dict):
             database_settings = settings.get("database", {}) or {}
-        pool_size = int(database_settings.get("pool_size", 5))
-        max_overflow = int(database_settings.get("max_overflow", 10))
-        self.db_pool = initialize_pool(pool_size=pool_size, max_overflow=max_overflow)
+        if isinstance(database_settings, DatabasePoolConfig):
+            pool_config = database_settings
+        else:
+            pool_config = DatabasePoolConfig(**database_settings)
+        self.db_pool = initialize_pool(
+            pool_size=pool_config.pool_size,
+            max_overflow=pool_config.max_overflow,
+            pragmas=pool_config.pragmas(),
+            write_coalesce_ms=pool_config.write_coalesce_ms,
+            write_coalesce_max_batch=pool_config.write_coalesce_max_batch,
+            profile_cache_size=pool_config.profile_cache_size,
+            profile_flush_interval=pool_config.profile_flush_interval,
+        )
 
         # Initialize PID manager
         self.pid_manager = PIDManager()
@@ -330,13 +354,18 @@ class Application:
             logger.error(f"Failed to reload settings: {str(e)}")
 
     async def _process_message(
-        self, message: str, sender_id: str | None = None
+        self,
+        message: str,
+        sender_id: str | None = None,
+        on_partial: Callable[[str], Awaitable[None]] | None = None,
     ) -> str | None:
         """Process a message through the agent.
 
         Args:
             message: The message to process
             sender_id: Optional Letta identity ID to scope conversation per user
+            on_partial: Optional callback for the assistant text so far
+                (streaming mode only)
 
         Returns:
             The agent's response or None if processing failed
@@ -350,7 +379,9 @@ class Application:
 
         if use_background:
             # Use async streaming method for long-running tasks
-            return await self.agent.process_message_async(message, sender_id)
+            return await self.agent.process_message_async(
+                message, sender_id, on_partial=on_partial
+            )
         else:
             # Use synchronous method (backward compatibility)
             return await self.agent.process_message(message, sender_id)
@@ -400,6 +431,9 @@ class Application:
                 logger.error("❌ Failed to initialize agent. Exiting...")
                 return
 
+            # Finish provisioning users left pending by the last run
+            await resume_provisioning()
+
             # Load configuration
             logger.info("📋 Loading configuration...")
             settings = get_settings()
@@ -414,11 +448,58 @@ class Application:
             logger.info("🔄 Starting plugin manager...")
             await self.plugin_manager.start()
 
+            # Start the outbox workers that send responses to the platforms
+            delivery = self.config_manager.get_typed().delivery or DeliveryConfig()
+            if delivery.enabled:
+                logger.info("📮 Starting outbox delivery workers...")
+                self.outbox_delivery = OutboxDelivery(
+                    self.plugin_manager,
+                    workers_per_platform=delivery.workers_per_platform,
+                    max_attempts=delivery.max_attempts,
+                    base_delay=delivery.base_delay,
+                    max_delay=delivery.max_delay,
+                    lease_seconds=delivery.lease_seconds,
+                    send_timeout=delivery.send_timeout,
+                    idle_poll_interval=delivery.idle_poll_interval,
+                )
+                await self.outbox_delivery.start()
+
             # Initialize queue processor
             logger.info("📋 Initializing message queue processor...")
             self.queue_processor = QueueProcessor(
                 message_processor=self._process_message,
                 plugin_manager=self.plugin_manager,
+                max_concurrent=self.config_manager.get(
+                    "queue_processor.max_concurrent"
+                ),
+                idle_poll_interval=self.config_manager.get(
+                    "queue_processor.idle_poll_interval"
+                ),
+                block_idle_timeout=self.config_manager.get(
+                    "queue_processor.block_idle_timeout"
+                ),
+                block_reconcile_interval=self.config_manager.get(
+                    "queue_processor.block_reconcile_interval"
+                ),
+                lease_seconds=self.config_manager.get("queue_processor.lease_seconds"),
+                heartbeat_interval=self.config_manager.get(
+                    "queue_processor.heartbeat_interval"
+                ),
+                scheduling_policy=self.config_manager.get(
+                    "queue_processor.scheduling_policy"
+                ),
+                user_weights=self.config_manager.get("queue_processor.user_weights"),
+                user_priorities=self.config_manager.get(
+                    "queue_processor.user_priorities"
+                ),
+                max_attempts=self.config_manager.get("queue_processor.max_attempts"),
+                coalesce_messages=self.config_manager.get(
+                    "queue_processor.coalesce_messages"
+                ),
+                coalesce_max_messages=self.config_manager.get(
+                    "queue_processor.coalesce_max_messages"
+                ),
+                outbox_delivery=delivery.enabled,
             )
 
             # Set initial message mode from unified config
@@ -440,6 +521,18 @@ class Application:
             # Start legacy settings monitor task (for plugin updates)
             asyncio.create_task(self._monitor_settings())
 
+            # Start background queue/message retention; cancelled in stop()
+            # so no batch is still running when the pool closes
+            retention_task = asyncio.create_task(self._run_retention())
+            self._tasks.add(retention_task)
+            retention_task.add_done_callback(self._tasks.discard)
+
+            # Keep the warm pool of Letta identities/blocks for new users
+            # filled; cancelled in stop() so no refill outlives the pool
+            pool_task = asyncio.create_task(self._run_resource_pool())
+            self._tasks.add(pool_task)
+            pool_task.add_done_callback(self._tasks.discard)
+
             # Set up signal handlers after event loop is running
             self._setup_signal_handlers()
 
@@ -465,6 +558,76 @@ class Application:
                 logger.error(f"Error monitoring settings: {e}")
                 await asyncio.sleep(5)  # Wait longer on error
 
+    async def _run_retention(self):
+        """Periodically archive terminal queue rows and old messages."""
+        while not self._shutdown_event.is_set():
+            config = self.config_manager.get_typed().retention or RetentionConfig()
+            try:
+                await asyncio.wait_for(
+                    self._shutdown_event.wait(), timeout=config.interval_seconds
+                )
+                break
+            except TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+
+            if not config.enabled:
+                continue
+            try:
+                result = await run_retention(config)
+                if result.queue_archived or result.messages_archived:
+                    logger.info(
+                        f"🗄️ Retention archived {result.queue_archived} queue items "
+                        f"and {result.messages_archived} messages"
+                    )
+                if result.outbox_purged:
+                    logger.info(
+                        f"🗄️ Retention purged {result.outbox_purged} delivered "
+                        "outbox rows"
+                    )
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error running retention job: {e}")
+
+    async def _run_resource_pool(self):
+        """Periodically top up the warm pool of Letta identities and blocks."""
+        depleted = 0
+        while not self._shutdown_event.is_set():
+            config = (
+                self.config_manager.get_typed().provisioning or ProvisioningConfig()
+            )
+            try:
+                added = await refill_resource_pool(
+                    config.pool_size, config.refill_batch
+                )
+                stats = await get_resource_pool_stats()
+                if stats.depleted > depleted:
+                    logger.warning(
+                        f"⚠️ {stats.depleted - depleted} new users found the Letta "
+                        f"resource pool empty (depth {stats.depth}/{stats.size}); "
+                        "consider raising provisioning.pool_size"
+                    )
+                    depleted = stats.depleted
+                elif added:
+                    logger.info(
+                        f"🪣 Resource pool refilled with {added} identity/block "
+                        f"pairs (depth {stats.depth}/{stats.size})"
+                    )
+            except Exception as e:
+                logger.error(f"Error refilling resource pool: {e}")
+
+            try:
+                await asyncio.wait_for(
+                    self._shutdown_event.wait(), timeout=config.refill_interval
+                )
+                break
+            except TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+
     async def stop(self) -> None:
         """Stop all application components."""
         try:
@@ -485,6 +648,16 @@ class Application:
                 logger.info("🛑 Stopping queue processor...")
                 await self.queue_processor.stop()
 
+            # After the queue processor's last turns; unsent responses stay
+            # in the outbox for the next start
+            if self.outbox_delivery:
+                logger.info("🛑 Stopping outbox delivery...")
+                await self.outbox_delivery.stop()
+
+            # Stop background user provisioning while the Letta client and the
+            # database pool are still open; pending users resume on start
+            await cancel_provisioning()
+
             # Clean up agent
             logger.info("🛑 Cleaning up agent...")
             await self.agent.cleanup()
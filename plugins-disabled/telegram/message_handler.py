@@ -5,8 +5,7 @@ from datetime import datetime
 from typing import Any
 
 from common.telegram_markdown import preserve_telegram_markdown
-from database.operations.messages import insert_message
-from database.operations.queue import add_to_queue
+from database.operations.messages import insert_messages_many
 from database.operations.users import get_or_create_platform_profile
 from plugins.telegram.settings import MessageMode, TelegramSettings
 from runtime.core.message import (
@@ -128,19 +127,19 @@ class MessageBuffer:
         buffer = self.buffers[buffer_key]
 
         try:
-            # Process each message in the buffer
-            for msg in buffer["messages"]:
-                # Insert message into database
-                message_id = await insert_message(
-                    letta_user_id=letta_user_id,
-                    platform_profile_id=platform_profile_id,
-                    role="user",
-                    message=msg["message"],
-                    timestamp=msg["timestamp"].isoformat(),
-                )
-
-                # Add to processing queue
-                await add_to_queue(message_id=message_id, letta_user_id=letta_user_id)
+            # Insert the whole buffer and its queue rows in one transaction
+            await insert_messages_many(
+                [
+                    {
+                        "letta_user_id": letta_user_id,
+                        "platform_profile_id": platform_profile_id,
+                        "role": "user",
+                        "message": msg["message"],
+                        "timestamp": msg["timestamp"].isoformat(),
+                    }
+                    for msg in buffer["messages"]
+                ]
+            )
 
             print(
                 f"Flushed {len(buffer['messages'])} messages for user {platform_user_id}"
@@ -18,9 +18,12 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import asyncio
+import inspect
 import logging
 import re
 import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from dataclasses import dataclass
 
 from common.config import get_env_var
 from common.exceptions import AgentTurnTimeoutInFlight
@@ -32,7 +35,7 @@ from common.retry import (
     is_retryable_exception,
 )
 
-from .letta_client import get_letta_client
+from .letta_client import close_letta_client, get_letta_client
 
 
 def _user_message_list(text: str, sender_id: str | None = None) -> list[dict]:
@@ -55,6 +58,196 @@ def _strip_image_addendum(text: str) -> str:
     return _IMAGE_ADDENDUM_PATTERN.sub("", text).strip()
 
 
+# Letta stream message types
+_ASSISTANT_MESSAGE_TYPES = ("assistant_message", "assistant")
+_STOP_MESSAGE_TYPES = ("stop_reason",)
+
+# Letta run statuses
+_RUN_ACTIVE_STATUSES = ("created", "running")
+_RUN_FAILED_STATUSES = ("failed", "cancelled")
+
+
+def _extract_content(msg) -> str | None:
+    """Text content of a Letta message or stream event, if any."""
+    if hasattr(msg, "content"):
+        content = msg.content
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                if hasattr(part, "text"):
+                    parts.append(part.text)
+                elif isinstance(part, dict) and "text" in part:
+                    parts.append(part["text"])
+            if parts:
+                return "\n".join(parts)
+    if hasattr(msg, "text"):
+        return msg.text
+    return None
+
+
+def _run_conversation_id(run) -> str | None:
+    """conversation_id of a Letta run, if it has one yet."""
+    if getattr(run, "conversation_id", None):
+        return run.conversation_id
+    conversation = getattr(run, "conversation", None)
+    return getattr(conversation, "id", None) if conversation is not None else None
+
+
+async def _aiter_stream(stream) -> AsyncIterator:
+    """Yield events from an SDK AsyncStream as its SSE events are parsed.
+
+    A non-streaming response (already in memory) is iterated directly.
+    """
+    if hasattr(stream, "__aiter__"):
+        async for event in stream:
+            yield event
+        return
+    for event in getattr(stream, "messages", None) or stream:
+        yield event
+
+
+async def _close_stream(stream) -> None:
+    """Close a stream's HTTP response early (e.g. once the run has finished)."""
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.debug("Error closing agent stream: %s", e)
+
+
+def _page_items(page) -> list:
+    """Items of an SDK list response (AsyncArrayPage.items; older SDKs use .data)."""
+    if isinstance(page, list):
+        return page
+    for attr in ("items", "data"):
+        items = getattr(page, attr, None)
+        if isinstance(items, list):
+            return items
+    return []
+
+
+def _poll_delays(initial: float, maximum: float, factor: float) -> Iterator[float]:
+    """Exponential poll delays: initial, initial * factor, ... capped at maximum."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(maximum, delay * factor)
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float tuning knob from the environment, falling back on bad values."""
+    value = get_env_var(name, default=default)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid {name}={value!r}; using {default}")
+        return default
+
+
+@dataclass
+class FallbackPollMetrics:
+    """Counters for create_async fallback polling (see AgentClient._fallback_to_async)."""
+
+    turns: int = 0
+    polls: int = 0
+    run_checks: int = 0
+    message_lists: int = 0
+    last_turn_polls: int = 0
+    max_turn_polls: int = 0
+
+    def record(self, polls: int, run_checks: int, message_lists: int) -> None:
+        """Add one fallback turn's poll counts."""
+        self.turns += 1
+        self.polls += polls
+        self.run_checks += run_checks
+        self.message_lists += message_lists
+        self.last_turn_polls = polls
+        self.max_turn_polls = max(self.max_turn_polls, polls)
+
+    @property
+    def avg_polls_per_turn(self) -> float:
+        """Average number of polls per fallback turn."""
+        return self.polls / self.turns if self.turns else 0.0
+
+
+class _StreamTurn:
+    """Incremental state of one streamed agent turn, updated event by event."""
+
+    def __init__(self, stream_tokens: bool = False):
+        """Initialize the turn state.
+
+        Args:
+            stream_tokens: Assistant events are token chunks to concatenate
+                (same message id) rather than whole messages
+        """
+        self.stream_tokens = stream_tokens
+        self.event_count = 0
+        self.conversation_id: str | None = None
+        self.message_id: str | None = None
+        self.content: str | None = None  # assistant text so far
+        self.done = False  # stop_reason seen: the run has finished
+        self._assistant_id: str | None = None
+
+    def observe(self, event) -> bool:
+        """Update the turn from one stream event.
+
+        Returns:
+            True if the event changed the assistant text
+        """
+        self.event_count += 1
+        changed = False
+
+        message_type = getattr(event, "message_type", None)
+        if message_type in _ASSISTANT_MESSAGE_TYPES:
+            content = _extract_content(event)
+            event_id = getattr(event, "id", None)
+            if content:
+                if self.stream_tokens and event_id and event_id == self._assistant_id:
+                    self.content = (self.content or "") + content
+                else:
+                    self.content = content
+                self._assistant_id = event_id
+                changed = True
+            # Capture message id for fallback (docs: AssistantMessage has id: str)
+            if not self.message_id and event_id:
+                self.message_id = event_id
+        elif message_type in _STOP_MESSAGE_TYPES:
+            self.done = True
+
+        if not self.conversation_id:
+            if getattr(event, "conversation_id", None):
+                self.conversation_id = event.conversation_id
+            elif hasattr(event, "conversation") and hasattr(event.conversation, "id"):
+                self.conversation_id = event.conversation.id
+            elif hasattr(event, "run") and hasattr(event.run, "conversation_id"):
+                self.conversation_id = event.run.conversation_id
+            elif getattr(getattr(event, "data", None), "conversation_id", None):
+                self.conversation_id = event.data.conversation_id
+            if self.conversation_id:
+                logger.debug(
+                    "Captured conversation_id from stream event #%s: %s",
+                    self.event_count,
+                    self.conversation_id,
+                )
+
+        if not self.message_id:
+            if getattr(event, "message_id", None):
+                self.message_id = event.message_id
+            elif getattr(event, "messages", None):
+                for msg in event.messages:
+                    if hasattr(msg, "id"):
+                        self.message_id = msg.id
+                        break
+
+        return changed
+
+
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -84,6 +277,8 @@ class AgentClient:
         )
         self.agent_id = get_env_var("AGENT_ID", required=not self.debug_mode)
 
+        self.poll_metrics = FallbackPollMetrics()
+
         logger.debug(f"Initializing AgentClient with ID: {self.agent_id}")
         logger.debug(f"Debug mode: {self.debug_mode}")
 
@@ -105,10 +300,10 @@ class AgentClient:
             client = get_letta_client()
             logger.debug("Retrieved Letta client instance")
 
-            # Verify agent exists (sync SDK call run in thread to avoid blocking)
+            # Verify agent exists
             logger.debug(f"Attempting to retrieve agent {self.agent_id}")
             try:
-                agent = await asyncio.to_thread(client.agents.retrieve, self.agent_id)
+                agent = await client.aio.agents.retrieve(self.agent_id)
                 logger.info(f"✅ Connected to agent {agent.id}: {agent.name}")
                 return True
             except Exception as e:
@@ -128,30 +323,11 @@ class AgentClient:
             logger.debug(f"Debug mode: returning message without processing: {message}")
             return message
 
-        def _extract_content(msg) -> str | None:
-            if hasattr(msg, "content"):
-                content = msg.content
-                if isinstance(content, str):
-                    return content
-                if isinstance(content, list):
-                    parts = []
-                    for part in content:
-                        if hasattr(part, "text"):
-                            parts.append(part.text)
-                        elif isinstance(part, dict) and "text" in part:
-                            parts.append(part["text"])
-                    if parts:
-                        return "\n".join(parts)
-            if hasattr(msg, "text"):
-                return msg.text
-            return None
-
         async def _process_with_letta():
             client = get_letta_client()
 
             logger.debug(f"Sending message to agent {self.agent_id}: {message}")
-            response = await asyncio.to_thread(
-                client.agents.messages.create,
+            response = await client.aio.agents.messages.create(
                 self.agent_id,
                 messages=_user_message_list(message, sender_id),
             )
@@ -203,66 +379,53 @@ class AgentClient:
         # Use default retry logic for other exceptions
         return is_retryable_exception(exception)
 
+    async def _open_stream(
+        self,
+        client,
+        message: str,
+        sender_id: str | None = None,
+        stream_tokens: bool = False,
+    ):
+        """Start a background streaming turn and return the SDK AsyncStream."""
+        # Explicit messages=, sender_id, and otid (fresh thread per request).
+        kwargs = {
+            "messages": _user_message_list(message, sender_id),
+            "include_pings": True,
+        }
+        if stream_tokens:
+            kwargs["stream_tokens"] = True
+        try:
+            return await client.aio.agents.messages.create(
+                self.agent_id, streaming=True, background=True, **kwargs
+            )
+        except (AttributeError, TypeError):
+            # SDK has messages.stream instead of create(streaming=True)
+            return await client.aio.agents.messages.stream(self.agent_id, **kwargs)
+
     async def process_message_async(
-        self, message: str, sender_id: str | None = None
+        self,
+        message: str,
+        sender_id: str | None = None,
+        on_partial: Callable[[str], Awaitable[None]] | None = None,
     ) -> str | None:
         """Process message using background streaming.
         sender_id: optional Letta identity ID to scope conversation per user.
+        on_partial: optional callback awaited with the assistant text so far
+        (the full text, not a delta) each time it grows; the turn streams
+        tokens when it is set. Callback errors are logged, never raised.
 
         Strategy:
         1. Send message with streaming=True, background=True, include_pings=True
-        2. Extract conversation_id (or message_id) from stream events
-        3. Consume/discard stream until it closes (indicates processing complete)
-        4. Once stream closes, fetch final message using conversation_id via non-streaming API
-        5. Return the message content
+        2. Parse stream events as they arrive, keeping the latest assistant
+           content and the conversation_id / message_id
+        3. Stop at the run's stop_reason event (or when the stream closes)
+        4. Return the streamed assistant content; if there was none, fetch the
+           final message using conversation_id via the non-streaming API
         """
         if self.debug_mode:
             logger.debug(f"Debug mode: returning message without processing: {message}")
             return message
 
-        def _extract_content(msg) -> str | None:
-            if hasattr(msg, "content"):
-                content = msg.content
-                if isinstance(content, str):
-                    return content
-                if isinstance(content, list):
-                    parts = []
-                    for part in content:
-                        if hasattr(part, "text"):
-                            parts.append(part.text)
-                        elif isinstance(part, dict) and "text" in part:
-                            parts.append(part["text"])
-                    if parts:
-                        return "\n".join(parts)
-            if hasattr(msg, "text"):
-                return msg.text
-            return None
-
-        def _safe_next_sync(it, default=None):
-            """Call next(it) and return (True, value) or (False, default). Avoids StopIteration in executor (PEP 479 / asyncio Future)."""
-            try:
-                return (True, next(it))
-            except StopIteration:
-                return (False, default)
-
-        async def _consume_stream(stream):
-            if hasattr(stream, "__aiter__"):
-                async for event in stream:
-                    yield event
-                return
-
-            # Fallback for sync iterables: consume in executor to avoid blocking.
-            # Do not pass next(iterator) to run_in_executor; StopIteration in worker becomes TypeError in main (PEP 479).
-            loop = asyncio.get_running_loop()
-            iterator = iter(stream)
-            while True:
-                has_event, event = await loop.run_in_executor(
-                    None, _safe_next_sync, iterator
-                )
-                if not has_event:
-                    break
-                yield event
-
         async def _process_with_streaming():
             client = get_letta_client()
 
@@ -271,152 +434,81 @@ class AgentClient:
                 self.agent_id,
                 f"{sender_id[:8]}..." if sender_id else "None",
             )
-
-            # Sync SDK call: explicit messages=, sender_id, and otid (fresh thread per request).
-            try:
-                stream = await asyncio.to_thread(
-                    lambda: client.agents.messages.create(
-                        self.agent_id,
-                        messages=_user_message_list(message, sender_id),
-                        streaming=True,
-                        background=True,
-                        include_pings=True,
-                    )
-                )
-            except (AttributeError, TypeError):
-                # SDK has create_stream instead of create(streaming=True)
-                stream = await asyncio.to_thread(
-                    lambda: client.agents.messages.create_stream(
-                        self.agent_id,
-                        messages=_user_message_list(message, sender_id),
-                        include_pings=True,
-                    )
-                )
-
-            conversation_id = None
-            message_id = None
-            event_count = 0
-            stream_response_content = None  # assistant content from stream (some SDKs/backends don't send conversation_id)
+            stream_tokens = on_partial is not None
+            stream = await self._open_stream(
+                client, message, sender_id, stream_tokens=stream_tokens
+            )
+            turn = _StreamTurn(stream_tokens=stream_tokens)
 
             try:
-                async for event in _consume_stream(stream):
-                    event_count += 1
-
-                    # Prefer assistant content from stream so we don't depend on conversation_id
-                    mt = getattr(event, "message_type", None)
-                    if mt in ("assistant_message", "assistant"):
-                        content = _extract_content(event)
-                        if content:
-                            stream_response_content = content
-                            logger.debug(
-                                "Captured assistant content from stream event #%s",
-                                event_count,
+                async for event in _aiter_stream(stream):
+                    if turn.observe(event) and on_partial is not None:
+                        try:
+                            await on_partial(turn.content)
+                        except Exception as partial_error:
+                            logger.warning(
+                                "Partial text callback failed: %s", partial_error
                             )
-                        # Capture message id for fallback (docs: AssistantMessage has id: str)
-                        if not message_id and hasattr(event, "id") and event.id:
-                            message_id = event.id
-                            logger.debug(
-                                "Captured message_id from stream event #%s: %s",
-                                event_count,
-                                message_id,
-                            )
-
-                    if not conversation_id:
-                        if hasattr(event, "conversation_id") and event.conversation_id:
-                            conversation_id = event.conversation_id
-                            logger.debug(
-                                "Captured conversation_id from stream event "
-                                f"#{event_count}: {conversation_id}"
-                            )
-                        elif hasattr(event, "conversation") and hasattr(
-                            event.conversation, "id"
-                        ):
-                            conversation_id = event.conversation.id
-                            logger.debug(
-                                "Captured conversation_id from stream event "
-                                f"#{event_count}: {conversation_id}"
-                            )
-                        elif hasattr(event, "run") and hasattr(
-                            event.run, "conversation_id"
-                        ):
-                            conversation_id = event.run.conversation_id
-                            logger.debug(
-                                "Captured conversation_id from stream event "
-                                f"#{event_count}: {conversation_id}"
-                            )
-                        elif hasattr(event, "data"):
-                            data = event.data
-                            if (
-                                hasattr(data, "conversation_id")
-                                and data.conversation_id
-                            ):
-                                conversation_id = data.conversation_id
-                                logger.debug(
-                                    "Captured conversation_id from stream event data "
-                                    f"#{event_count}: {conversation_id}"
-                                )
-
-                    if not message_id:
-                        if hasattr(event, "message_id") and event.message_id:
-                            message_id = event.message_id
-                        elif hasattr(event, "messages") and event.messages:
-                            for msg in event.messages:
-                                if hasattr(msg, "id"):
-                                    message_id = msg.id
-                                    break
-
-                    if event_count % 100 == 0:
+                    if turn.done:
+                        # The run's final message has arrived; don't wait for
+                        # trailing usage events or the server closing the stream
+                        logger.debug(
+                            "Run finished after %s stream events", turn.event_count
+                        )
+                        break
+                    if turn.event_count % 100 == 0:
                         logger.debug(
                             "Stream active: processed %s events, conversation_id=%s",
-                            event_count,
-                            "captured" if conversation_id else "not yet",
+                            turn.event_count,
+                            "captured" if turn.conversation_id else "not yet",
                         )
-
-                logger.debug(
-                    "Stream closed after %s events - processing complete", event_count
-                )
+                else:
+                    logger.debug(
+                        "Stream closed after %s events - processing complete",
+                        turn.event_count,
+                    )
 
             except Exception as stream_error:
                 logger.error(
                     "Error consuming stream after %s events: %s",
-                    event_count,
+                    turn.event_count,
                     str(stream_error),
                 )
-                if not conversation_id and not stream_response_content:
+                if not turn.conversation_id and not turn.content:
                     logger.warning(
                         "No conversation_id captured from stream, cannot fetch message"
                     )
                     raise
-                if stream_response_content:
-                    return stream_response_content
+                if turn.content:
+                    return turn.content
+            finally:
+                await _close_stream(stream)
+
+            conversation_id = turn.conversation_id
+            message_id = turn.message_id
 
             # If we got assistant content from the stream, use it (SDK/backend may not send conversation_id)
-            if stream_response_content:
-                return stream_response_content
+            if turn.content:
+                return turn.content
 
             if conversation_id:
                 logger.debug(
                     "Fetching final message from conversation %s", conversation_id
                 )
-                messages_response = await asyncio.to_thread(
-                    client.conversations.messages.list,
+                messages_response = await client.aio.conversations.messages.list(
                     conversation_id,
                     order="desc",
                     limit=10,
                 )
-                if hasattr(messages_response, "data") and messages_response.data:
-                    for msg in messages_response.data:
-                        if getattr(msg, "message_type", None) in (
-                            "assistant_message",
-                            "assistant",
-                        ):
-                            response_content = _extract_content(msg)
-                            if response_content:
-                                logger.debug(
-                                    "Found assistant message in conversation %s",
-                                    conversation_id,
-                                )
-                                return response_content
+                for msg in _page_items(messages_response):
+                    if getattr(msg, "message_type", None) in _ASSISTANT_MESSAGE_TYPES:
+                        response_content = _extract_content(msg)
+                        if response_content:
+                            logger.debug(
+                                "Found assistant message in conversation %s",
+                                conversation_id,
+                            )
+                            return response_content
                 logger.warning(
                     "No assistant message found in conversation %s", conversation_id
                 )
@@ -428,10 +520,7 @@ class AgentClient:
                 )
                 # Per API docs: messages.retrieve(message_id) -> get /v1/messages/{message_id}
                 try:
-                    msg = await asyncio.to_thread(
-                        client.messages.retrieve,
-                        message_id,
-                    )
+                    msg = await client.aio.messages.retrieve(message_id)
                     if msg:
                         # API docs say retrieve returns List[Message]; take first
                         if isinstance(msg, list | tuple) and msg:
@@ -447,17 +536,15 @@ class AgentClient:
                         "messages.retrieve(%s) failed: %s", message_id, retrieve_err
                     )
                 # Fallback: list agent messages and find by id
-                messages_response = await asyncio.to_thread(
-                    client.agents.messages.list,
+                messages_response = await client.aio.agents.messages.list(
                     self.agent_id,
                     limit=10,
                 )
-                if hasattr(messages_response, "data") and messages_response.data:
-                    for msg in messages_response.data:
-                        if getattr(msg, "id", None) == message_id:
-                            response_content = _extract_content(msg)
-                            if response_content:
-                                return response_content
+                for msg in _page_items(messages_response):
+                    if getattr(msg, "id", None) == message_id:
+                        response_content = _extract_content(msg)
+                        if response_content:
+                            return response_content
 
             logger.error("Could not extract conversation_id or message_id from stream")
             return None
@@ -515,11 +602,54 @@ class AgentClient:
                 logger.error("Fallback method also failed: %s", str(fallback_error))
                 return None
 
+    def _poll_schedule(self) -> tuple[Iterator[float], float]:
+        """Fallback poll delays and the total wait budget, from the environment.
+
+        LETTA_POLL_INITIAL_INTERVAL (default 0.25s) grows by LETTA_POLL_BACKOFF
+        (default 2.0) up to LETTA_POLL_MAX_INTERVAL (default 5s); polling gives
+        up after LETTA_POLL_MAX_WAIT seconds (default 600).
+        """
+        initial = max(0.01, _env_float("LETTA_POLL_INITIAL_INTERVAL", 0.25))
+        maximum = max(initial, _env_float("LETTA_POLL_MAX_INTERVAL", 5.0))
+        factor = max(1.0, _env_float("LETTA_POLL_BACKOFF", 2.0))
+        max_wait = _env_float("LETTA_POLL_MAX_WAIT", 600.0)
+        return _poll_delays(initial, maximum, factor), max_wait
+
+    async def _list_new_messages(
+        self, client, conversation_id: str, cursor: str | None
+    ) -> tuple[list, str | None]:
+        """List conversation messages newer than cursor, oldest first.
+
+        The first call (no cursor) fetches the latest page to find a starting
+        point; later calls only page forward from the newest message seen.
+
+        Returns:
+            (messages, new cursor)
+        """
+        if cursor is None:
+            page = await client.aio.conversations.messages.list(
+                conversation_id, order="desc", limit=10
+            )
+            messages = list(reversed(_page_items(page)))
+        else:
+            page = await client.aio.conversations.messages.list(
+                conversation_id, after=cursor, order="asc", limit=50
+            )
+            messages = _page_items(page)
+        if messages and getattr(messages[-1], "id", None):
+            cursor = messages[-1].id
+        return messages, cursor
+
     async def _fallback_to_async(
         self, message: str, sender_id: str | None = None
     ) -> str | None:
         """Fallback method using create_async if streaming fails.
 
+        Polls with exponential backoff (see _poll_schedule). Each poll first
+        checks the run status with runs.retrieve and only lists conversation
+        messages, paging forward by cursor, once the run is no longer running.
+        Poll counts are recorded in self.poll_metrics.
+
         Args:
             message: The message to process
             sender_id: optional Letta identity ID to scope conversation per user
@@ -533,96 +663,101 @@ class AgentClient:
             f"Using create_async fallback for message to agent {self.agent_id}"
         )
 
+        polls = run_checks = message_lists = 0
         try:
-            # Use create_async which returns a Run object immediately (sync SDK in thread)
-            run = await asyncio.to_thread(
-                client.agents.messages.create_async,
+            # Use create_async which returns a Run object immediately
+            run = await client.aio.agents.messages.create_async(
                 self.agent_id,
                 messages=_user_message_list(message, sender_id),
             )
+            run_id = getattr(run, "id", None)
+            run_status = getattr(run, "status", None)
+            # conversation_id may be None in the initial response
+            conversation_id = _run_conversation_id(run)
+
+            delays, max_wait = self._poll_schedule()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + max_wait
+            cursor = None
 
-            # Extract conversation_id from run object (may be None in initial response)
-            conversation_id = None
-            if hasattr(run, "conversation_id") and run.conversation_id:
-                conversation_id = run.conversation_id
-            elif hasattr(run, "conversation") and hasattr(run.conversation, "id"):
-                conversation_id = run.conversation.id
-
-            # If create_async response didn't include conversation_id, poll run until it appears
-            if not conversation_id and hasattr(run, "id") and run.id:
-                for wait_sec in (0.5, 1.0, 2.0):
-                    await asyncio.sleep(wait_sec)
+            for delay in delays:
+                if loop.time() + delay > deadline:
+                    break
+                await asyncio.sleep(delay)
+                polls += 1
+
+                if run_id:
                     try:
-                        updated = await asyncio.to_thread(
-                            client.runs.retrieve,
-                            run.id,
+                        updated = await client.aio.runs.retrieve(run_id)
+                        run_checks += 1
+                        run_status = getattr(updated, "status", None)
+                        conversation_id = conversation_id or _run_conversation_id(
+                            updated
                         )
-                        if getattr(updated, "conversation_id", None):
-                            conversation_id = updated.conversation_id
-                            logger.debug(
-                                "Got conversation_id from runs.retrieve after %.1fs",
-                                wait_sec,
-                            )
-                            break
                     except Exception as e:
-                        logger.debug("runs.retrieve(%s) failed: %s", run.id, e)
+                        logger.debug("runs.retrieve(%s) failed: %s", run_id, e)
+                        run_status = None
+                    if run_status in _RUN_ACTIVE_STATUSES:
                         continue
+                    if run_status in _RUN_FAILED_STATUSES:
+                        logger.error(f"Run {run_id} ended with status {run_status}")
+                        return None
 
-            if not conversation_id:
-                logger.error(
-                    "Could not extract conversation_id from run object (run_id=%s). "
-                    "Run may have failed before creating a conversation.",
-                    getattr(run, "id", None),
-                )
-                return None
-
-            logger.debug(f"Got conversation_id from run: {conversation_id}")
-
-            # Poll conversation messages until we get a response
-            # This is a fallback, so we'll poll with reasonable intervals
-            max_polls = 200  # Poll up to 200 times
-            poll_interval = 3  # 3 seconds between polls
-
-            for poll_count in range(max_polls):
-                await asyncio.sleep(poll_interval)
+                if not conversation_id:
+                    if run_status == "completed":
+                        break
+                    continue
 
                 try:
-                    messages_response = await asyncio.to_thread(
-                        client.conversations.messages.list,
-                        conversation_id,
-                        order="desc",
-                        limit=10,
+                    messages, cursor = await self._list_new_messages(
+                        client, conversation_id, cursor
                     )
-
-                    if hasattr(messages_response, "data") and messages_response.data:
-                        for msg in messages_response.data:
-                            if hasattr(msg, "message_type"):
-                                if (
-                                    msg.message_type == "assistant_message"
-                                    or msg.message_type == "assistant"
-                                ):
-                                    if hasattr(msg, "content") and msg.content:
-                                        logger.debug(
-                                            f"Found assistant message after {poll_count} polls"
-                                        )
-                                        return msg.content
-                                    elif hasattr(msg, "text") and msg.text:
-                                        return msg.text
+                    message_lists += 1
                 except Exception as poll_error:
                     logger.warning(
-                        f"Error polling conversation (attempt {poll_count}): {str(poll_error)}"
+                        f"Error polling conversation (attempt {polls}): {str(poll_error)}"
                     )
                     continue
 
-            logger.error(
-                f"No assistant message found after {max_polls} polling attempts"
-            )
+                for msg in reversed(messages):
+                    if getattr(msg, "message_type", None) in _ASSISTANT_MESSAGE_TYPES:
+                        content = _extract_content(msg)
+                        if content:
+                            logger.debug(f"Found assistant message after {polls} polls")
+                            return content
+
+                if run_status == "completed":
+                    logger.warning(
+                        f"Run {run_id} completed without an assistant message in "
+                        f"conversation {conversation_id}"
+                    )
+                    return None
+
+            if not conversation_id:
+                logger.error(
+                    "Could not extract conversation_id from run object (run_id=%s). "
+                    "Run may have failed before creating a conversation.",
+                    run_id,
+                )
+            else:
+                logger.error(f"No assistant message found after {polls} polls")
             return None
 
         except Exception as e:
             logger.error(f"Error in fallback async method: {str(e)}")
             raise
+        finally:
+            self.poll_metrics.record(polls, run_checks, message_lists)
+            logger.info(
+                f"Fallback turn polled {polls} times ({run_checks} run checks, "
+                f"{message_lists} message lists); "
+                f"avg {self.poll_metrics.avg_polls_per_turn:.1f} polls/turn"
+            )
 
     async def cleanup(self) -> None:
         """Clean up any resources used by the agent client."""
-        pass
+        # Close the shared keep-alive HTTP pool used by the async Letta client
+        try:
+            await close_letta_client()
+        except Exception as e:
+            logger.warning(f"Error closing Letta HTTP client: {str(e)}")
@@ -0,0 +1,297 @@
+"""Core block attachment tracking for the shared Letta agent."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Collection
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Letta error fragments of a conflicting attach: the block is already
+# attached, or another block holds its label on the agent
+_CONFLICT_MARKERS = (
+    "unique constraint",
+    "already exists",
+    "duplicate key",
+    "409",
+    "unique_agent_block",
+)
+
+
+def _is_conflict_error(error: Exception) -> bool:
+    """Return True if an attach error is a uniqueness conflict."""
+    err_msg = str(error).lower()
+    return any(marker in err_msg for marker in _CONFLICT_MARKERS)
+
+
+def _is_not_found_error(error: Exception) -> bool:
+    """Return True if a Letta error says the block does not exist."""
+    if getattr(error, "status_code", None) == 404:
+        return True
+    return type(error).__name__ == "NotFoundError"
+
+
+async def _list_ids(listing: Any) -> AsyncIterator[str]:
+    """IDs from an SDK list call, following pages when it auto-paginates."""
+    if hasattr(listing, "__aiter__"):
+        async for item in listing:
+            yield item.id
+        return
+    # Older SDKs return a single awaitable page (.items / .data / list)
+    page = await listing
+    items = page if isinstance(page, list) else None
+    for attr in ("items", "data"):
+        if items is None and isinstance(getattr(page, attr, None), list):
+            items = getattr(page, attr)
+    for item in items or []:
+        yield item.id
+
+
+@dataclass
+class BlockReconcileResult:
+    """Outcome of CoreBlockAttachments.reconcile()."""
+
+    attached: set[str] = field(default_factory=set)  # blocks on the agent
+    leaked: list[str] = field(default_factory=list)  # user blocks detached
+    missing: list[str] = field(default_factory=list)  # user blocks gone in Letta
+    reconciled_at: float = 0.0  # time.monotonic() of the run
+
+
+class CoreBlockAttachments:
+    """Tracks which user core blocks are attached to the agent.
+
+    Consecutive turns from the same user reuse the attached block instead of
+    paying an attach/detach pair per message. After its turn a block stays
+    attached until another user's turn needs the agent (acquire() first
+    detaches idle blocks of other users) or it has been idle for
+    idle_timeout seconds (sweep()). acquire() waits while another user's
+    block has a turn in flight, so a turn only ever runs with its own user's
+    block attached; all Letta calls are serialized under one lock.
+    """
+
+    def __init__(self, letta_client: Any, agent_id: str, idle_timeout: float):
+        """Initialize the attachment tracker.
+
+        Args:
+            letta_client: LettaClient wrapper (uses its async aio client)
+            agent_id: The agent the user blocks are attached to
+            idle_timeout: Seconds an unused block stays attached; 0 detaches
+                after every turn
+        """
+        self.letta_client = letta_client
+        self.agent_id = agent_id
+        self.idle_timeout = max(0.0, float(idle_timeout))
+        self._lock = asyncio.Lock()
+        # Notified when a block's last turn is released
+        self._released = asyncio.Condition(self._lock)
+        self._attached: dict[str, float] = {}  # block_id -> last used (monotonic)
+        self._in_use: dict[str, int] = {}  # block_id -> turns currently using it
+        self.last_reconcile: BlockReconcileResult | None = None
+
+    def is_attached(self, block_id: str) -> bool:
+        """Return True if the block is known to be attached to the agent."""
+        return block_id in self._attached
+
+    async def _attach(self, block_id: str) -> None:
+        """Attach a block, tolerating conflicts only if it is in fact attached.
+
+        Letta reports both "already attached" and "another block already has
+        this label" as uniqueness conflicts; the second means the turn would
+        run with another user's core memory, so it is raised.
+        """
+        logger.info(f"Attaching user core block {block_id[:8]}... to agent")
+        try:
+            await self.letta_client.aio.agents.blocks.attach(
+                block_id, agent_id=self.agent_id
+            )
+        except Exception as attach_error:
+            if not _is_conflict_error(attach_error):
+                raise
+            if not await self._is_on_agent(block_id):
+                raise
+            logger.info(f"Core block {block_id[:8]} already attached; continuing")
+
+    async def _is_on_agent(self, block_id: str, page_size: int = 100) -> bool:
+        """Return True if Letta lists block_id among the agent's blocks."""
+        listing = self.letta_client.aio.agents.blocks.list(
+            self.agent_id, limit=page_size
+        )
+        async for attached_id in _list_ids(listing):
+            if attached_id == block_id:
+                return True
+        return False
+
+    async def _detach(self, block_id: str) -> None:
+        """Detach a block from the agent."""
+        logger.info(f"Detaching core block {block_id[:8]}... from agent")
+        await self.letta_client.aio.agents.blocks.detach(
+            block_id, agent_id=self.agent_id
+        )
+
+    async def _detach_idle(self, keep: str | None = None, max_idle: float = 0.0) -> int:
+        """Detach unused blocks idle for at least max_idle seconds (lock held)."""
+        now = time.monotonic()
+        idle = [
+            block_id
+            for block_id, last_used in self._attached.items()
+            if block_id != keep
+            and not self._in_use.get(block_id)
+            and now - last_used >= max_idle
+        ]
+        for block_id in idle:
+            # Forget the block even if detach fails; a later attach of it
+            # tolerates "already attached"
+            del self._attached[block_id]
+            try:
+                await self._detach(block_id)
+            except Exception as e:
+                logger.error(f"Failed to detach idle core block {block_id[:8]}: {e}")
+        return len(idle)
+
+    async def acquire(self, block_id: str) -> None:
+        """Make sure a user's block is attached before their turn.
+
+        Waits until no other user's block has a turn in flight, then detaches
+        the idle blocks of other users so only this one stays on the agent.
+
+        Raises:
+            Exception: If attaching the block fails
+        """
+        async with self._lock:
+            await self._released.wait_for(lambda: not self._busy_except(block_id))
+            await self._detach_idle(keep=block_id)
+            if block_id in self._attached:
+                logger.info(f"Core block {block_id[:8]}... still attached; reusing")
+            else:
+                await self._attach(block_id)
+            self._attached[block_id] = time.monotonic()
+            self._in_use[block_id] = self._in_use.get(block_id, 0) + 1
+
+    def _busy_except(self, block_id: str) -> bool:
+        """Return True if a block other than block_id has a turn in flight."""
+        return any(count for other, count in self._in_use.items() if other != block_id)
+
+    async def release(self, block_id: str, detach: bool = False) -> None:
+        """Finish a turn that used block_id.
+
+        Args:
+            block_id: The block passed to acquire()
+            detach: Detach now instead of keeping the block for the user's next
+                turn (used after errors, when the agent state is uncertain)
+
+        Raises:
+            Exception: If an immediate detach fails (the block is forgotten anyway)
+        """
+        async with self._lock:
+            remaining = self._in_use.get(block_id, 0) - 1
+            if remaining > 0:
+                self._in_use[block_id] = remaining
+                return
+            self._in_use.pop(block_id, None)
+            self._released.notify_all()
+
+            if detach or self.idle_timeout <= 0:
+                self._attached.pop(block_id, None)
+                await self._detach(block_id)
+            elif block_id in self._attached:
+                self._attached[block_id] = time.monotonic()
+
+    async def sweep(self) -> int:
+        """Detach blocks that have been idle longer than idle_timeout.
+
+        Returns:
+            Number of blocks detached
+        """
+        if not self._attached:
+            return 0
+        async with self._lock:
+            return await self._detach_idle(max_idle=self.idle_timeout)
+
+    async def reconcile(
+        self,
+        user_blocks: Collection[str],
+        busy_blocks: Collection[str] = (),
+        page_size: int = 100,
+    ) -> BlockReconcileResult:
+        """Check the agent's attachments and the users' blocks against Letta.
+
+        Lists the agent's blocks and the users' core blocks (label "human")
+        with paged calls, then:
+
+        - drops tracked blocks that are no longer attached from the cache;
+        - detaches user blocks attached to the agent that this tracker does not
+          know about and whose user has no recent turn in any process
+          (busy_blocks), e.g. left behind by a turn that crashed between
+          attach and detach;
+        - reports user blocks that no longer exist in Letta (absent from the
+          listing and confirmed with a retrieve).
+
+        Args:
+            user_blocks: letta_block_id of every known user
+            busy_blocks: Blocks of users with a turn in flight, or one recent
+                enough that another process may keep the block attached
+            page_size: Items per list call
+
+        Returns:
+            What was found (also kept as last_reconcile)
+        """
+        user_blocks = set(user_blocks)
+        aio = self.letta_client.aio
+        result = BlockReconcileResult()
+        async with self._lock:
+            listing = aio.agents.blocks.list(self.agent_id, limit=page_size)
+            async for block_id in _list_ids(listing):
+                result.attached.add(block_id)
+
+            for block_id in list(self._attached):
+                if block_id not in result.attached and not self._in_use.get(
+                    block_id
+                ):
+                    del self._attached[block_id]
+
+            for block_id in sorted(result.attached & user_blocks):
+                if block_id in self._attached or block_id in busy_blocks:
+                    continue
+                try:
+                    await self._detach(block_id)
+                    result.leaked.append(block_id)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to detach leaked core block {block_id[:8]}: {e}"
+                    )
+
+        unseen = user_blocks - result.attached
+        if unseen:
+            listing = aio.blocks.list(label="human", limit=page_size)
+            async for block_id in _list_ids(listing):
+                unseen.discard(block_id)
+                if not unseen:
+                    break
+        for block_id in sorted(unseen):
+            try:
+                await aio.blocks.retrieve(block_id)
+            except Exception as e:
+                if _is_not_found_error(e):
+                    result.missing.append(block_id)
+                else:
+                    logger.error(f"Failed to check core block {block_id[:8]}: {e}")
+
+        result.reconciled_at = time.monotonic()
+        self.last_reconcile = result
+        if result.leaked or result.missing:
+            logger.warning(
+                f"Core block reconcile: detached {len(result.leaked)} leaked and "
+                f"found {len(result.missing)} missing user blocks"
+            )
+        return result
+
+    async def detach_all(self) -> int:
+        """Detach every block not currently in use (e.g. on shutdown).
+
+        Returns:
+            Number of blocks detached
+        """
+        async with self._lock:
+            return await self._detach_idle()
@@ -0,0 +1,234 @@
+"""Outbound response delivery from the outbox."""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any
+
+from common.config import DeliveryConfig
+from database.models import OutboxItem
+from database.operations.messages import get_message_platform_profile
+from database.operations.outbox import (
+    claim_outbox,
+    complete_outbox,
+    fail_outbox,
+    next_outbox_delay,
+    notify_outbox_activity,
+    reclaim_expired_outbox,
+    wait_for_outbox_activity,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDelivery:
+    """Per-platform worker pools that send the responses in the outbox.
+
+    The queue processor only commits a finished turn's response to the
+    outbox; these workers send it through the platform handler, retrying
+    failed sends with their own backoff (fail_outbox) so a slow or
+    rate-limited platform never holds an agent turn's concurrency slot.
+    """
+
+    def __init__(
+        self,
+        plugin_manager: Any,
+        workers_per_platform: int | None = None,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        lease_seconds: float | None = None,
+        send_timeout: float | None = None,
+        idle_poll_interval: float | None = None,
+    ):
+        """Initialize the delivery workers.
+
+        Args:
+            plugin_manager: The plugin manager whose platform handlers send
+                the responses
+            workers_per_platform: Concurrent sends per platform
+                (default: ``delivery.workers_per_platform``)
+            max_attempts: Failed sends before a response is marked failed
+                (default: ``delivery.max_attempts``)
+            base_delay: Seconds before the first resend, doubled per attempt
+                (default: ``delivery.base_delay``)
+            max_delay: Longest delay between resends
+                (default: ``delivery.max_delay``)
+            lease_seconds: Lease on each claimed response; an expired lease
+                is reclaimed and the response sent again
+                (default: ``delivery.lease_seconds``)
+            send_timeout: Seconds before a send is abandoned and retried,
+                capped at 80% of lease_seconds so the failure is recorded
+                while the lease is still held (default: ``delivery.send_timeout``)
+            idle_poll_interval: Fallback poll interval in seconds while idle
+                (default: ``delivery.idle_poll_interval``)
+        """
+        defaults = DeliveryConfig()
+        self.plugin_manager = plugin_manager
+        if workers_per_platform is None:
+            workers_per_platform = defaults.workers_per_platform
+        if max_attempts is None:
+            max_attempts = defaults.max_attempts
+        if base_delay is None:
+            base_delay = defaults.base_delay
+        if max_delay is None:
+            max_delay = defaults.max_delay
+        if lease_seconds is None:
+            lease_seconds = defaults.lease_seconds
+        if send_timeout is None:
+            send_timeout = defaults.send_timeout
+        if idle_poll_interval is None:
+            idle_poll_interval = defaults.idle_poll_interval
+        self.workers_per_platform = max(1, int(workers_per_platform))
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.lease_seconds = float(lease_seconds)
+        self.send_timeout = min(float(send_timeout), self.lease_seconds * 0.8)
+        self.idle_poll_interval = float(idle_poll_interval)
+        self.lease_owner = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.is_running = False
+        self._stop_event = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def deliver_next(self, platform: str) -> bool:
+        """Claim and send the platform's next due response, if any.
+
+        Returns:
+            True if a response was claimed (sent or not), False if none was due
+        """
+        item = await claim_outbox(platform, self.lease_owner, self.lease_seconds)
+        if item is None:
+            return False
+
+        profile = await get_message_platform_profile(item.message_id)
+        handler = self.plugin_manager.get_platform_handler(platform)
+        if not profile or not handler:
+            # Nothing to send to; retrying will not help
+            error = (
+                f"No handler registered for platform {platform}"
+                if profile
+                else f"Could not find platform profile for message {item.message_id}"
+            )
+            logger.error(f"Dropping outbox item {item.id}: {error}")
+            await fail_outbox(item, error, max_attempts=1)
+            return True
+
+        try:
+            await asyncio.wait_for(
+                handler(item.response, profile, item.message_id),
+                timeout=self.send_timeout,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._record_failure(item, e)
+            return True
+
+        await complete_outbox(item.id)
+        logger.debug(f"Delivered outbox item {item.id} via {platform}")
+        return True
+
+    async def _record_failure(self, item: OutboxItem, error: Exception) -> None:
+        """Schedule a resend of a failed delivery or give up on it."""
+        message = str(error) or type(error).__name__
+        retry = await fail_outbox(
+            item,
+            message,
+            max_attempts=self.max_attempts,
+            base_delay=self.base_delay,
+            max_delay=self.max_delay,
+        )
+        if retry:
+            logger.warning(
+                f"Delivery of outbox item {item.id} via {item.platform} failed "
+                f"(attempt {item.attempts + 1}/{self.max_attempts}): {message}"
+            )
+        else:
+            logger.error(
+                f"Giving up on outbox item {item.id} via {item.platform} after "
+                f"{self.max_attempts} attempts: {message}"
+            )
+
+    async def _worker(self, platform: str) -> None:
+        """Deliver a platform's responses until stopped."""
+        while not self._stop_event.is_set():
+            try:
+                if await self.deliver_next(platform):
+                    continue
+                # Idle: sleep until an enqueue, or until the earliest
+                # backed-off response is due
+                timeout = self.idle_poll_interval
+                delay = await next_outbox_delay(platform)
+                if delay is not None:
+                    timeout = min(timeout, delay)
+                await wait_for_outbox_activity(timeout)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in {platform} delivery worker: {str(e)}")
+                await asyncio.sleep(self.idle_poll_interval)
+
+    async def _reclaim_expired(self) -> None:
+        """Return sends abandoned by crashed workers to pending."""
+        while not self._stop_event.is_set():
+            try:
+                await reclaim_expired_outbox()
+            except Exception as e:
+                logger.error(f"Error reclaiming outbox leases: {str(e)}")
+            try:
+                await asyncio.wait_for(
+                    self._stop_event.wait(), timeout=self.lease_seconds / 2
+                )
+            except TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        """Start the workers for every platform with a registered handler."""
+        if self.is_running:
+            logger.warning("Outbox delivery is already running")
+            return
+
+        self.is_running = True
+        self._stop_event.clear()
+        platforms = self.plugin_manager.get_platforms()
+        self._spawn(self._reclaim_expired())
+        for platform in platforms:
+            for _ in range(self.workers_per_platform):
+                self._spawn(self._worker(platform))
+        logger.info(
+            f"Outbox delivery started for {', '.join(platforms) or 'no platforms'} "
+            f"({self.workers_per_platform} workers per platform)"
+        )
+
+    def _spawn(self, coro: Any) -> None:
+        """Run a worker coroutine as a task tracked for stop()."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop the workers, letting in-progress sends finish up to timeout.
+
+        Responses not yet sent stay in the outbox for the next start.
+        """
+        if not self.is_running:
+            return
+
+        logger.info("Stopping outbox delivery...")
+        self.is_running = False
+        self._stop_event.set()
+        # Wake idle workers so they can observe the stop
+        notify_outbox_activity()
+
+        tasks = list(self._tasks)
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        logger.info("Outbox delivery stopped")
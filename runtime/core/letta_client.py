@@ -3,17 +3,25 @@ Letta API client implementation using the official SDK.
 
 Letta 1.x compliance (SDK 1.7.x):
 - No top-level identities: use create_identity() (POST /v1/identities/) instead.
-- Sync SDK (Letta) is used; all sync calls from async code are run via
-  asyncio.to_thread() in runtime.core.agent and runtime.core.queue.
+- Async code uses client.aio (AsyncLetta) on one shared, keep-alive
+  httpx.AsyncClient; the sync SDK (Letta) stays available for sync callers.
 - Blocks: client.blocks for global blocks; client.agents.blocks for
   agent core-memory attach/detach. Both exist in 1.x.
+
+HTTP pool tuning (environment):
+- LETTA_HTTP_MAX_CONNECTIONS (default 20)
+- LETTA_HTTP_MAX_KEEPALIVE (default 10)
+- LETTA_HTTP_KEEPALIVE_EXPIRY seconds (default 30)
+- LETTA_HTTP2 (default true; used only when the h2 package is installed)
 """
 
+import asyncio
+import importlib.util
 import logging
 from typing import Any
 
 import httpx
-from letta_client import Letta
+from letta_client import AsyncLetta, Letta
 
 from common.config import get_env_var
 
@@ -28,6 +36,11 @@ class _IdentityCreateResponse:
         self.id = id
 
 
+def _http2_available() -> bool:
+    """Return True if httpx can negotiate HTTP/2 (needs the h2 package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
 class LettaClient:
     """Client for interacting with the Letta API."""
 
@@ -49,6 +62,71 @@ class LettaClient:
                 base_url=self.api_endpoint, api_key=self.api_key, max_retries=0
             )
 
+        # Shared async transport, created lazily inside the running event loop
+        self.http_limits = httpx.Limits(
+            max_connections=get_env_var(
+                "LETTA_HTTP_MAX_CONNECTIONS", default=20, cast_type=int
+            ),
+            max_keepalive_connections=get_env_var(
+                "LETTA_HTTP_MAX_KEEPALIVE", default=10, cast_type=int
+            ),
+            keepalive_expiry=get_env_var(
+                "LETTA_HTTP_KEEPALIVE_EXPIRY", default=30.0, cast_type=float
+            ),
+        )
+        want_http2 = get_env_var(
+            "LETTA_HTTP2",
+            default=True,
+            cast_type=lambda x: str(x).lower() == "true",
+        )
+        self.http2 = bool(want_http2) and _http2_available()
+        self._http_client: httpx.AsyncClient | None = None
+        self._async_client: AsyncLetta | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_async_client(self) -> AsyncLetta:
+        """Create the shared httpx.AsyncClient and AsyncLetta for this event loop."""
+        loop = asyncio.get_running_loop()
+        if (
+            self._async_client is None
+            or self._async_loop is not loop
+            or self._http_client.is_closed
+        ):
+            # httpx connections are bound to the loop that opened them
+            self._http_client = httpx.AsyncClient(
+                limits=self.http_limits,
+                http2=self.http2,
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            )
+            self._async_client = AsyncLetta(
+                base_url=self.api_endpoint,
+                api_key=self.api_key,
+                timeout=60.0,
+                max_retries=0,
+                http_client=self._http_client,
+            )
+            self._async_loop = loop
+            logger.debug(
+                "Created shared Letta HTTP client (http2=%s, max_connections=%s)",
+                self.http2,
+                self.http_limits.max_connections,
+            )
+        return self._async_client
+
+    @property
+    def aio(self) -> AsyncLetta:
+        """Async Letta SDK client on the shared keep-alive connection pool.
+
+        Must be accessed from inside a running event loop.
+        """
+        return self._ensure_async_client()
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared httpx.AsyncClient used by aio and create_identity."""
+        self._ensure_async_client()
+        return self._http_client
+
     @property
     def client(self):
         """Get the underlying Letta client instance."""
@@ -100,17 +178,37 @@ class LettaClient:
             "name": name,
             "identity_type": identity_type,
         }
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(url, json=body, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+        response = await self.http_client.post(url, json=body, headers=headers)
+        response.raise_for_status()
+        data = response.json()
         return _IdentityCreateResponse(id=data["id"])
 
+    async def update_identity(self, identity_id: str, *, name: str) -> None:
+        """Rename a Letta identity via PATCH /v1/identities/{identity_id}."""
+        url = f"{self.api_endpoint.rstrip('/')}/v1/identities/{identity_id}"
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        response = await self.http_client.patch(
+            url, json={"name": name}, headers=headers
+        )
+        response.raise_for_status()
+
     def close(self):
         """Close the client."""
         # The official client doesn't need explicit closing
         pass
 
+    async def aclose(self) -> None:
+        """Close the shared async HTTP connection pool, if one was opened."""
+        http_client = self._http_client
+        self._http_client = None
+        self._async_client = None
+        self._async_loop = None
+        if http_client is not None and not http_client.is_closed:
+            await http_client.aclose()
+
 
 # Create a singleton instance
 _letta_client: LettaClient | None = None
@@ -129,3 +227,9 @@ def get_letta_client() -> LettaClient:
     if _letta_client is None:
         _letta_client = LettaClient()
     return _letta_client
+
+
+async def close_letta_client() -> None:
+    """Close the singleton's shared HTTP pool without creating a client."""
+    if _letta_client is not None:
+        await _letta_client.aclose()
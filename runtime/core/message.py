@@ -1,6 +1,7 @@
 """Message handling and formatting functionality."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
@@ -83,6 +84,24 @@ class MessageFormatter:
         # Join all parts with spaces
         return " ".join(parts)
 
+    @staticmethod
+    def merge_messages(messages: Sequence[tuple[str, datetime | None]]) -> str:
+        """Merge several messages from one user into a single message body.
+
+        Args:
+            messages: (text, received time in UTC or None) pairs, oldest first
+
+        Returns:
+            One line per message, prefixed with its timestamp when known
+        """
+        lines = []
+        for text, timestamp in messages:
+            if timestamp is not None:
+                lines.append(f"[{timestamp:%Y-%m-%d %H:%M:%S} UTC] {text}")
+            else:
+                lines.append(text)
+        return "\n".join(lines)
+
     @staticmethod
     def extract_message_content(formatted_message: str) -> str:
         """Extract the actual message content from a formatted message.
@@ -291,6 +291,10 @@ class PluginManager:
         """
         return self._platform_handlers.get(platform)
 
+    def get_platforms(self) -> list[str]:
+        """Get the names of platforms with a registered message handler."""
+        return list(self._platform_handlers)
+
     async def discover_plugins(
         self, plugins_dir: str = "plugins", config: dict[str, Any] | None = None
     ) -> None:
@@ -2,30 +2,43 @@
 
 import asyncio
 import logging
-from collections.abc import Callable
+import os
+import socket
+import uuid
+from collections.abc import Awaitable, Callable, Sequence
+from datetime import UTC, datetime
 from typing import Any
 
-from common.config import get_env_var
+from common.config import DeliveryConfig, QueueProcessorConfig, get_env_var
 from common.exceptions import AgentTurnTimeoutInFlight
+from database.models import PlatformProfile
 from database.operations.messages import (
     get_message_platform_profile,
-    get_message_text,
-    update_message_with_response,
+    save_turn_response,
+)
+from database.operations.provisioning import (
+    mark_blocks_missing,
+    resume_provisioning,
 )
 from database.operations.queue import (
-    atomic_dequeue_item,
+    atomic_dequeue_batch,
+    claim_user_pending,
+    get_queue_item_context,
+    get_queue_messages,
+    next_retry_delay,
+    notify_queue_activity,
+    reclaim_expired_leases,
+    release_queue_items,
+    renew_leases,
     requeue_failed_item,
     requeue_stale_processing_items,
-    update_queue_status,
-)
-from database.operations.users import (
-    get_letta_identity_id,
-    get_letta_user_block_id,
-    get_platform_profile_id,
-    get_user_details,
+    set_queue_status,
+    wait_for_queue_activity,
 )
+from database.operations.users import get_user_blocks
 from runtime.core.letta_client import get_letta_client
 
+from .blocks import BlockReconcileResult, CoreBlockAttachments
 from .message import MessageFormatter
 
 logger = logging.getLogger(__name__)
@@ -42,6 +55,19 @@ class QueueProcessor:
         telegram_client: Any | None = None,
         on_message_processed: Callable[[int, str], None] | None = None,
         max_concurrent: int | None = None,
+        idle_poll_interval: float | None = None,
+        block_idle_timeout: float | None = None,
+        block_reconcile_interval: float | None = None,
+        lease_seconds: float | None = None,
+        heartbeat_interval: float | None = None,
+        scheduling_policy: str | None = None,
+        user_weights: dict[Any, float] | None = None,
+        user_priorities: dict[Any, int] | None = None,
+        max_attempts: int | None = None,
+        coalesce_messages: bool | None = None,
+        coalesce_max_messages: int | None = None,
+        outbox_delivery: bool | None = None,
+        on_partial: Callable[[str, Any, int], Awaitable[None]] | None = None,
     ):
         """Initialize the queue processor.
 
@@ -51,7 +77,37 @@ class QueueProcessor:
             plugin_manager: The plugin manager instance for routing responses
             telegram_client: The Telegram client instance for typing indicator
             on_message_processed: Optional callback for when a message is processed
-            max_concurrent: Maximum number of concurrent messages to process (default: 3, or from config)
+            max_concurrent: Maximum number of users processed concurrently;
+                their turns on the shared agent still run one at a time
+                (default: ``queue_processor.max_concurrent`` config default)
+            idle_poll_interval: Fallback poll interval in seconds while idle
+                (default: ``queue_processor.idle_poll_interval`` config default)
+            block_idle_timeout: Seconds a user's core block stays attached after
+                their turn (default: ``queue_processor.block_idle_timeout``)
+            block_reconcile_interval: Seconds between block reconciles after
+                the one at startup; 0 disables them
+                (default: ``queue_processor.block_reconcile_interval``)
+            lease_seconds: Lease on each claimed item, renewed while its turn
+                runs (default: ``queue_processor.lease_seconds``)
+            heartbeat_interval: Seconds between lease renewals and expired-lease
+                sweeps (default: ``queue_processor.heartbeat_interval``)
+            scheduling_policy: How users' next messages are ordered against each
+                other (default: ``queue_processor.scheduling_policy``)
+            user_weights: letta_user_id -> weight for the weighted policy
+            user_priorities: letta_user_id -> priority boost for the user's rows
+            max_attempts: Failed turns before an item is dead-lettered
+                (default: ``queue_processor.max_attempts``)
+            coalesce_messages: Merge a user's pending messages into one turn
+                (default: ``queue_processor.coalesce_messages``)
+            coalesce_max_messages: Most messages merged into one turn
+                (default: ``queue_processor.coalesce_max_messages``)
+            outbox_delivery: Hand responses to the outbox for the delivery
+                workers instead of sending them inline (default:
+                ``delivery.enabled``)
+            on_partial: Optional handler(text, profile, message_id) awaited with
+                the assistant text so far while a live turn streams, for
+                platforms that render replies progressively; the final
+                response is still routed or queued for delivery as usual
         """
         self.message_processor = message_processor
         self.message_mode = message_mode
@@ -60,71 +116,135 @@ class QueueProcessor:
         self.plugin_manager = plugin_manager
         self.telegram_client = telegram_client
         self.on_message_processed = on_message_processed
+        self.on_partial = on_partial
         self.processing_messages = set()  # Track messages being processed
         self._stop_event = asyncio.Event()
         self.letta_client = get_letta_client()
         self.agent_id = get_env_var("AGENT_ID", required=True)
 
-        # Hard constraint: single-flight processing only
-        self.max_concurrent = 1
+        # One lane per Letta user: a user's messages run strictly in order, while
+        # different users run concurrently up to max_concurrent (their agent
+        # turns still take _agent_turn_lock one at a time).
+        defaults = QueueProcessorConfig()
+        if max_concurrent is None:
+            max_concurrent = defaults.max_concurrent
+        self.max_concurrent = max(1, int(max_concurrent))
+        # Enqueues in this process wake the loop immediately; the poll only
+        # catches rows inserted by other processes (CLI tools).
+        if idle_poll_interval is None:
+            idle_poll_interval = defaults.idle_poll_interval
+        self.idle_poll_interval = float(idle_poll_interval)
         self._concurrency_semaphore = asyncio.Semaphore(self.max_concurrent)
         self._processing_tasks: set[asyncio.Task] = set()
+        self._active_users: set[int] = set()
+        # All users share one agent whose "human" block is the current user's
+        # core memory, so live turns run one at a time; lanes overlap the
+        # rest (claiming, formatting, status writes, delivery)
+        self._agent_turn_lock = asyncio.Lock()
+
+        # Keeps a user's core block attached across their consecutive turns
+        if block_idle_timeout is None:
+            block_idle_timeout = defaults.block_idle_timeout
+        self.block_attachments = CoreBlockAttachments(
+            self.letta_client, self.agent_id, block_idle_timeout
+        )
+        # Leaked attachments and deleted user blocks are repaired before they
+        # fail turns (see reconcile_blocks)
+        if block_reconcile_interval is None:
+            block_reconcile_interval = defaults.block_reconcile_interval
+        self.block_reconcile_interval = float(block_reconcile_interval)
+
+        # Claims are leased to this consumer and renewed while the turn runs,
+        # so several processes can share one database: a crashed consumer's
+        # items are reclaimed once its leases expire.
+        if lease_seconds is None:
+            lease_seconds = defaults.lease_seconds
+        if heartbeat_interval is None:
+            heartbeat_interval = defaults.heartbeat_interval
+        self.lease_seconds = float(lease_seconds)
+        self.heartbeat_interval = min(
+            float(heartbeat_interval), self.lease_seconds / 2
+        )
+        self.lease_owner = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+
+        # Priority and fair share across users; settings.json keys are strings
+        self.scheduling_policy = scheduling_policy or defaults.scheduling_policy
+        self.user_weights = {int(k): float(v) for k, v in (user_weights or {}).items()}
+        self.user_priorities = {
+            int(k): int(v) for k, v in (user_priorities or {}).items()
+        }
+
+        # Poison messages are retried with backoff, then dead-lettered
+        if max_attempts is None:
+            max_attempts = defaults.max_attempts
+        self.max_attempts = max(1, int(max_attempts))
+
+        # A burst of messages from one user can share a single agent turn
+        if coalesce_messages is None:
+            coalesce_messages = defaults.coalesce_messages
+        if coalesce_max_messages is None:
+            coalesce_max_messages = defaults.coalesce_max_messages
+        self.coalesce_messages = bool(coalesce_messages)
+        self.coalesce_max_messages = max(1, int(coalesce_max_messages))
+
+        # Responses are committed to the outbox with the turn's status and
+        # sent by runtime.core.delivery, so a slow platform API does not hold
+        # this turn's concurrency slot
+        if outbox_delivery is None:
+            outbox_delivery = DeliveryConfig().enabled
+        self.outbox_delivery = bool(outbox_delivery)
 
     async def _process_with_core_block(
-        self, message: str, letta_user_id: int
+        self,
+        message: str,
+        letta_user_id: int,
+        block_id: str | None,
+        identity_id: str | None,
+        on_partial: Callable[[str], Awaitable[None]] | None = None,
     ) -> tuple[str | None, str]:
-        """Process a message with proper core block management."""
-        # Get the user's core block ID
-        block_id = await get_letta_user_block_id(letta_user_id)
+        """Process a message with proper core block management.
+
+        Args:
+            message: The formatted message to send
+            letta_user_id: ID of the Letta user the message belongs to
+            block_id: The user's core block ID (from get_queue_item_context)
+            identity_id: The user's Letta identity ID, used as sender_id
+            on_partial: Passed to the message processor, which awaits it with
+                the assistant text so far while the turn streams
+        """
         if not block_id:
             logger.error(
                 f"Core block not found for user {letta_user_id} - Cannot process message"
             )
             return None, "failed"
 
+        acquired = False
         try:
-            # Attach core block (sync SDK call run in thread to avoid blocking event loop)
-            logger.info(f"Attaching user core block {block_id[:8]}... to agent")
-            try:
-                await asyncio.to_thread(
-                    self.letta_client.agents.blocks.attach,
-                    block_id,
-                    agent_id=self.agent_id,
-                )
-            except Exception as attach_error:
-                err_msg = str(attach_error).lower()
-                if (
-                    "unique constraint" in err_msg
-                    or "already exists" in err_msg
-                    or "duplicate key" in err_msg
-                    or "409" in err_msg
-                    or "unique_agent_block" in err_msg
-                ):
-                    logger.info(
-                        f"Core block {block_id[:8]} already attached; continuing"
-                    )
-                else:
-                    raise
+            # Attach core block unless it is still attached from this user's
+            # previous turn
+            await self.block_attachments.acquire(block_id)
+            acquired = True
 
             # Process the message (pass sender_id so Letta scopes conversation per user)
             logger.info(
                 f"Processing message with attached core block {block_id[:8]}..."
             )
-            identity_id = await get_letta_identity_id(letta_user_id)
             if not identity_id:
                 logger.warning(
                     "letta_user_id=%s has no letta_identity_id; sending without sender_id (conversation may be shared)",
                     letta_user_id,
                 )
-            response = await self.message_processor(message, sender_id=identity_id)
-
-            # Detach core block (sync SDK call run in thread)
-            logger.info(f"Detaching core block {block_id[:8]}... from agent")
-            await asyncio.to_thread(
-                self.letta_client.agents.blocks.detach,
-                block_id,
-                agent_id=self.agent_id,
-            )
+            kwargs = {"sender_id": identity_id}
+            if on_partial is not None:
+                kwargs["on_partial"] = on_partial
+            response = await self.message_processor(message, **kwargs)
+
+            # Keep the block attached for the user's next turn; it is detached
+            # when another user needs the agent or after block_idle_timeout
+            await self.block_attachments.release(block_id)
+            acquired = False
 
             if not response:
                 logger.warning(
@@ -134,16 +254,24 @@ class QueueProcessor:
 
             return response, "completed"
 
+        except asyncio.CancelledError:
+            # Cancelled by the outer timeout or stop(): free the block so the
+            # next user's acquire() does not wait on this turn forever
+            if acquired:
+                try:
+                    await self.block_attachments.release(block_id, detach=True)
+                except Exception as detach_error:
+                    logger.error(
+                        f"Failed to detach core block after cancellation: {str(detach_error)}"
+                    )
+            raise
+
         except AgentTurnTimeoutInFlight:
             try:
                 logger.info(
                     f"Cleaning up: Detaching core block {block_id[:8]}... from agent"
                 )
-                await asyncio.to_thread(
-                    self.letta_client.agents.blocks.detach,
-                    block_id,
-                    agent_id=self.agent_id,
-                )
+                await self.block_attachments.release(block_id, detach=True)
                 logger.info("Core block successfully detached")
             except Exception as detach_error:
                 logger.error(
@@ -158,11 +286,7 @@ class QueueProcessor:
                 logger.info(
                     f"Cleaning up: Detaching core block {block_id[:8]}... from agent"
                 )
-                await asyncio.to_thread(
-                    self.letta_client.agents.blocks.detach,
-                    block_id,
-                    agent_id=self.agent_id,
-                )
+                await self.block_attachments.release(block_id, detach=True)
                 logger.info("Core block successfully detached")
             except Exception as detach_error:
                 logger.error(
@@ -170,61 +294,124 @@ class QueueProcessor:
                 )
             return None, "failed"
 
+    async def _coalesce_pending(
+        self, queue_item: Any, message: str
+    ) -> tuple[list[Any], str]:
+        """Claim the user's other pending messages and merge them into this turn.
+
+        Args:
+            queue_item: The claimed queue item (the user's oldest message)
+            message: Its message text
+
+        Returns:
+            The claimed items, queue_item first, and the merged message text
+        """
+        extras = await claim_user_pending(
+            queue_item.letta_user_id,
+            self.coalesce_max_messages - 1,
+            lease_owner=self.lease_owner,
+            lease_seconds=self.lease_seconds,
+        )
+        if not extras:
+            return [queue_item], message
+
+        batch = [queue_item, *extras]
+        # Leases of the merged rows are renewed with the claimed item's
+        self.processing_messages.update(item.id for item in extras)
+        texts = await get_queue_messages(item.id for item in batch)
+        merged = []
+        for item in batch:
+            text, received_at = texts.get(item.id, (None, None))
+            if text is None:
+                continue
+            timestamp = None
+            if received_at is not None:
+                timestamp = datetime.fromtimestamp(received_at / 1000, UTC)
+            merged.append((text, timestamp))
+        logger.info(
+            f"Coalesced {len(batch)} queued messages of user "
+            f"{queue_item.letta_user_id} into one turn"
+        )
+        return batch, self.formatter.merge_messages(merged)
+
+    async def _set_batch_status(self, batch: Sequence[Any], status: str) -> None:
+        """Set the status of every item in a turn, awaiting only the last write.
+
+        The last update is a durability barrier for the others; they are not
+        atomic with it.
+        """
+        for item in batch[:-1]:
+            await set_queue_status(item.id, status, durable=False)
+        await set_queue_status(batch[-1].id, status)
+
+    async def _requeue_batch(
+        self, batch: Sequence[Any], error: str, failure_class: str
+    ) -> None:
+        """Requeue a failed turn; merged messages go back without an attempt."""
+        await requeue_failed_item(
+            batch[0].id,
+            max_attempts=self.max_attempts,
+            error=error,
+            failure_class=failure_class,
+        )
+        if len(batch) > 1:
+            await release_queue_items(item.id for item in batch[1:])
+
+    def _partial_handler(
+        self, profile: PlatformProfile, message_id: int
+    ) -> Callable[[str], Awaitable[None]] | None:
+        """Bind on_partial to a turn's profile and reply-to message, if set."""
+        if self.on_partial is None:
+            return None
+
+        async def on_partial(text: str) -> None:
+            await self.on_partial(text, profile, message_id)
+
+        return on_partial
+
     async def _process_single_message(self, queue_item: Any) -> None:
         """Process a single message from the queue.
 
+        With coalesce_messages, the user's other pending messages are merged
+        into the same turn and share its response.
+
         Args:
             queue_item: The queue item to process
         """
+        batch = [queue_item]
         try:
-            # Get message details
-            message_data = await get_message_text(queue_item.message_id)
-            if not message_data:
+            # Message, profile and Letta IDs in a single query
+            context = await get_queue_item_context(queue_item.id)
+            if not context or context.message is None:
                 logger.warning(f"Message {queue_item.message_id} not found in database")
-                # Try to requeue, if max attempts exceeded it will be marked as failed
-                await requeue_failed_item(queue_item.id)
-                return
-
-            (
-                _,
-                message_text,
-            ) = message_data  # Get the message text (second element) instead of role
-
-            # Get user details
-            user_data = await get_user_details(queue_item.letta_user_id)
-            if not user_data:
-                logger.warning(
-                    f"User details not found for Letta user {queue_item.letta_user_id} "
-                    "(orphaned queue item); marking as failed"
+                # Try to requeue, if max attempts exceeded it is dead-lettered
+                await requeue_failed_item(
+                    queue_item.id,
+                    max_attempts=self.max_attempts,
+                    error=f"Message {queue_item.message_id} not found",
+                    failure_class="missing_message",
                 )
-                await update_queue_status(queue_item.id, "failed")
                 return
 
-            display_name, username = user_data
-
-            # Format message with consistent metadata
-            platform_profile = await get_platform_profile_id(queue_item.letta_user_id)
-            if not platform_profile:
+            profile = context.profile
+            if not profile:
                 logger.warning(
                     f"Platform profile not found for Letta user {queue_item.letta_user_id} "
                     "(orphaned queue item); marking as failed"
                 )
-                await update_queue_status(queue_item.id, "failed")
+                await set_queue_status(queue_item.id, "failed")
                 return
 
-            platform_profile_id, platform_user_id = platform_profile
-
-            # Get platform name from profile
-            from database.operations.users import get_platform_profile
-
-            profile = await get_platform_profile(platform_profile_id)
-            platform_name = profile.platform if profile else None
+            message = context.message
+            if self.coalesce_messages and self.coalesce_max_messages > 1:
+                batch, message = await self._coalesce_pending(queue_item, message)
 
+            # Format message with consistent metadata
             formatted_message = self.formatter.format_message(
-                message=message_text,
-                platform_user_id=platform_user_id,
-                username=username,
-                platform=platform_name,
+                message=message,
+                platform_user_id=profile.platform_user_id,
+                username=profile.username,
+                platform=profile.platform,
             )
 
             # Process message according to mode
@@ -255,19 +442,25 @@ class QueueProcessor:
                     f"(queue timeout {timeout_seconds}s; LONG_TASK_MAX_WAIT={long_task_max}s)"
                 )
                 try:
-                    response, status = await asyncio.wait_for(
-                        self._process_with_core_block(
-                            message=formatted_message,
-                            letta_user_id=queue_item.letta_user_id,
-                        ),
-                        timeout=timeout_seconds,
-                    )
+                    async with self._agent_turn_lock:
+                        response, status = await asyncio.wait_for(
+                            self._process_with_core_block(
+                                message=formatted_message,
+                                letta_user_id=queue_item.letta_user_id,
+                                block_id=context.letta_block_id,
+                                identity_id=context.letta_identity_id,
+                                on_partial=self._partial_handler(
+                                    profile, batch[-1].message_id
+                                ),
+                            ),
+                            timeout=timeout_seconds,
+                        )
                 except TimeoutError:
                     logger.error(
                         f"Message processing timed out after {timeout_seconds}s"
                     )
                     try:
-                        await update_queue_status(queue_item.id, "failed")
+                        await self._set_batch_status(batch, "failed")
                     except Exception as upd_exc:
                         logger.error(
                             "Failed to persist queue status=failed after outer timeout "
@@ -282,7 +475,7 @@ class QueueProcessor:
                     return
                 except AgentTurnTimeoutInFlight as exc:
                     try:
-                        await update_queue_status(queue_item.id, "failed")
+                        await self._set_batch_status(batch, "failed")
                     except Exception as upd_exc:
                         logger.error(
                             "Failed to persist queue status=failed after in-flight timeout "
@@ -297,26 +490,29 @@ class QueueProcessor:
                     return
 
             if response:
-                # Update message and queue status
-                await update_message_with_response(queue_item.message_id, response)
-                await update_queue_status(queue_item.id, status)
-
-                # Route response through platform handler
-                if not await self._route_response(queue_item.message_id, response):
+                # Responses, queue status and (with outbox delivery) the
+                # outbox row commit in one transaction, so a failed write
+                # leaves the turn to be requeued, not completed
+                await save_turn_response(
+                    [item.message_id for item in batch],
+                    [item.id for item in batch],
+                    response,
+                    status,
+                    outbox_platform=profile.platform if self.outbox_delivery else None,
+                    letta_user_id=queue_item.letta_user_id,
+                )
+                # Otherwise route response through platform handler, as a
+                # reply to the latest message of the turn
+                if not self.outbox_delivery and not await self._route_response(
+                    batch[-1].message_id, response, profile=profile
+                ):
                     logger.warning("Failed to route response through platform handler")
             else:
-                # Backoff before requeue to avoid spam retries
-                attempts = getattr(queue_item, "attempts", 0) or 0
-                delay = min(5 * (2**attempts), 300)
-                if delay > 0:
-                    logger.warning(
-                        f"Backing off for {delay:.0f}s before requeue "
-                        f"(attempt {attempts + 1})"
-                    )
-                    await asyncio.sleep(delay)
-
-                # Try to requeue if no response, if max attempts exceeded it will be marked as failed
-                await requeue_failed_item(queue_item.id)
+                # Requeue with a retry delay (not_before) instead of sleeping on
+                # this slot; if max attempts exceeded it is dead-lettered
+                await self._requeue_batch(
+                    batch, "No response received from agent", "no_response"
+                )
                 logger.warning(
                     "No response received from agent - Message processing failed"
                 )
@@ -331,7 +527,7 @@ class QueueProcessor:
                 exc,
             )
             try:
-                await update_queue_status(queue_item.id, "failed")
+                await self._set_batch_status(batch, "failed")
             except Exception as upd_exc:
                 logger.error(
                     "Failed to persist queue status=failed (item %s): %s — "
@@ -342,19 +538,15 @@ class QueueProcessor:
 
         except Exception as e:
             logger.error(f"Error processing queue item {queue_item.id}: {str(e)}")
-            attempts = getattr(queue_item, "attempts", 0) or 0
-            delay = min(5 * (2**attempts), 300)
-            if delay > 0:
-                logger.warning(
-                    f"Backing off for {delay:.0f}s before requeue "
-                    f"(attempt {attempts + 1})"
-                )
-                await asyncio.sleep(delay)
-            # Try to requeue on error, if max attempts exceeded it will be marked as failed
-            await requeue_failed_item(queue_item.id)
+            # Requeue with a retry delay, if max attempts exceeded it is
+            # dead-lettered
+            await self._requeue_batch(batch, str(e), type(e).__name__)
+
+        finally:
+            self.processing_messages.difference_update(item.id for item in batch[1:])
 
     async def _process_single_message_with_tracking(self, queue_item: Any) -> None:
-        """Wrapper to track message processing and manage semaphore.
+        """Wrapper to track message processing, the user's lane and the semaphore.
 
         Args:
             queue_item: The queue item to process
@@ -365,14 +557,23 @@ class QueueProcessor:
             await self._process_single_message(queue_item)
         finally:
             self.processing_messages.discard(queue_item.id)
+            self._active_users.discard(queue_item.letta_user_id)
             self._concurrency_semaphore.release()
+            # A freed lane may unblock that user's next pending message
+            notify_queue_activity()
 
-    async def _route_response(self, message_id: int, response: str) -> bool:
+    async def _route_response(
+        self,
+        message_id: int,
+        response: str,
+        profile: PlatformProfile | None = None,
+    ) -> bool:
         """Route a response through the appropriate platform handler.
 
         Args:
             message_id: ID of the message being responded to
             response: The response to route
+            profile: The message's platform profile, if already loaded
 
         Returns:
             bool: True if routing succeeded, False otherwise
@@ -381,8 +582,9 @@ class QueueProcessor:
             logger.warning("No plugin manager available for response routing")
             return False
 
-        # Get the platform profile for the message
-        profile = await get_message_platform_profile(message_id)
+        # Get the platform profile for the message unless the caller has it
+        if profile is None:
+            profile = await get_message_platform_profile(message_id)
         if not profile:
             logger.error(f"Could not find platform profile for message {message_id}")
             return False
@@ -421,43 +623,81 @@ class QueueProcessor:
             f"(max concurrent: {self.max_concurrent})"
         )
 
+        lease_task = asyncio.create_task(self._maintain_leases())
+        reconcile_task = asyncio.create_task(self._reconcile_blocks_periodically())
         try:
-            # Requeue any stuck processing items from previous crashes
+            # Requeue any stuck unleased processing items from previous crashes
             await requeue_stale_processing_items()
 
             while self.is_running and not self._stop_event.is_set():
+                held_slots = 0
                 try:
-                    # Wait for available concurrency slot
+                    # Wait for one free concurrency slot, then take any others
+                    # that are free right now so a single claim can fill them all
                     await self._concurrency_semaphore.acquire()
+                    held_slots = 1
+                    while (
+                        held_slots < self.max_concurrent
+                        and not self._concurrency_semaphore.locked()
+                    ):
+                        await self._concurrency_semaphore.acquire()
+                        held_slots += 1
+
+                    # Claim the next message of each user without a turn in
+                    # flight (keeps each user's lane strictly ordered)
+                    queue_items = await atomic_dequeue_batch(
+                        held_slots,
+                        exclude_user_ids=self._active_users,
+                        lease_owner=self.lease_owner,
+                        lease_seconds=self.lease_seconds,
+                        policy=self.scheduling_policy,
+                        user_weights=self.user_weights,
+                        user_priorities=self.user_priorities,
+                    )
 
-                    # Atomically dequeue next message from queue
-                    queue_item = await atomic_dequeue_item()
-                    if not queue_item:
+                    # Return slots that could not be filled
+                    for _ in range(held_slots - len(queue_items)):
                         self._concurrency_semaphore.release()
-                        await asyncio.sleep(1)  # Wait before checking again
+                    held_slots = len(queue_items)
+
+                    if not queue_items:
+                        # Sleep until an enqueue/lane release wakes us, a retry
+                        # backoff expires, or poll
+                        timeout = self.idle_poll_interval
+                        retry_delay = await next_retry_delay()
+                        if retry_delay is not None:
+                            timeout = min(timeout, retry_delay)
+                        await wait_for_queue_activity(timeout)
+                        await self.block_attachments.sweep()
                         continue
 
-                    # Create task for concurrent processing
-                    task = asyncio.create_task(
-                        self._process_single_message_with_tracking(queue_item)
-                    )
-                    self._processing_tasks.add(task)
-                    task.add_done_callback(self._processing_tasks.discard)
+                    for queue_item in queue_items:
+                        self._active_users.add(queue_item.letta_user_id)
+
+                        # Create task for concurrent processing; the task owns
+                        # (and releases) one slot from here on
+                        task = asyncio.create_task(
+                            self._process_single_message_with_tracking(queue_item)
+                        )
+                        held_slots -= 1
+                        self._processing_tasks.add(task)
+                        task.add_done_callback(self._processing_tasks.discard)
 
                 except asyncio.CancelledError:
                     logger.info("Queue processor received cancellation signal")
                     break
                 except Exception as e:
                     logger.error(f"Queue processor error: {str(e)}")
-                    # Release semaphore if we got an error before creating task
-                    try:
+                    # Release slots we still hold (error before creating tasks)
+                    for _ in range(held_slots):
                         self._concurrency_semaphore.release()
-                    except Exception:
-                        pass
                     await asyncio.sleep(1)  # Wait before retrying
 
         finally:
             self.is_running = False
+            lease_task.cancel()
+            reconcile_task.cancel()
+            await asyncio.gather(lease_task, reconcile_task, return_exceptions=True)
             # Wait for all processing tasks to complete
             if self._processing_tasks:
                 logger.info(
@@ -466,6 +706,78 @@ class QueueProcessor:
                 await asyncio.gather(*self._processing_tasks, return_exceptions=True)
             logger.info("Queue processor stopped")
 
+    async def _maintain_leases(self) -> None:
+        """Heartbeat: renew leases of in-flight items and reclaim expired ones."""
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._stop_event.wait(), timeout=self.heartbeat_interval
+                )
+                return
+            except TimeoutError:
+                pass
+            try:
+                in_flight = set(self.processing_messages)
+                if in_flight:
+                    renewed = await renew_leases(
+                        self.lease_owner, in_flight, self.lease_seconds
+                    )
+                    if renewed < len(in_flight):
+                        logger.warning(
+                            f"Renewed {renewed}/{len(in_flight)} queue leases; "
+                            "the rest finished or were reclaimed"
+                        )
+                await reclaim_expired_leases()
+            except Exception as e:
+                logger.error(f"Queue lease heartbeat failed: {str(e)}")
+
+    async def reconcile_blocks(self) -> BlockReconcileResult | None:
+        """Reconcile the agent's block attachments and users' blocks with Letta.
+
+        Leaked user blocks are detached from the agent; users whose block was
+        deleted in Letta are set back to pending and re-provisioned, so their
+        messages wait for a new block instead of failing and backing off.
+
+        Returns:
+            The reconcile result, or None if it failed
+        """
+        try:
+            # Another consumer keeps a user's block attached for up to its own
+            # block_idle_timeout after their turn
+            user_blocks = await get_user_blocks(
+                recent_seconds=self.block_attachments.idle_timeout
+            )
+            result = await self.block_attachments.reconcile(
+                {block_id for _, block_id, _ in user_blocks},
+                busy_blocks={block_id for _, block_id, busy in user_blocks if busy},
+            )
+            if result.missing:
+                missing = set(result.missing)
+                await mark_blocks_missing(
+                    (user_id, block_id)
+                    for user_id, block_id, _ in user_blocks
+                    if block_id in missing
+                )
+                await resume_provisioning()
+            return result
+        except Exception as e:
+            logger.error(f"Core block reconcile failed: {str(e)}")
+            return None
+
+    async def _reconcile_blocks_periodically(self) -> None:
+        """Reconcile blocks at startup, then every block_reconcile_interval."""
+        while not self._stop_event.is_set():
+            await self.reconcile_blocks()
+            if self.block_reconcile_interval <= 0:
+                return
+            try:
+                await asyncio.wait_for(
+                    self._stop_event.wait(), timeout=self.block_reconcile_interval
+                )
+                return
+            except TimeoutError:
+                pass
+
     async def stop(self) -> None:
         """Stop processing the queue."""
         if not self.is_running:
@@ -474,6 +786,8 @@ class QueueProcessor:
         logger.info("Stopping queue processor...")
         self._stop_event.set()
         self.is_running = False
+        # Wake the loop if it is idle-waiting so it can observe the stop
+        notify_queue_activity()
 
         # Wait for any in-progress messages to complete
         timeout = 10.0  # Maximum wait time in seconds
@@ -496,6 +810,12 @@ class QueueProcessor:
         if self._processing_tasks:
             await asyncio.gather(*self._processing_tasks, return_exceptions=True)
 
+        # Leave the agent without user blocks while nobody is being served
+        try:
+            await self.block_attachments.detach_all()
+        except Exception as e:
+            logger.error(f"Failed to detach core blocks on stop: {str(e)}")
+
         logger.info("Queue processor stopped")
 
     def set_message_mode(self, mode: str) -> None:
@@ -84,8 +84,9 @@ async def temp_db() -> AsyncGenerator[str, None]:
 
         database.pool._pool = None
 
-        if os.path.exists(db_path):
-            os.unlink(db_path)
+        for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
         if original_db_path:
             os.environ["TEST_DB_PATH"] = original_db_path
         elif "TEST_DB_PATH" in os.environ:
@@ -61,9 +61,10 @@ async def test_full_message_flow_through_app(temp_db: str):
     await add_to_queue(letta_user_id, message_id)
 
     mock_client = MagicMock()
-    mock_client.agents.retrieve.return_value = MagicMock(id="e2e-agent", name="E2E")
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.retrieve.return_value = MagicMock(id="e2e-agent", name="E2E")
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     with (
         patch("main.PIDManager") as mock_pid_class,
@@ -170,11 +171,12 @@ async def test_message_flow_with_image_addendum_in_message(temp_db: str):
     await add_to_queue(letta_user_id, message_id)
 
     mock_client = MagicMock()
-    mock_client.agents.retrieve.return_value = MagicMock(
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.retrieve.return_value = MagicMock(
         id="e2e-img-agent", name="E2E Image"
     )
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     with (
         patch("main.PIDManager") as mock_pid_class,
@@ -20,9 +20,10 @@ async def test_application_starts_and_stops_gracefully(temp_db: str):
     fixtures_plugins_dir = str(project_root / "tests" / "fixtures")
 
     mock_client = MagicMock()
-    mock_client.agents.retrieve.return_value = MagicMock(id="test-agent", name="Test")
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.retrieve.return_value = MagicMock(id="test-agent", name="Test")
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     with (
         patch.dict(
@@ -0,0 +1,63 @@
+"""
+Scheduling simulation: per-user tail latency under each dequeue policy.
+
+Runs tools/queue_fairness_sim.py's workload (one user with a large backlog,
+others sending occasional messages) through the real claim path on a
+simulated clock, and checks the fair-share policies keep the other users'
+waits bounded while plain FIFO starves them.
+"""
+
+import pytest
+
+from tools.queue_fairness_sim import (
+    BACKLOG_USER,
+    default_workload,
+    percentile,
+    simulate,
+)
+
+TURN_SECONDS = 60.0
+
+
+def _other_waits(waits: dict[int, list[float]]) -> list[float]:
+    return [w for user, ws in waits.items() if user != BACKLOG_USER for w in ws]
+
+
+@pytest.mark.integration
+@pytest.mark.database
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["round_robin", "weighted"])
+async def test_fair_share_bounds_tail_latency_behind_backlog(temp_db, policy):
+    """Light users wait a few turns, not behind the whole backlog."""
+    arrivals = default_workload(backlog=60, light_users=5, light_messages=3)
+
+    fifo = await simulate("fifo", arrivals, turn_seconds=TURN_SECONDS)
+    fair = await simulate(policy, arrivals, turn_seconds=TURN_SECONDS)
+
+    assert sum(map(len, fair.values())) == len(arrivals)
+    fifo_p95 = percentile(_other_waits(fifo), 95)
+    fair_p95 = percentile(_other_waits(fair), 95)
+    assert fifo_p95 > 30 * TURN_SECONDS
+    assert fair_p95 <= 6 * TURN_SECONDS
+
+
+@pytest.mark.integration
+@pytest.mark.database
+@pytest.mark.asyncio
+async def test_weighted_policy_splits_turns_by_weight(temp_db):
+    """Two backlogged users get turns in proportion to their weights."""
+    arrivals = [(0.0, 1)] * 30 + [(0.0, 2)] * 30
+
+    waits = await simulate(
+        "weighted",
+        arrivals,
+        turn_seconds=TURN_SECONDS,
+        user_weights={1: 2.0, 2: 1.0},
+    )
+
+    # After 30 turns user 1 (weight 2) has had about twice user 2's share
+    served_by_30 = {
+        user: sum(1 for w in ws if w < 30 * TURN_SECONDS)
+        for user, ws in waits.items()
+    }
+    assert served_by_30 == {1: 20, 2: 10}
@@ -7,7 +7,7 @@ no Letta/agent calls. Verifies full path: seed data -> queue -> process -> DB up
 
 import asyncio
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import pytest_asyncio
@@ -78,8 +78,9 @@ async def test_queue_echo_mode_processes_item_and_updates_db(
     """Queue processor in echo mode should process one item and update message + queue."""
     letta_user_id, message_id, queue_id = seeded_queue_item
     mock_client = MagicMock()
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     async def noop_processor(msg: str) -> str:
         return msg
@@ -128,8 +129,9 @@ async def test_queue_processor_start_stops_gracefully(seeded_queue_item):
     """QueueProcessor start() processes one item then we stop it."""
     letta_user_id, message_id, queue_id = seeded_queue_item
     mock_client = MagicMock()
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     async def noop_processor(msg: str) -> str:
         return msg
@@ -215,8 +217,9 @@ async def test_queue_flow_with_message_containing_image_addendum(temp_db: str):
     await add_to_queue(letta_user_id, message_id)
 
     mock_client = MagicMock()
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     async def echo_processor(msg: str) -> str:
         return msg
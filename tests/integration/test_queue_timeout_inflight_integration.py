@@ -128,6 +128,7 @@ async def test_outer_wait_for_timeout_persists_failed_without_attempt_increment(
         raise AssertionError("processor must not run")
 
     mock_client = MagicMock()
+    mock_client.aio = AsyncMock()
     with patch.dict(
         "os.environ",
         {"AGENT_ID": "integration-agent-outer-timeout"},
@@ -164,6 +165,7 @@ async def test_agent_turn_timeout_inflight_persists_failed_without_attempt_incre
         raise AgentTurnTimeoutInFlight("integration simulated in-flight timeout")
 
     mock_client = MagicMock()
+    mock_client.aio = AsyncMock()
     with patch.dict(
         "os.environ",
         {"AGENT_ID": "integration-agent-inflight"},
@@ -201,6 +203,7 @@ async def test_completed_none_response_requeues_pending_and_increments_attempts(
         return None, "failed"
 
     mock_client = MagicMock()
+    mock_client.aio = AsyncMock()
     with patch.dict(
         "os.environ",
         {"AGENT_ID": "integration-agent-none"},
@@ -238,21 +241,25 @@ async def test_successful_live_turn_writes_message_and_completes_queue(
         return "assistant integration reply", "completed"
 
     mock_client = MagicMock()
+    mock_client.aio = AsyncMock()
     with patch.dict(
         "os.environ",
         {"AGENT_ID": "integration-agent-success"},
         clear=False,
     ):
         with patch("runtime.core.queue.get_letta_client", return_value=mock_client):
-            processor = QueueProcessor(AsyncMock(), message_mode="live")
+            processor = QueueProcessor(
+                AsyncMock(), message_mode="live", outbox_delivery=True
+            )
     processor._process_with_core_block = core_ok  # type: ignore[method-assign]
 
     with patch("runtime.core.queue.asyncio.wait_for", side_effect=passthrough_wait_for):
         with patch.object(
             processor, "_route_response", new_callable=AsyncMock, return_value=True
-        ):
+        ) as route:
             await processor._process_single_message(item)
 
+    route.assert_not_awaited()
     status, _attempts = await _queue_row(queue_id)
     assert status == "completed"
 
@@ -266,6 +273,12 @@ async def test_successful_live_turn_writes_message_and_completes_queue(
             assert row[0] == "assistant integration reply"
             assert row[1] == 1
 
+        # The response is handed to the delivery workers in the same commit
+        async with db.execute("SELECT message_id, response, status FROM outbox") as cur:
+            assert await cur.fetchall() == [
+                (message_id, "assistant integration reply", "pending")
+            ]
+
 
 @pytest.mark.integration
 @pytest.mark.database
@@ -284,10 +297,10 @@ async def test_requeue_stale_processing_items_updates_stale_row(
         await db.execute(
             """
             UPDATE queue
-            SET timestamp = ?
+            SET timestamp = ?, claimed_at = ?
             WHERE id = ?
             """,
-            ("2000-01-01T00:00:00", queue_id),
+            ("2000-01-01T00:00:00", 946684800000, queue_id),
         )
         await db.commit()
 
@@ -315,6 +328,7 @@ async def test_outer_timeout_when_mark_failed_db_errors_row_stays_processing_no_
         raise TimeoutError()
 
     mock_client = MagicMock()
+    mock_client.aio = AsyncMock()
     with patch.dict(
         "os.environ",
         {"AGENT_ID": "integration-agent-db-boom"},
@@ -326,7 +340,7 @@ async def test_outer_timeout_when_mark_failed_db_errors_row_stays_processing_no_
     boom = AsyncMock(side_effect=RuntimeError("database unavailable"))
 
     with patch("runtime.core.queue.asyncio.wait_for", side_effect=boom_wait_for):
-        with patch("runtime.core.queue.update_queue_status", boom):
+        with patch("runtime.core.queue.set_queue_status", boom):
             await processor._process_single_message(item)
 
     status, attempts = await _queue_row(queue_id)
@@ -345,8 +359,9 @@ async def test_echo_mode_completes_with_real_db_write(seeded_queue_item) -> None
     assert item is not None
 
     mock_client = MagicMock()
-    mock_client.agents.blocks.attach.return_value = None
-    mock_client.agents.blocks.detach.return_value = None
+    mock_client.aio = AsyncMock()
+    mock_client.aio.agents.blocks.attach.return_value = None
+    mock_client.aio.agents.blocks.detach.return_value = None
 
     async def echo_processor(msg: str, sender_id: str | None = None) -> str:
         return msg
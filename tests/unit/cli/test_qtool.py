@@ -8,13 +8,18 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from cli.qtool import (
+    archive_queue,
     delete_queue,
     flush_queue,
     list_queue,
     main,
     print_json,
     print_queue_items,
+    purge_dead_letter_items,
+    replay_dead_letter_items,
 )
+from common.config import RetentionConfig
+from database.operations.retention import RetentionResult
 
 
 class TestQtoolFunctions:
@@ -225,6 +230,37 @@ class TestQtoolFunctions:
             )
             mock_exit.assert_called_once_with(1)
 
+    @pytest.mark.asyncio
+    async def test_archive_queue_applies_overrides(self, capsys):
+        """archive runs the retention job with CLI flags over settings."""
+        args = MagicMock()
+        args.json = False
+        args.vacuum = False
+        args.queue_hours = 2.0
+        args.message_days = None
+        args.batch_size = 50
+        args.archive_path = None
+
+        result = RetentionResult(queue_archived=3, messages_archived=1)
+        with (
+            patch(
+                "cli.qtool.get_typed_settings",
+                return_value=MagicMock(retention=RetentionConfig(batch_size=10)),
+            ),
+            patch(
+                "cli.qtool.run_retention", new_callable=AsyncMock, return_value=result
+            ) as mock_run,
+            patch("cli.qtool.full_vacuum", new_callable=AsyncMock) as mock_vacuum,
+        ):
+            await archive_queue(args)
+
+        config = mock_run.await_args.args[0]
+        assert config.queue_retention_hours == 2.0
+        assert config.message_retention_days == 30.0
+        assert config.batch_size == 50
+        mock_vacuum.assert_not_awaited()
+        assert "Archived 3 queue items" in capsys.readouterr().out
+
     def test_print_json(self):
         """Test printing JSON output."""
         mock_items = [{"id": "1", "message": "test1"}, {"id": "2", "message": "test2"}]
@@ -299,6 +335,62 @@ class TestQtoolFunctions:
             main()
             mock_run.assert_called_once()
 
+    def test_main_archive_command(self):
+        """Test main function with archive command."""
+        with (
+            patch("sys.argv", ["qtool", "archive", "--queue-hours", "1"]),
+            patch("cli.qtool.archive_queue", new_callable=AsyncMock),
+            patch("asyncio.run") as mock_run,
+        ):
+            main()
+            mock_run.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_replay_runs_batches_until_exhausted(self):
+        """Replay keeps taking batches while full ones come back."""
+        args = MagicMock(
+            json=False,
+            id=None,
+            failure_class="no_response",
+            user=None,
+            older_than_hours=None,
+            all=False,
+            batch_size=2,
+        )
+        with (
+            patch(
+                "cli.qtool.replay_dead_letters",
+                new_callable=AsyncMock,
+                side_effect=[2, 2, 1],
+            ) as mock_replay,
+            patch("builtins.print") as mock_print,
+        ):
+            await replay_dead_letter_items(args)
+
+        assert mock_replay.await_count == 3
+        mock_replay.assert_awaited_with(
+            ids=None,
+            failure_class="no_response",
+            letta_user_id=None,
+            older_than_ms=None,
+            limit=2,
+        )
+        mock_print.assert_called_with("Replayed 5 dead-lettered items")
+
+    @pytest.mark.asyncio
+    async def test_purge_requires_a_filter_or_all(self):
+        """An unfiltered purge is refused unless --all is given."""
+        args = MagicMock(
+            id=None, failure_class=None, user=None, older_than_hours=None, all=False
+        )
+        with (
+            patch("cli.qtool.purge_dead_letters", new_callable=AsyncMock) as purge,
+            patch("builtins.print"),
+            pytest.raises(SystemExit),
+        ):
+            await purge_dead_letter_items(args)
+        purge.assert_not_awaited()
+
     def test_main_invalid_command(self):
         """Test main function with invalid command."""
         with patch("sys.argv", ["qtool.py", "invalid"]), patch("sys.exit") as mock_exit:
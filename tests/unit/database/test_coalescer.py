@@ -0,0 +1,80 @@
+"""Unit tests for the group-commit write coalescer."""
+
+import asyncio
+from datetime import datetime
+
+import aiosqlite
+import pytest
+
+from database.operations.messages import insert_message, update_message_with_response
+from database.operations.queue import add_to_queue_many, set_queue_status
+from database.pool import get_pool
+
+
+async def _seed_queue(count: int) -> tuple[list[int], list[int]]:
+    """Insert a user, profile and count message/queue rows."""
+    now = datetime.utcnow().isoformat()
+    async with get_pool().write_connection() as db:
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, ?)", (now,))
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        await db.commit()
+    message_ids = [await insert_message(1, 1, "user", f"m{i}") for i in range(count)]
+    queue_ids = await add_to_queue_many([(1, mid) for mid in message_ids])
+    return message_ids, queue_ids
+
+
+async def _rows(sql: str) -> list[tuple]:
+    async with get_pool().connection() as db:
+        async with db.execute(sql) as cursor:
+            return [tuple(row) for row in await cursor.fetchall()]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_commit(temp_db):
+    """Status updates submitted together are committed in a single transaction."""
+    _, queue_ids = await _seed_queue(5)
+    coalescer = get_pool().coalescer
+    commits = coalescer.commits
+
+    await asyncio.gather(*(set_queue_status(qid, "completed") for qid in queue_ids))
+
+    assert coalescer.commits == commits + 1
+    assert await _rows("SELECT DISTINCT status FROM queue") == [("completed",)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_durable_write_is_barrier_for_earlier_writes(temp_db):
+    """A non-durable write is committed by the durable write that follows it."""
+    message_ids, queue_ids = await _seed_queue(1)
+
+    await update_message_with_response(message_ids[0], "reply", durable=False)
+    await set_queue_status(queue_ids[0], "completed", increment_attempt=True)
+
+    assert await _rows("SELECT agent_response, processed FROM messages") == [
+        ("reply", 1)
+    ]
+    assert await _rows("SELECT status, attempts FROM queue") == [("completed", 1)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failing_write_only_fails_its_caller(temp_db):
+    """One bad statement rolls back to its savepoint; the batch still commits."""
+    _, queue_ids = await _seed_queue(1)
+    coalescer = get_pool().coalescer
+
+    bad = coalescer.submit("UPDATE queue SET message_id = 999 WHERE id = ?", queue_ids)
+    good = coalescer.submit(
+        "UPDATE queue SET status = 'completed' WHERE id = ?", queue_ids
+    )
+    await coalescer.flush()
+
+    with pytest.raises(aiosqlite.IntegrityError):
+        await bad
+    assert await good == 1
+    assert await _rows("SELECT status FROM queue") == [("completed",)]
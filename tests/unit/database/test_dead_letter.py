@@ -0,0 +1,85 @@
+"""Unit tests for dead-lettered queue items."""
+
+import pytest
+
+from database.operations.dead_letter import (
+    get_dead_letters,
+    purge_dead_letters,
+    replay_dead_letters,
+)
+from database.operations.messages import insert_message
+from database.operations.queue import add_to_queue, requeue_failed_item
+from database.pool import get_pool
+
+
+async def _seed_items(count: int) -> list[int]:
+    """Insert a user, profile and count queued messages; return queue ids."""
+    async with get_pool().write_connection() as db:
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, 'x')")
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        await db.commit()
+    for i in range(count):
+        await add_to_queue(1, await insert_message(1, 1, "user", f"m{i}"))
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT id FROM queue ORDER BY id") as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+async def _queue_rows() -> list[tuple]:
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT message_id, status, attempts FROM queue ORDER BY id"
+        ) as cursor:
+            return [tuple(row) for row in await cursor.fetchall()]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_item_is_dead_lettered_after_max_attempts(temp_db):
+    """The last allowed failure moves the row out of queue with its history."""
+    (queue_id,) = await _seed_items(1)
+
+    assert await requeue_failed_item(
+        queue_id, max_attempts=2, error="boom", failure_class="RuntimeError"
+    )
+    assert not await requeue_failed_item(
+        queue_id, max_attempts=2, error="still nothing", failure_class="no_response"
+    )
+
+    assert await _queue_rows() == []
+    (dead,) = await get_dead_letters()
+    assert (dead.queue_id, dead.failure_class, dead.last_error, dead.attempts) == (
+        queue_id,
+        "no_response",
+        "still nothing",
+        2,
+    )
+    assert [entry["class"] for entry in dead.attempt_history] == [
+        "RuntimeError",
+        "no_response",
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_filtered_replay_and_purge(temp_db):
+    """Replay re-enqueues only matching rows; purge deletes in bounded batches."""
+    queue_ids = await _seed_items(4)
+    for queue_id, failure_class in zip(
+        queue_ids, ("no_response", "RuntimeError", "RuntimeError", "RuntimeError")
+    ):
+        await requeue_failed_item(queue_id, max_attempts=1, failure_class=failure_class)
+
+    assert await replay_dead_letters(failure_class="no_response") == 1
+    assert await _queue_rows() == [(1, "pending", 0)]
+    assert [dead.failure_class for dead in await get_dead_letters()] == [
+        "RuntimeError"
+    ] * 3
+
+    assert await purge_dead_letters(failure_class="RuntimeError", limit=2) == 2
+    remaining = await get_dead_letters()
+    assert [dead.queue_id for dead in remaining] == [queue_ids[3]]
+    assert await purge_dead_letters(older_than_ms=3_600_000) == 0
@@ -2,11 +2,14 @@
 
 from datetime import datetime
 
+import aiosqlite
 import pytest
 
 from database.operations.messages import (
     get_message_text,
     insert_message,
+    insert_messages_many,
+    save_turn_response,
 )
 from database.pool import get_pool
 
@@ -93,6 +96,107 @@ async def test_get_message_text(temp_db):
     assert text == ("user", "Test message")
 
 
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_insert_messages_many_enqueues_in_one_transaction(temp_db):
+    """Bulk ingest returns ids in order and queues each message as pending."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    sent_at = datetime(2024, 1, 1, 12, 0, 0)
+    message_ids = await insert_messages_many(
+        [
+            {
+                "letta_user_id": letta_user_id,
+                "platform_profile_id": platform_profile_id,
+                "role": "user",
+                "message": f"part {i}",
+                "timestamp": sent_at,
+            }
+            for i in range(3)
+        ]
+    )
+
+    assert [await get_message_text(mid) for mid in message_ids] == [
+        ("user", "part 0"),
+        ("user", "part 1"),
+        ("user", "part 2"),
+    ]
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT message_id, status FROM queue ORDER BY id") as cur:
+            rows = await cur.fetchall()
+        async with db.execute("SELECT DISTINCT timestamp FROM messages") as cursor:
+            timestamps = await cursor.fetchall()
+    assert [tuple(row) for row in rows] == [(mid, "pending") for mid in message_ids]
+    assert [row[0] for row in timestamps] == [sent_at.isoformat()]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_insert_messages_many_rolls_back_on_error(temp_db):
+    """A bad row leaves neither messages nor queue rows behind."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    good = {
+        "letta_user_id": letta_user_id,
+        "platform_profile_id": platform_profile_id,
+        "role": "user",
+        "message": "ok",
+    }
+    with pytest.raises(aiosqlite.IntegrityError):
+        await insert_messages_many([good, {**good, "platform_profile_id": 9999}])
+
+    assert await insert_messages_many([]) == []
+    async with get_pool().connection() as db:
+        for table in ("messages", "queue"):
+            async with db.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+                assert (await cursor.fetchone())[0] == 0
+
+
+async def _turn_rows() -> list[tuple]:
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT m.agent_response, m.processed, q.status "
+            "FROM messages m JOIN queue q ON q.message_id = m.id ORDER BY m.id"
+        ) as cursor:
+            return [tuple(row) for row in await cursor.fetchall()]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_save_turn_response_commits_response_and_status_together(temp_db):
+    """A turn's messages get the response and its queue rows the status."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    message_ids = await insert_messages_many(
+        [
+            {
+                "letta_user_id": letta_user_id,
+                "platform_profile_id": platform_profile_id,
+                "role": "user",
+                "message": f"part {i}",
+            }
+            for i in range(2)
+        ]
+    )
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT id FROM queue ORDER BY id") as cursor:
+            queue_ids = [row[0] for row in await cursor.fetchall()]
+
+    # A failing status update must not leave the response half-written
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "CREATE TEMP TRIGGER fail_status BEFORE UPDATE OF status ON queue "
+            "BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+        )
+        await db.commit()
+    with pytest.raises(aiosqlite.IntegrityError, match="disk full"):
+        await save_turn_response(message_ids, queue_ids, "hi both")
+    assert await _turn_rows() == [(None, 0, "pending")] * 2
+
+    async with get_pool().write_connection() as db:
+        await db.execute("DROP TRIGGER temp.fail_status")
+        await db.commit()
+    await save_turn_response(message_ids, queue_ids, "hi both")
+    assert await _turn_rows() == [("hi both", 1, "completed")] * 2
+
+
 @pytest.mark.unit
 @pytest.mark.asyncio
 async def test_update_message_with_response(temp_db):
@@ -0,0 +1,148 @@
+"""Unit tests for versioned schema migrations."""
+
+import aiosqlite
+import pytest
+
+from database.models import MIGRATIONS
+from database.operations.shared import (
+    apply_migrations,
+    check_and_migrate_db,
+    get_schema_version,
+)
+from database.pool import get_pool
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def _index_names(db: aiosqlite.Connection) -> set[str]:
+    async with db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    ) as cursor:
+        return {row[0] for row in await cursor.fetchall()}
+
+
+@pytest.mark.unit
+def test_migration_versions_are_strictly_increasing():
+    """Migrations are applied in list order, so versions must increase."""
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert versions[0] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_initialize_database_applies_all_migrations(temp_db):
+    """A fresh database is created at the latest schema version."""
+    async with get_pool().connection() as db:
+        assert await get_schema_version(db) == LATEST_VERSION
+        indexes = await _index_names(db)
+
+    assert "idx_queue_status_enqueued_at" in indexes
+    assert "idx_queue_status_claimed_at" in indexes
+    assert "idx_queue_message_id" in indexes
+    assert "idx_messages_user_profile_received_at" in indexes
+    assert "idx_queue_status_timestamp" not in indexes
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_migrations_are_idempotent(temp_db):
+    """Re-running migrations records each version exactly once."""
+    await check_and_migrate_db()
+    async with get_pool().connection() as db:
+        assert await apply_migrations(db) == LATEST_VERSION
+        async with db.execute(
+            "SELECT version, COUNT(*) FROM schema_version GROUP BY version"
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+    assert [row[0] for row in rows] == [v for v, _, _ in MIGRATIONS]
+    assert all(row[1] == 1 for row in rows)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_check_and_migrate_upgrades_legacy_database(temp_db):
+    """A database created before versioning is upgraded in place."""
+    async with get_pool().connection() as db:
+        await db.execute("DROP TABLE schema_version")
+        for name in await _index_names(db):
+            if name.startswith("idx_"):
+                await db.execute(f"DROP INDEX {name}")
+        await db.commit()
+
+    await check_and_migrate_db()
+
+    async with get_pool().connection() as db:
+        assert await get_schema_version(db) == LATEST_VERSION
+        assert "idx_queue_status_enqueued_at" in await _index_names(db)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_dequeue_query_uses_status_index(temp_db):
+    """The pending-item lookup is served by the (status, enqueued_at) index."""
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM queue "
+            "WHERE status = 'pending' ORDER BY enqueued_at, id LIMIT 1"
+        ) as cursor:
+            plan = " ".join(str(row[-1]) for row in await cursor.fetchall())
+
+    assert "idx_queue_status_enqueued_at" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_stats_counter_migration_seeds_existing_rows(temp_db):
+    """Upgrading a populated database fills stats_counters from its rows."""
+    async with get_pool().connection() as db:
+        await db.execute("DELETE FROM schema_version WHERE version >= 2")
+        async with db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        ) as cursor:
+            for (name,) in await cursor.fetchall():
+                await db.execute(f"DROP TRIGGER {name}")
+        await db.execute("INSERT INTO letta_users (created_at) VALUES ('2024-01-01')")
+        await db.execute("INSERT INTO queue (status) VALUES ('pending')")
+        await db.commit()
+
+    await check_and_migrate_db()
+
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT name, value FROM stats_counters") as cursor:
+            counters = dict(await cursor.fetchall())
+    assert counters == {"letta_users": 1, "messages": 0, "queue:pending": 1}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_epoch_ms_migration_backfills_mixed_timestamp_formats(temp_db):
+    """Existing TEXT timestamps in either format become epoch milliseconds."""
+    async with get_pool().connection() as db:
+        await db.execute("DELETE FROM schema_version WHERE version >= 3")
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, 'x')")
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        await db.execute(
+            "INSERT INTO messages (id, letta_user_id, platform_profile_id, "
+            "timestamp) VALUES (1, 1, 1, '2024-01-01 12:00 UTC')"
+        )
+        await db.execute(
+            "INSERT INTO queue (letta_user_id, message_id, status, timestamp) "
+            "VALUES (1, 1, 'processing', '2024-01-01T12:00:00.500000')"
+        )
+        await db.execute("UPDATE messages SET received_at = NULL")
+        await db.execute("UPDATE queue SET enqueued_at = NULL, claimed_at = NULL")
+        await db.commit()
+
+    await check_and_migrate_db()
+
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT received_at FROM messages") as cursor:
+            assert (await cursor.fetchone())[0] == 1704110400000
+        async with db.execute("SELECT enqueued_at, claimed_at FROM queue") as cursor:
+            assert tuple(await cursor.fetchone()) == (1704110400500, 1704110400500)
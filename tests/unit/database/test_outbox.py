@@ -0,0 +1,173 @@
+"""Unit tests for the response outbox."""
+
+from datetime import timedelta
+
+import aiosqlite
+import pytest
+
+from database.operations.messages import insert_message, save_turn_response
+from database.operations.outbox import (
+    claim_outbox,
+    complete_outbox,
+    enqueue_outbox,
+    fail_outbox,
+    next_outbox_delay,
+    reclaim_expired_outbox,
+)
+from database.operations.queue import add_to_queue
+from database.operations.retention import archive_messages, purge_delivered_outbox
+from database.pool import get_pool
+
+
+async def _seed_users() -> None:
+    """Insert two Letta users with one telegram profile each."""
+    async with get_pool().write_connection() as db:
+        for uid in (1, 2):
+            await db.execute(
+                "INSERT INTO letta_users (id, created_at) VALUES (?, 'x')", (uid,)
+            )
+            await db.execute(
+                "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+                "platform_user_id) VALUES (?, ?, 'telegram', ?)",
+                (uid, uid, str(uid)),
+            )
+        await db.commit()
+
+
+async def _enqueue(letta_user_id: int, response: str) -> int:
+    """Add a response to a new message of the user; return the message id."""
+    message_id = await insert_message(letta_user_id, letta_user_id, "user", "hi")
+    await enqueue_outbox(letta_user_id, message_id, "telegram", response)
+    return message_id
+
+
+async def _statuses() -> list[tuple]:
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT response, status, attempts FROM outbox ORDER BY id"
+        ) as cursor:
+            return [tuple(row) for row in await cursor.fetchall()]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_users_responses_are_claimed_in_order(temp_db):
+    """A user's next response waits until the previous one is delivered."""
+    await _seed_users()
+    await _enqueue(1, "a1")
+    await _enqueue(1, "a2")
+    await _enqueue(2, "b1")
+
+    first = await claim_outbox("telegram", "worker-1")
+    second = await claim_outbox("telegram", "worker-2")
+    assert (first.response, second.response) == ("a1", "b1")
+    assert await claim_outbox("telegram", "worker-1") is None
+    assert await claim_outbox("discord", "worker-1") is None
+
+    await complete_outbox(first.id)
+    third = await claim_outbox("telegram", "worker-1")
+    assert third.response == "a2"
+    assert await _statuses() == [
+        ("a1", "delivered", 0),
+        ("a2", "delivering", 0),
+        ("b1", "delivering", 0),
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_delivery_backs_off_then_gives_up(temp_db):
+    """Failures are retried after a delay, in order, until max_attempts."""
+    await _seed_users()
+    await _enqueue(1, "a1")
+    await _enqueue(1, "a2")
+
+    item = await claim_outbox("telegram", "worker-1")
+    assert await fail_outbox(item, "429", max_attempts=2, base_delay=60)
+    # The backed-off response also holds back the user's newer one
+    assert await claim_outbox("telegram", "worker-1") is None
+    assert 0 < await next_outbox_delay("telegram") <= 60
+
+    async with get_pool().write_connection() as db:
+        await db.execute("UPDATE outbox SET not_before = 0 WHERE id = ?", (item.id,))
+        await db.commit()
+    item = await claim_outbox("telegram", "worker-1")
+    assert (item.response, item.attempts) == ("a1", 1)
+    assert not await fail_outbox(item, "429", max_attempts=2, base_delay=60)
+
+    assert (await claim_outbox("telegram", "worker-1")).response == "a2"
+    assert await _statuses() == [("a1", "failed", 2), ("a2", "delivering", 0)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed(temp_db):
+    """A crashed worker's claim returns to pending once its lease expires."""
+    await _seed_users()
+    await _enqueue(1, "a1")
+
+    await claim_outbox("telegram", "crashed", lease_seconds=60)
+    assert await reclaim_expired_outbox() == 0
+    async with get_pool().write_connection() as db:
+        await db.execute("UPDATE outbox SET lease_expires_at = 0")
+        await db.commit()
+
+    assert await reclaim_expired_outbox() == 1
+    assert (await claim_outbox("telegram", "worker-1")).response == "a1"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_retention_purges_delivered_rows_only(temp_db):
+    """Delivered rows are purged; messages of undelivered ones are kept."""
+    await _seed_users()
+    await _enqueue(1, "a1")
+    pending_message = await _enqueue(2, "b1")
+    await complete_outbox((await claim_outbox("telegram", "worker-1")).id)
+
+    assert await purge_delivered_outbox(timedelta(0)) == 1
+    assert await _statuses() == [("b1", "pending", 0)]
+
+    assert await archive_messages(timedelta(0)) == 1
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT id FROM messages") as cursor:
+            assert [row[0] for row in await cursor.fetchall()] == [pending_message]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_turn_response_and_outbox_row_commit_together(temp_db):
+    """A failed outbox insert leaves the turn uncompleted, not silently lost."""
+    await _seed_users()
+    message_id = await insert_message(1, 1, "user", "hi")
+    await add_to_queue(1, message_id)
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT id FROM queue") as cursor:
+            (queue_id,) = await cursor.fetchone()
+
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "CREATE TEMP TRIGGER fail_outbox BEFORE INSERT ON outbox "
+            "BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+        )
+        await db.commit()
+    with pytest.raises(aiosqlite.IntegrityError):
+        await save_turn_response(
+            [message_id], [queue_id], "hello", outbox_platform="telegram"
+        )
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT status FROM queue") as cursor:
+            assert (await cursor.fetchone())[0] == "pending"
+
+    async with get_pool().write_connection() as db:
+        await db.execute("DROP TRIGGER temp.fail_outbox")
+        await db.commit()
+    await save_turn_response(
+        [message_id], [queue_id], "hello", outbox_platform="telegram", letta_user_id=1
+    )
+    item = await claim_outbox("telegram", "worker-1")
+    assert (item.letta_user_id, item.message_id, item.response) == (
+        1,
+        message_id,
+        "hello",
+    )
@@ -0,0 +1,82 @@
+"""Unit tests for the aiosqlite connection pool."""
+
+import asyncio
+
+import pytest
+
+from database.pool import ConnectionPool, get_pool
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_pool_connections_apply_configured_pragmas(temp_db):
+    """Reader and writer connections both run in WAL with the tuned PRAGMAs."""
+    pool = get_pool()
+    async with pool.connection() as db:
+        async with db.execute("PRAGMA journal_mode") as cursor:
+            assert (await cursor.fetchone())[0].lower() == "wal"
+        async with db.execute("PRAGMA busy_timeout") as cursor:
+            assert (await cursor.fetchone())[0] == pool.pragmas["busy_timeout"]
+        async with db.execute("PRAGMA synchronous") as cursor:
+            assert (await cursor.fetchone())[0] == 1  # NORMAL
+
+    async with pool.write_connection() as db:
+        async with db.execute("PRAGMA foreign_keys") as cursor:
+            assert (await cursor.fetchone())[0] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_write_connection_is_serialized(temp_db):
+    """Concurrent writers take turns on the one dedicated connection."""
+    pool = get_pool()
+    inside = 0
+    max_inside = 0
+    seen = set()
+
+    async def writer(i: int) -> None:
+        nonlocal inside, max_inside
+        async with pool.write_connection() as db:
+            inside += 1
+            max_inside = max(max_inside, inside)
+            seen.add(id(db))
+            await db.execute(
+                "INSERT INTO letta_users (created_at, last_active) VALUES (?, ?)",
+                (str(i), str(i)),
+            )
+            await asyncio.sleep(0)
+            await db.commit()
+            inside -= 1
+
+    await asyncio.gather(*(writer(i) for i in range(5)))
+
+    assert max_inside == 1
+    assert len(seen) == 1
+    async with pool.connection() as db:
+        async with db.execute("SELECT COUNT(*) FROM letta_users") as cursor:
+            assert (await cursor.fetchone())[0] == 5
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_write_connection_rolls_back_uncommitted_work(temp_db):
+    """A writer that errors out never leaks its transaction to the next one."""
+    pool = get_pool()
+    with pytest.raises(RuntimeError):
+        async with pool.write_connection() as db:
+            await db.execute(
+                "INSERT INTO letta_users (created_at, last_active) VALUES ('x', 'x')"
+            )
+            raise RuntimeError("boom")
+
+    async with pool.write_connection() as db:
+        assert not db.in_transaction
+        async with db.execute("SELECT COUNT(*) FROM letta_users") as cursor:
+            assert (await cursor.fetchone())[0] == 0
+
+
+@pytest.mark.unit
+def test_pool_rejects_unsafe_pragma_values():
+    """PRAGMA values are interpolated, so anything but plain tokens is refused."""
+    with pytest.raises(ValueError):
+        ConnectionPool(pragmas={"journal_mode": "WAL; DROP TABLE queue"})
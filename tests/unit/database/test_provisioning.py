@@ -0,0 +1,197 @@
+"""Unit tests for background Letta user provisioning."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from common.retry import RetryConfig
+from database.operations.messages import insert_message
+from database.operations.provisioning import (
+    ResourcePoolStats,
+    get_resource_pool_stats,
+    refill_resource_pool,
+    schedule_provisioning,
+)
+from database.operations.queue import add_to_queue, atomic_dequeue_batch
+from database.operations.users import get_or_create_platform_profile
+from database.pool import get_pool
+
+
+def _mock_client(block_errors: int = 0) -> MagicMock:
+    """Letta client whose calls wait for a release and count themselves.
+
+    The first block_errors blocks.create calls raise ConnectionError.
+    """
+    client = MagicMock()
+    client.release = asyncio.Event()
+    client.identity_calls = 0
+    client.block_calls = 0
+
+    async def create_identity(**kwargs):
+        client.identity_calls += 1
+        await client.release.wait()
+        return MagicMock(id=f"identity-{client.identity_calls}")
+
+    async def create_block(**kwargs):
+        client.block_calls += 1
+        await client.release.wait()
+        if client.block_calls <= block_errors:
+            raise ConnectionError("letta down")
+        return MagicMock(id=f"block-{client.block_calls}")
+
+    client.create_identity = AsyncMock(side_effect=create_identity)
+    client.aio.blocks.create = AsyncMock(side_effect=create_block)
+    client.update_identity = AsyncMock()
+    client.aio.blocks.update = AsyncMock()
+    return client
+
+
+async def _user_row(letta_user_id: int) -> tuple:
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT letta_identity_id, letta_block_id, provision_status "
+            "FROM letta_users WHERE id = ?",
+            (letta_user_id,),
+        ) as cursor:
+            return tuple(await cursor.fetchone())
+
+
+@pytest.fixture(autouse=True)
+def pool_state():
+    """Start every test with the warm pool disabled and fresh counters."""
+    with patch.multiple(
+        "database.operations.provisioning",
+        _pool_size=0,
+        _pool_empty=False,
+        _pool_metrics=ResourcePoolStats(),
+    ):
+        yield
+
+
+@pytest.fixture
+def no_retry_delay():
+    with patch(
+        "database.operations.provisioning.PROVISION_RETRY_CONFIG",
+        RetryConfig(max_retries=2, base_delay=0, jitter=False),
+    ):
+        yield
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_new_user_is_accepted_before_provisioning(temp_db, no_retry_delay):
+    """First messages return at once; one identity and block are created."""
+    client = _mock_client()
+    with patch(
+        "database.operations.provisioning.get_letta_client", return_value=client
+    ):
+        (profile, user), (again, same_user) = await asyncio.gather(
+            get_or_create_platform_profile("telegram", "42", "amy", "Amy"),
+            get_or_create_platform_profile("telegram", "42", "amy", "Amy"),
+        )
+        assert (again.id, same_user.id) == (profile.id, user.id)
+        assert user.provision_status == "pending"
+
+        # Both calls were issued concurrently, before either finished
+        await asyncio.sleep(0)
+        assert (client.identity_calls, client.block_calls) == (1, 1)
+
+        # The message is queued but not claimed while the user is pending
+        message_id = await insert_message(user.id, profile.id, "user", "hi")
+        await add_to_queue(user.id, message_id)
+        assert await atomic_dequeue_batch(5) == []
+
+        task = schedule_provisioning("telegram", "42", user.id)
+        client.release.set()
+        assert await task
+
+    assert (client.identity_calls, client.block_calls) == (1, 1)
+    assert await _user_row(user.id) == ("identity-1", "block-1", "ready")
+    _, user = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+    assert (user.letta_block_id, user.provision_status) == ("block-1", "ready")
+    assert len(await atomic_dequeue_batch(5)) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_retry_only_creates_missing_resources(temp_db, no_retry_delay):
+    """A failed block create is retried without creating a second identity."""
+    client = _mock_client(block_errors=1)
+    client.release.set()
+    with patch(
+        "database.operations.provisioning.get_letta_client", return_value=client
+    ):
+        _, user = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+        assert await schedule_provisioning("telegram", "42", user.id)
+
+    assert (client.identity_calls, client.block_calls) == (1, 2)
+    assert await _user_row(user.id) == ("identity-1", "block-2", "ready")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_user_is_reprovisioned_on_next_message(temp_db, no_retry_delay):
+    """Exhausted retries mark the user failed; the next message tries again."""
+    client = _mock_client(block_errors=3)
+    client.release.set()
+    with patch(
+        "database.operations.provisioning.get_letta_client", return_value=client
+    ):
+        _, user = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+        assert not await schedule_provisioning("telegram", "42", user.id)
+        assert await _user_row(user.id) == ("identity-1", None, "failed")
+
+        _, user = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+        assert user.provision_status == "failed"
+        assert await schedule_provisioning("telegram", "42", user.id)
+
+    assert (client.identity_calls, client.block_calls) == (1, 4)
+    assert await _user_row(user.id) == ("identity-1", "block-4", "ready")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_new_user_claims_pooled_resources(temp_db, no_retry_delay):
+    """Refills create pairs ahead of time; a new user only renames one."""
+    client = _mock_client()
+    client.release.set()
+    with patch(
+        "database.operations.provisioning.get_letta_client", return_value=client
+    ):
+        assert await refill_resource_pool(size=3, batch=2) == 2
+        assert await refill_resource_pool(size=3, batch=2) == 1
+        assert await refill_resource_pool(size=3, batch=2) == 0
+        assert (client.identity_calls, client.block_calls) == (3, 3)
+
+        _, user = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+        assert await schedule_provisioning("telegram", "42", user.id)
+
+    assert (client.identity_calls, client.block_calls) == (3, 3)
+    assert await _user_row(user.id) == ("identity-1", "block-1", "ready")
+    assert client.update_identity.await_args.kwargs == {"name": "Amy"}
+    assert client.aio.blocks.update.await_args.args == ("block-1",)
+    assert "About Me (Amy)" in client.aio.blocks.update.await_args.kwargs["value"]
+    stats = await get_resource_pool_stats()
+    assert (stats.size, stats.depth, stats.claimed, stats.depleted) == (3, 2, 1, 0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_empty_pool_falls_back_to_creating(temp_db, no_retry_delay):
+    """A claim from an empty pool is counted and the pair is created inline."""
+    client = _mock_client()
+    client.release.set()
+    with patch(
+        "database.operations.provisioning.get_letta_client", return_value=client
+    ):
+        await refill_resource_pool(size=1, batch=1)
+        for platform_user_id in ("1", "2"):
+            _, user = await get_or_create_platform_profile(
+                "telegram", platform_user_id, "amy", "Amy"
+            )
+            assert await schedule_provisioning("telegram", platform_user_id, user.id)
+
+    assert (client.identity_calls, client.block_calls) == (2, 2)
+    stats = await get_resource_pool_stats()
+    assert (stats.depth, stats.claimed, stats.depleted) == (0, 1, 1)
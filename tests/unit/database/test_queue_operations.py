@@ -1,5 +1,6 @@
 """Unit tests for database queue operations."""
 
+import asyncio
 from datetime import datetime
 
 import pytest
@@ -7,7 +8,22 @@ import pytest
 from database.operations.messages import insert_message
 from database.operations.queue import (
     add_to_queue,
+    add_to_queue_many,
+    atomic_dequeue_batch,
+    atomic_dequeue_item,
+    claim_user_pending,
     get_pending_queue_item,
+    get_queue_item_context,
+    get_queue_messages,
+    get_queue_statistics,
+    next_retry_delay,
+    reclaim_expired_leases,
+    release_queue_items,
+    renew_leases,
+    requeue_failed_item,
+    requeue_stale_processing_items,
+    update_queue_status,
+    wait_for_queue_activity,
 )
 from database.pool import get_pool
 
@@ -76,6 +92,32 @@ async def test_add_to_queue(temp_db):
     # Function returns None, so we just verify it doesn't raise an exception
 
 
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_add_to_queue_many(temp_db):
+    """Bulk enqueue returns the new queue ids in input order."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    message_ids = [
+        await insert_message(
+            letta_user_id=letta_user_id,
+            platform_profile_id=platform_profile_id,
+            role="user",
+            message=f"Hello {i}",
+        )
+        for i in range(2)
+    ]
+
+    queue_ids = await add_to_queue_many(
+        [(letta_user_id, message_id) for message_id in message_ids]
+    )
+
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT id, message_id FROM queue ORDER BY id") as cur:
+            rows = await cur.fetchall()
+    assert [tuple(row) for row in rows] == list(zip(queue_ids, message_ids))
+    assert await add_to_queue_many([]) == []
+
+
 @pytest.mark.unit
 @pytest.mark.asyncio
 async def test_get_pending_queue_item(temp_db):
@@ -131,6 +173,305 @@ async def test_delete_queue_item(temp_db):
 @pytest.mark.unit
 @pytest.mark.asyncio
 async def test_get_queue_statistics(temp_db):
-    """Test getting queue statistics."""
-    # This test will need to be implemented based on the actual function
-    pass
+    """Queue statistics follow inserts and status changes via stats_counters."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    for text in ("one", "two"):
+        message_id = await insert_message(
+            letta_user_id=letta_user_id,
+            platform_profile_id=platform_profile_id,
+            role="user",
+            message=text,
+        )
+        await add_to_queue(letta_user_id, message_id)
+
+    item = await atomic_dequeue_item()
+    await update_queue_status(item.id, "completed")
+
+    stats = await get_queue_statistics()
+    assert stats == {
+        "pending": 1,
+        "processing": 0,
+        "failed": 0,
+        "completed": 1,
+        "flushed": 0,
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_atomic_dequeue_item_skips_excluded_users(temp_db):
+    """Users with a turn in flight are skipped so their lane stays ordered."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    message_id = await insert_message(
+        letta_user_id=letta_user_id,
+        platform_profile_id=platform_profile_id,
+        role="user",
+        message="Lane message",
+    )
+    await add_to_queue(letta_user_id, message_id)
+
+    assert await atomic_dequeue_item(exclude_user_ids={letta_user_id}) is None
+
+    item = await atomic_dequeue_item(exclude_user_ids={letta_user_id + 1})
+    assert item is not None
+    assert item.message_id == message_id
+    assert item.status == "processing"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_add_to_queue_wakes_idle_consumer(temp_db):
+    """An in-process enqueue wakes a consumer before its fallback poll elapses."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    message_id = await insert_message(
+        letta_user_id=letta_user_id,
+        platform_profile_id=platform_profile_id,
+        role="user",
+        message="Wake up",
+    )
+
+    waiter = asyncio.create_task(wait_for_queue_activity(timeout=30.0))
+    await asyncio.sleep(0)
+    await add_to_queue(letta_user_id, message_id)
+
+    assert await asyncio.wait_for(waiter, timeout=2.0) is True
+    assert await wait_for_queue_activity(timeout=0.01) is False
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_atomic_dequeue_batch_claims_one_row_per_user(temp_db):
+    """A batch claim takes each user's oldest pending row, skipping excluded users."""
+    user_a, profile_a = await _seed_user_and_profile()
+    now = datetime.utcnow().isoformat()
+    async with get_pool().connection() as db:
+        cursor = await db.execute(
+            "INSERT INTO letta_users (created_at, last_active) VALUES (?, ?)",
+            (now, now),
+        )
+        user_b = cursor.lastrowid
+        cursor = await db.execute(
+            """
+            INSERT INTO platform_profiles (
+                letta_user_id, platform, platform_user_id, username, display_name
+            ) VALUES (?, 'telegram', '987654321', 'other', 'Other User')
+        """,
+            (user_b,),
+        )
+        profile_b = cursor.lastrowid
+        await db.commit()
+
+    message_ids = {}
+    for user, profile, text in (
+        (user_a, profile_a, "a1"),
+        (user_a, profile_a, "a2"),
+        (user_b, profile_b, "b1"),
+    ):
+        message_ids[text] = await insert_message(
+            letta_user_id=user,
+            platform_profile_id=profile,
+            role="user",
+            message=text,
+        )
+        await add_to_queue(user, message_ids[text])
+
+    items = await atomic_dequeue_batch(5)
+    assert [item.message_id for item in items] == [message_ids["a1"], message_ids["b1"]]
+    assert all(item.status == "processing" for item in items)
+
+    # User A still has a turn in flight (here or in another consumer), so a2
+    # must wait for its lane
+    assert await atomic_dequeue_batch(5, exclude_user_ids={user_a}) == []
+    assert await atomic_dequeue_batch(5) == []
+    await update_queue_status(items[0].id, "completed")
+    items = await atomic_dequeue_batch(5)
+    assert [item.message_id for item in items] == [message_ids["a2"]]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_get_queue_item_context_joins_message_profile_and_user(temp_db):
+    """One query returns the message text, platform profile and Letta IDs."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    async with get_pool().connection() as db:
+        await db.execute(
+            "UPDATE letta_users SET letta_block_id = ?, letta_identity_id = ? "
+            "WHERE id = ?",
+            ("block-1", "identity-1", letta_user_id),
+        )
+        await db.commit()
+    message_id = await insert_message(
+        letta_user_id=letta_user_id,
+        platform_profile_id=platform_profile_id,
+        role="user",
+        message="Context please",
+    )
+    await add_to_queue(letta_user_id, message_id)
+    item = await get_pending_queue_item()
+
+    context = await get_queue_item_context(item.id)
+    assert context.message_id == message_id
+    assert context.message == "Context please"
+    assert context.profile.id == platform_profile_id
+    assert context.profile.platform == "telegram"
+    assert context.profile.platform_user_id == "123456789"
+    assert context.letta_block_id == "block-1"
+    assert context.letta_identity_id == "identity-1"
+
+    assert await get_queue_item_context(item.id + 100) is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_requeue_stale_processing_items_uses_claimed_at(temp_db):
+    """Only rows claimed longer ago than the cutoff are requeued."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    for text in ("fresh", "stale"):
+        message_id = await insert_message(
+            letta_user_id=letta_user_id,
+            platform_profile_id=platform_profile_id,
+            role="user",
+            message=text,
+        )
+        await add_to_queue(letta_user_id, message_id)
+    claimed = [await atomic_dequeue_item(), await atomic_dequeue_item()]
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "UPDATE queue SET claimed_at = claimed_at - 600000 WHERE id = ?",
+            (claimed[1].id,),
+        )
+        await db.commit()
+
+    assert await requeue_stale_processing_items(max_age_seconds=300) == 1
+
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT id, status, claimed_at IS NULL FROM queue ORDER BY id"
+        ) as cursor:
+            rows = [tuple(row) for row in await cursor.fetchall()]
+    assert rows == [(claimed[0].id, "processing", 0), (claimed[1].id, "pending", 1)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_expired_leases_are_reclaimed_and_live_ones_renewed(temp_db):
+    """Claims stay with a heartbeating consumer and return to pending otherwise."""
+    letta_user_id, platform_profile_id = await _seed_user_and_profile()
+    message_id = await insert_message(
+        letta_user_id=letta_user_id,
+        platform_profile_id=platform_profile_id,
+        role="user",
+        message="leased",
+    )
+    await add_to_queue(letta_user_id, message_id)
+    (item,) = await atomic_dequeue_batch(1, lease_owner="worker-a", lease_seconds=30)
+
+    assert await renew_leases("worker-a", [item.id], lease_seconds=30) == 1
+    assert await renew_leases("worker-b", [item.id], lease_seconds=30) == 0
+    assert await reclaim_expired_leases() == 0
+    # Long-running leased turns are not touched by the startup stale sweep
+    assert await requeue_stale_processing_items(max_age_seconds=0) == 0
+
+    async with get_pool().write_connection() as db:
+        await db.execute("UPDATE queue SET lease_expires_at = lease_expires_at - 60000")
+        await db.commit()
+    assert await reclaim_expired_leases() == 1
+
+    (again,) = await atomic_dequeue_batch(1, lease_owner="worker-b")
+    assert again.id == item.id
+    assert await renew_leases("worker-a", [item.id], lease_seconds=30) == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_atomic_dequeue_batch_priority_and_round_robin(temp_db):
+    """Priority rows go first; otherwise the least recently served user does."""
+    user_a, profile_a = await _seed_user_and_profile()
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute("INSERT INTO letta_users (created_at) VALUES ('x')")
+        user_b = cursor.lastrowid
+        await db.commit()
+
+    async def enqueue(user: int, priority: int = 0) -> int:
+        message_id = await insert_message(user, profile_a, "user", "m")
+        await add_to_queue(user, message_id, priority=priority)
+        return message_id
+
+    a1, a2 = await enqueue(user_a), await enqueue(user_a)
+    b1 = await enqueue(user_b)
+    urgent = await enqueue(user_b, priority=5)
+
+    async def claim_one(**kwargs) -> int:
+        (item,) = await atomic_dequeue_batch(1, **kwargs)
+        await update_queue_status(item.id, "completed")
+        return item.message_id
+
+    # FIFO within a user: b1 comes before b's urgent row, but b's head still
+    # jumps user a's queue via user_priorities
+    assert await claim_one(user_priorities={user_b: 1}) == b1
+    assert await claim_one() == urgent
+    # a was never served, b just was: round robin goes back to a
+    assert await claim_one() == a1
+    assert await claim_one(policy="fifo") == a2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_claim_user_pending_and_release(temp_db):
+    """A user's backlog is claimed oldest first and can be released untouched."""
+    user_a, profile_a = await _seed_user_and_profile()
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute("INSERT INTO letta_users (created_at) VALUES ('x')")
+        user_b = cursor.lastrowid
+        await db.commit()
+
+    for user, text in ((user_a, "a1"), (user_b, "b1"), (user_a, "a2")):
+        await add_to_queue(user, await insert_message(user, profile_a, "user", text))
+    await add_to_queue(user_a, await insert_message(user_a, profile_a, "user", "a3"))
+
+    (head,) = await atomic_dequeue_batch(1, policy="fifo")
+    extras = await claim_user_pending(user_a, 5, lease_owner="worker-a")
+    assert [item.status for item in extras] == ["processing", "processing"]
+
+    texts = await get_queue_messages([head.id, *(item.id for item in extras)])
+    assert [texts[item.id][0] for item in (head, *extras)] == ["a1", "a2", "a3"]
+    assert all(received_at for _, received_at in texts.values())
+    assert await claim_user_pending(user_a, 5) == []
+
+    assert await release_queue_items(item.id for item in extras) == 2
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT status, attempts, lease_owner FROM queue WHERE id IN (?, ?)",
+            tuple(item.id for item in extras),
+        ) as cursor:
+            rows = [tuple(row) for row in await cursor.fetchall()]
+    assert rows == [("pending", 0, None), ("pending", 0, None)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_requeued_item_waits_out_its_backoff(temp_db):
+    """A failed item is deferred by not_before; other users are still served."""
+    user_a, profile_a = await _seed_user_and_profile()
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute("INSERT INTO letta_users (created_at) VALUES ('x')")
+        user_b = cursor.lastrowid
+        await db.commit()
+    for user, text in ((user_a, "a1"), (user_a, "a2"), (user_b, "b1")):
+        await add_to_queue(user, await insert_message(user, profile_a, "user", text))
+
+    (failed,) = await atomic_dequeue_batch(1, policy="fifo")
+    assert await requeue_failed_item(failed.id, base_delay=30) is True
+    assert 25 < await next_retry_delay() <= 30
+
+    # a1 keeps user a's place, so neither a1 nor a2 jumps ahead of the backoff
+    assert await atomic_dequeue_item(exclude_user_ids={user_b}) is None
+    (item,) = await atomic_dequeue_batch(5)
+    assert item.letta_user_id == user_b
+
+    async with get_pool().write_connection() as db:
+        await db.execute("UPDATE queue SET not_before = not_before - 60000")
+        await db.commit()
+    assert await next_retry_delay() is None
+    (retry,) = await atomic_dequeue_batch(5)
+    assert (retry.id, retry.attempts) == (failed.id, 1)
@@ -93,6 +93,7 @@ class TestQueueOperationsComprehensive:
             mock_pool = AsyncMock()
             # Mock connection() as callable that returns async context manager
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             await add_to_queue(123, 456)
@@ -108,6 +109,7 @@ class TestQueueOperationsComprehensive:
             mock_db.set_execute_side_effect(Exception("Database error"))
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             with pytest.raises(Exception, match="Database error"):
@@ -130,6 +132,7 @@ class TestQueueOperationsComprehensive:
             mock_db.set_cursor(mock_cursor)
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             result = await get_pending_queue_item()
@@ -150,6 +153,7 @@ class TestQueueOperationsComprehensive:
             mock_db.set_cursor(mock_cursor)
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             result = await get_pending_queue_item()
@@ -163,6 +167,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -176,6 +181,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = (
@@ -202,6 +208,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = None
@@ -218,6 +225,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = (
@@ -229,7 +237,7 @@ class TestQueueOperationsComprehensive:
                 "2023-01-01T12:00:00",
             )
             mock_db.set_cursor(mock_cursor)
-            mock_db.total_changes = 0  # Race condition - no rows affected
+            mock_cursor.rowcount = 0  # Race condition - no rows affected
 
             result = await atomic_dequeue_item()
 
@@ -242,6 +250,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -261,6 +270,7 @@ class TestQueueOperationsComprehensive:
                 mock_pool.connection = lambda: AsyncContextManagerMock(
                     return_value=mock_db
                 )
+                mock_pool.write_connection = mock_pool.connection
                 mock_get_pool.return_value = mock_pool
                 mock_cursor = AsyncMock()
                 mock_cursor.fetchone.return_value = (2,)  # attempts = 2
@@ -325,6 +335,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = (
@@ -349,6 +360,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = (
@@ -373,6 +385,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = None
@@ -388,6 +401,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -401,6 +415,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchall.return_value = [
@@ -446,6 +461,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchall.return_value = []
@@ -462,6 +478,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -475,6 +492,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchall.return_value = [
@@ -500,6 +518,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchall.return_value = []
@@ -518,6 +537,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -531,6 +551,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             result = await flush_all_queue_items("echo")
@@ -546,6 +567,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -560,6 +582,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             result = await delete_queue_item(1)
@@ -575,6 +598,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_db.set_execute_side_effect(Exception("Database error"))
 
@@ -608,6 +632,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = (
@@ -646,6 +671,7 @@ class TestQueueOperationsComprehensive:
                 mock_pool.connection = lambda _db=mock_db: AsyncContextManagerMock(
                     return_value=_db
                 )
+                mock_pool.write_connection = mock_pool.connection
                 mock_get_pool.return_value = mock_pool
                 mock_cursor = AsyncMock()
                 mock_cursor.fetchone.return_value = (
@@ -671,6 +697,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             await add_to_queue(0, 0)
@@ -681,6 +708,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
 
             await add_to_queue(999999, 999999)
@@ -693,6 +721,7 @@ class TestQueueOperationsComprehensive:
             mock_db = MockDatabase()
             mock_pool = AsyncMock()
             mock_pool.connection = lambda: AsyncContextManagerMock(return_value=mock_db)
+            mock_pool.write_connection = mock_pool.connection
             mock_get_pool.return_value = mock_pool
             mock_cursor = AsyncMock()
             mock_cursor.fetchone.return_value = (1, 123, 456, "pending", 0, None)
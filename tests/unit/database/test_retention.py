@@ -0,0 +1,144 @@
+"""Unit tests for queue/message retention and archival."""
+
+from datetime import datetime, timedelta
+
+import aiosqlite
+import pytest
+
+from common.config import RetentionConfig
+from database.operations.retention import (
+    archive_messages,
+    archive_queue_items,
+    run_retention,
+)
+from database.pool import get_pool
+
+OLD = (datetime.utcnow() - timedelta(days=60)).isoformat()
+RECENT = datetime.utcnow().isoformat()
+
+
+async def _seed(rows: list[tuple[str, str, str]]) -> None:
+    """Insert one message + queue row per (queue status, queue ts, message ts)."""
+    async with get_pool().write_connection() as db:
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, ?)", (OLD,))
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        for status, queue_ts, message_ts in rows:
+            cursor = await db.execute(
+                "INSERT INTO messages (letta_user_id, platform_profile_id, role, "
+                "message, timestamp) VALUES (1, 1, 'user', 'hi', ?)",
+                (message_ts,),
+            )
+            await db.execute(
+                "INSERT INTO queue (letta_user_id, message_id, status, timestamp) "
+                "VALUES (1, ?, ?, ?)",
+                (cursor.lastrowid, status, queue_ts),
+            )
+        await db.commit()
+
+
+async def _statuses(db: aiosqlite.Connection, table: str) -> list:
+    async with db.execute(f"SELECT status FROM {table} ORDER BY id") as cursor:
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def _count(db: aiosqlite.Connection, table: str) -> int:
+    async with db.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_run_retention_archives_terminal_rows_and_unreferenced_messages(
+    temp_db,
+):
+    """Old completed/flushed rows and their messages move; live rows stay."""
+    await _seed(
+        [
+            ("completed", OLD, OLD),
+            ("flushed", OLD, OLD),
+            ("completed", RECENT, OLD),  # too recent to archive
+            ("pending", OLD, OLD),
+            ("failed", OLD, OLD),
+        ]
+    )
+
+    result = await run_retention(RetentionConfig(batch_size=1))
+
+    assert result.queue_archived == 2
+    assert result.messages_archived == 2
+    async with get_pool().connection() as db:
+        assert await _statuses(db, "queue") == ["completed", "pending", "failed"]
+        assert await _statuses(db, "queue_archive") == ["completed", "flushed"]
+        assert await _count(db, "messages") == 3
+        assert await _count(db, "messages_archive") == 2
+        async with db.execute(
+            "SELECT COUNT(*) FROM queue_archive WHERE archived_at IS NOT NULL"
+        ) as cursor:
+            assert (await cursor.fetchone())[0] == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_archive_into_separate_file(temp_db, tmp_path):
+    """With archive_path set, archived rows land in the separate SQLite file."""
+    await _seed([("completed", OLD, OLD), ("completed", OLD, OLD)])
+    archive_path = str(tmp_path / "archive.db")
+
+    moved = await archive_queue_items(timedelta(hours=1), 10, archive_path)
+    assert moved == 2
+    assert await archive_messages(timedelta(days=1), 10, archive_path) == 2
+
+    async with get_pool().connection() as db:
+        assert await _count(db, "queue") == 0
+        async with db.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE '%_archive'"
+        ) as cursor:
+            assert await cursor.fetchall() == []
+    async with aiosqlite.connect(archive_path) as archive:
+        assert await _count(archive, "queue_archive") == 2
+        assert await _count(archive, "messages_archive") == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_archive_table_picks_up_new_columns(temp_db):
+    """Columns added to the live table later are added to the archive too."""
+    await _seed([("completed", OLD, OLD)])
+    await archive_queue_items(timedelta(hours=1))
+
+    async with get_pool().write_connection() as db:
+        await db.execute("ALTER TABLE queue ADD COLUMN lane INTEGER DEFAULT 0")
+        await db.commit()
+    await _seed_more_completed()
+    assert await archive_queue_items(timedelta(hours=1)) == 1
+
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT lane FROM queue_archive ORDER BY id") as cur:
+            assert [row[0] for row in await cur.fetchall()] == [None, 0]
+
+
+async def _seed_more_completed() -> None:
+    async with get_pool().write_connection() as db:
+        cursor = await db.execute(
+            "INSERT INTO messages (letta_user_id, platform_profile_id, role, "
+            "message, timestamp) VALUES (1, 1, 'user', 'again', ?)",
+            (OLD,),
+        )
+        await db.execute(
+            "INSERT INTO queue (letta_user_id, message_id, status, timestamp) "
+            "VALUES (1, ?, 'completed', ?)",
+            (cursor.lastrowid, OLD),
+        )
+        await db.commit()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_new_database_uses_incremental_auto_vacuum(temp_db):
+    """Fresh databases are created so retention can run incremental_vacuum."""
+    async with get_pool().connection() as db:
+        async with db.execute("PRAGMA auto_vacuum") as cursor:
+            assert (await cursor.fetchone())[0] == 2
@@ -0,0 +1,74 @@
+"""Unit tests for trigger-maintained stats counters."""
+
+from datetime import datetime
+
+import pytest
+
+from database.operations.shared import get_dashboard_stats
+from database.operations.stats import get_stats_counters, reconcile_stats_counters
+from database.pool import get_pool
+
+
+async def _seed(statuses: list[str]) -> None:
+    now = datetime.utcnow().isoformat()
+    async with get_pool().write_connection() as db:
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, ?)", (now,))
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        for status in statuses:
+            cursor = await db.execute(
+                "INSERT INTO messages (letta_user_id, platform_profile_id, role, "
+                "message, timestamp) VALUES (1, 1, 'user', 'hi', ?)",
+                (now,),
+            )
+            await db.execute(
+                "INSERT INTO queue (letta_user_id, message_id, status) VALUES (1, ?, ?)",
+                (cursor.lastrowid, status),
+            )
+        await db.commit()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_triggers_track_inserts_updates_and_deletes(temp_db):
+    """Counters follow writes made with plain SQL, not just the operations layer."""
+    await _seed(["pending", "pending", "failed"])
+
+    async with get_pool().write_connection() as db:
+        await db.execute("UPDATE queue SET status = 'completed' WHERE id = 1")
+        await db.execute("UPDATE queue SET status = 'completed' WHERE id = 1")
+        await db.execute("DELETE FROM queue WHERE id = 3")
+        await db.commit()
+
+    counters = await get_stats_counters()
+    assert counters["letta_users"] == 1
+    assert counters["messages"] == 3
+    assert counters["queue:pending"] == 1
+    assert counters["queue:completed"] == 1
+    assert counters["queue:failed"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drift_and_dashboard_reads_counters(temp_db):
+    """reconcile_stats_counters recomputes counts; the dashboard uses them."""
+    await _seed(["pending", "completed"])
+    async with get_pool().write_connection() as db:
+        await db.execute("UPDATE stats_counters SET value = 99")
+        await db.commit()
+
+    counters = await reconcile_stats_counters()
+
+    assert counters == {
+        "letta_users": 1,
+        "messages": 2,
+        "queue:pending": 1,
+        "queue:completed": 1,
+    }
+    assert await get_dashboard_stats() == {
+        "user_count": 1,
+        "message_count": 2,
+        "queue_stats": {"pending": 1, "completed": 1},
+    }
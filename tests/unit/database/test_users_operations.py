@@ -6,7 +6,10 @@ import pytest
 
 from database.operations.users import (
     get_or_create_letta_user,
+    get_or_create_platform_profile,
+    update_letta_user,
 )
+from database.pool import get_pool
 
 
 @pytest.mark.unit
@@ -14,8 +17,9 @@ from database.operations.users import (
 async def test_get_or_create_letta_user_new_user(temp_db):
     """Test creating a new Letta user with mocked Letta client."""
     mock_client = MagicMock()
+    mock_client.aio = AsyncMock()
     mock_client.create_identity = AsyncMock(return_value=MagicMock(id="identity-1"))
-    mock_client.blocks.create.return_value = MagicMock(id="block-1")
+    mock_client.aio.blocks.create.return_value = MagicMock(id="block-1")
 
     with patch(
         "database.operations.users.get_letta_client",
@@ -51,3 +55,46 @@ async def test_get_platform_profile_id(temp_db):
     """Test getting platform profile ID."""
     # This test will need to be implemented based on the actual function
     pass
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_known_profile_is_served_from_cache(temp_db):
+    """Repeat lookups skip the database; last_active is written in batches."""
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "INSERT INTO letta_users (id, created_at, letta_block_id) "
+            "VALUES (1, 'x', 'block-1')"
+        )
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id, username, display_name, last_active) "
+            "VALUES (1, 1, 'telegram', '42', 'amy', 'Amy', 'old')"
+        )
+        await db.commit()
+
+    async def db_profile() -> tuple:
+        async with get_pool().connection() as db:
+            async with db.execute(
+                "SELECT username, last_active FROM platform_profiles"
+            ) as cursor:
+                return tuple(await cursor.fetchone())
+
+    cache = get_pool().profile_cache
+    profile, user = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+    assert (profile.id, user.letta_block_id) == (1, "block-1")
+    again, _ = await get_or_create_platform_profile("telegram", "42", "amy", "Amy")
+    assert cache.hits == 1
+    # Unchanged profile: no write until the cache flushes
+    assert await db_profile() == ("amy", "old")
+    assert await cache.flush() == 1
+    assert await db_profile() == ("amy", again.last_active)
+
+    # Changed fields are written through
+    await get_or_create_platform_profile("telegram", "42", "amelia", "Amy")
+    assert (await db_profile())[0] == "amelia"
+
+    # Writes to the Letta user invalidate its cached profiles
+    await update_letta_user(1, custom_instructions="be brief")
+    _, user = await get_or_create_platform_profile("telegram", "42", "amelia", "Amy")
+    assert user.custom_instructions == "be brief"
@@ -51,6 +51,7 @@ async def test_agent_client_send_message_success():
     ):
         # Mock the Letta client and its response
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_get_client.return_value = mock_client
 
         mock_response = MagicMock()
@@ -59,13 +60,13 @@ async def test_agent_client_send_message_success():
         mock_message.message_type = "assistant"
         mock_response.messages = [mock_message]
 
-        mock_client.agents.messages.create.return_value = mock_response
+        mock_client.aio.agents.messages.create.return_value = mock_response
 
         agent = AgentClient()
         result = await agent.process_message("Test message")
 
         assert result == "Test response"
-        call = mock_client.agents.messages.create.call_args
+        call = mock_client.aio.agents.messages.create.call_args
         assert call[0][0] == "test-agent-123"
         msgs = call[1]["messages"]
         assert len(msgs) == 1
@@ -87,8 +88,9 @@ async def test_agent_client_send_message_http_error():
     ):
         # Mock the Letta client to raise an exception
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_get_client.return_value = mock_client
-        mock_client.agents.messages.create.side_effect = Exception("API Error")
+        mock_client.aio.agents.messages.create.side_effect = Exception("API Error")
 
         agent = AgentClient()
         result = await agent.process_message("Test message")
@@ -107,12 +109,13 @@ async def test_agent_client_get_status_success():
     ):
         # Mock the Letta client and agent
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_get_client.return_value = mock_client
 
         mock_agent = MagicMock()
         mock_agent.id = "test-agent-123"
         mock_agent.name = "Test Agent"
-        mock_client.agents.retrieve.return_value = mock_agent
+        mock_client.aio.agents.retrieve.return_value = mock_agent
 
         agent = AgentClient()
         result = await agent.initialize()
@@ -130,8 +133,9 @@ async def test_agent_client_get_status_error():
     ):
         # Mock the Letta client to raise an exception
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_get_client.return_value = mock_client
-        mock_client.agents.retrieve.side_effect = Exception("Agent not found")
+        mock_client.aio.agents.retrieve.side_effect = Exception("Agent not found")
 
         agent = AgentClient()
         result = await agent.initialize()
@@ -536,6 +540,7 @@ async def test_letta_client_add_to_queue():
 
     with patch("runtime.core.letta_client.LettaClient") as mock_client_class:
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_client.add_to_queue = AsyncMock(return_value={"id": "test-id"})
         mock_client_class.return_value = mock_client
 
@@ -556,6 +561,7 @@ async def test_letta_client_send_message():
 
     with patch("runtime.core.letta_client.LettaClient") as mock_client_class:
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_client.send_message = AsyncMock(return_value={"response": "test response"})
         mock_client_class.return_value = mock_client
 
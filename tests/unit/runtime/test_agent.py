@@ -1,7 +1,7 @@
 """Unit tests for runtime core agent functionality."""
 
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -28,11 +28,12 @@ async def test_agent_client_send_message():
         patch("runtime.core.agent.get_letta_client") as mock_get_client,
     ):
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_response = MagicMock()
         mock_response.messages = [
             MagicMock(content="test response", message_type="assistant")
         ]
-        mock_client.agents.messages.create.return_value = mock_response
+        mock_client.aio.agents.messages.create.return_value = mock_response
         mock_get_client.return_value = mock_client
 
         agent = AgentClient()
@@ -40,7 +41,7 @@ async def test_agent_client_send_message():
 
         assert result == "test response"
         # Explicit messages= (single user message) to avoid input/tool ambiguity
-        call = mock_client.agents.messages.create.call_args
+        call = mock_client.aio.agents.messages.create.call_args
         assert call[0][0] == "test-agent-123"
         msgs = call[1]["messages"]
         assert len(msgs) == 1
@@ -62,7 +63,8 @@ async def test_agent_client_send_message_error():
         patch("runtime.core.agent.is_retryable_exception") as mock_retryable,
     ):
         mock_client = MagicMock()
-        mock_client.agents.messages.create.side_effect = Exception("API Error")
+        mock_client.aio = AsyncMock()
+        mock_client.aio.agents.messages.create.side_effect = Exception("API Error")
         mock_get_client.return_value = mock_client
         # Make the exception non-retryable so it gets raised immediately
         mock_retryable.return_value = False
@@ -83,10 +85,11 @@ async def test_agent_client_get_status():
         patch("runtime.core.agent.get_letta_client") as mock_get_client,
     ):
         mock_client = MagicMock()
+        mock_client.aio = AsyncMock()
         mock_agent = MagicMock()
         mock_agent.id = "test-agent-123"
         mock_agent.name = "Test Agent"
-        mock_client.agents.retrieve.return_value = mock_agent
+        mock_client.aio.agents.retrieve.return_value = mock_agent
         mock_get_client.return_value = mock_client
 
         agent = AgentClient()
@@ -1,6 +1,7 @@
 """Extended unit tests for runtime agent client."""
 
-import time
+import asyncio
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -54,10 +55,11 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_agent = MagicMock()
             mock_agent.id = "test-agent"
             mock_agent.name = "Test Agent"
-            mock_client.agents.retrieve.return_value = mock_agent
+            mock_client.aio.agents.retrieve.return_value = mock_agent
             mock_get_client.return_value = mock_client
 
             agent = AgentClient()
@@ -94,6 +96,7 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
             mock_response = MagicMock()
@@ -101,14 +104,14 @@ class TestAgentClientExtended:
             mock_message.message_type = "assistant_message"
             mock_message.content = "Test response"
             mock_response.messages = [mock_message]
-            mock_client.agents.messages.create.return_value = mock_response
+            mock_client.aio.agents.messages.create.return_value = mock_response
 
             agent = AgentClient()
             message = "Test message"
 
             result = await agent.process_message(message)
             assert result == "Test response"
-            call = mock_client.agents.messages.create.call_args
+            call = mock_client.aio.agents.messages.create.call_args
             assert call[0][0] == "test-agent"
             msgs = call[1]["messages"]
             assert len(msgs) == 1
@@ -209,6 +212,7 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
             # Create sync iterator for stream (create_stream returns sync generator)
@@ -221,14 +225,14 @@ class TestAgentClientExtended:
                 mock_event.messages = None
                 yield mock_event
 
-            mock_client.agents.messages.create.return_value = mock_stream_generator()
+            mock_client.aio.agents.messages.create.return_value = mock_stream_generator()
 
             mock_messages_response = MagicMock()
             mock_assistant_msg = MagicMock()
             mock_assistant_msg.message_type = "assistant_message"
             mock_assistant_msg.content = "Final response"
             mock_messages_response.data = [mock_assistant_msg]
-            mock_client.conversations.messages.list.return_value = (
+            mock_client.aio.conversations.messages.list.return_value = (
                 mock_messages_response
             )
 
@@ -236,8 +240,8 @@ class TestAgentClientExtended:
             result = await agent.process_message_async("Test message")
 
             assert result == "Final response"
-            mock_client.agents.messages.create.assert_called_once()
-            call = mock_client.agents.messages.create.call_args
+            mock_client.aio.agents.messages.create.assert_called_once()
+            call = mock_client.aio.agents.messages.create.call_args
             assert call[0][0] == "test-agent"
             assert call[1].get("include_pings") is True
             msgs = call[1]["messages"]
@@ -249,7 +253,7 @@ class TestAgentClientExtended:
             )
             assert content == "Test message"
             # SDK 1.x: list(conversation_id, *, order=..., limit=...)
-            mock_client.conversations.messages.list.assert_called_once_with(
+            mock_client.aio.conversations.messages.list.assert_called_once_with(
                 "conv-123", order="desc", limit=10
             )
 
@@ -269,6 +273,7 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
             def mock_stream_generator():
@@ -285,7 +290,7 @@ class TestAgentClientExtended:
                 mock_event.message_id = None
                 yield mock_event
 
-            mock_client.agents.messages.create.return_value = mock_stream_generator()
+            mock_client.aio.agents.messages.create.return_value = mock_stream_generator()
 
             agent = AgentClient()
             result = await agent.process_message_async("Test message")
@@ -306,15 +311,16 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
-            # Mock stream that never closes (simulating timeout)
-            def slow_stream():
+            # Async stream that never closes (simulating timeout)
+            async def slow_stream():
                 while True:
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                     yield MagicMock()
 
-            mock_client.agents.messages.create.return_value = slow_stream()
+            mock_client.aio.agents.messages.create.return_value = slow_stream()
 
             # Mock fallback method
             with patch.object(
@@ -342,14 +348,15 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
-            def slow_stream():
+            async def slow_stream():
                 while True:
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                     yield MagicMock()
 
-            mock_client.agents.messages.create.return_value = slow_stream()
+            mock_client.aio.agents.messages.create.return_value = slow_stream()
 
             with patch.object(
                 AgentClient, "_fallback_to_async", new_callable=AsyncMock
@@ -372,12 +379,13 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
             # Mock create_async to return run with conversation_id
             mock_run = MagicMock()
             mock_run.conversation_id = "conv-456"
-            mock_client.agents.messages.create_async.return_value = mock_run
+            mock_client.aio.agents.messages.create_async.return_value = mock_run
 
             # Mock conversations.messages.list to eventually return message
             mock_messages_response = MagicMock()
@@ -385,7 +393,7 @@ class TestAgentClientExtended:
             mock_assistant_msg.message_type = "assistant_message"
             mock_assistant_msg.content = "Polled response"
             mock_messages_response.data = [mock_assistant_msg]
-            mock_client.conversations.messages.list.return_value = (
+            mock_client.aio.conversations.messages.list.return_value = (
                 mock_messages_response
             )
 
@@ -393,7 +401,7 @@ class TestAgentClientExtended:
             result = await agent._fallback_to_async("Test message")
 
             assert result == "Polled response"
-            call = mock_client.agents.messages.create_async.call_args
+            call = mock_client.aio.agents.messages.create_async.call_args
             assert call[0][0] == "test-agent"
             msgs = call[1]["messages"]
             assert len(msgs) == 1
@@ -420,6 +428,7 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
             def mock_stream_generator():
@@ -433,7 +442,7 @@ class TestAgentClientExtended:
                 mock_event.messages = None
                 yield mock_event
 
-            mock_client.agents.messages.create.return_value = mock_stream_generator()
+            mock_client.aio.agents.messages.create.return_value = mock_stream_generator()
 
             # Mock conversations.messages.list
             mock_messages_response = MagicMock()
@@ -441,7 +450,7 @@ class TestAgentClientExtended:
             mock_assistant_msg.message_type = "assistant"
             mock_assistant_msg.text = "Response from run"
             mock_messages_response.data = [mock_assistant_msg]
-            mock_client.conversations.messages.list.return_value = (
+            mock_client.aio.conversations.messages.list.return_value = (
                 mock_messages_response
             )
 
@@ -450,7 +459,7 @@ class TestAgentClientExtended:
 
             assert result == "Response from run"
             # SDK 1.x: list(conversation_id, *, order=..., limit=...)
-            mock_client.conversations.messages.list.assert_called_once_with(
+            mock_client.aio.conversations.messages.list.assert_called_once_with(
                 "conv-from-run", order="desc", limit=10
             )
 
@@ -470,6 +479,7 @@ class TestAgentClientExtended:
 
         with patch("runtime.core.agent.get_letta_client") as mock_get_client:
             mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
             mock_get_client.return_value = mock_client
 
             def mock_stream_generator():
@@ -482,7 +492,7 @@ class TestAgentClientExtended:
                 yield mock_event
                 raise Exception("Stream error")
 
-            mock_client.agents.messages.create.return_value = mock_stream_generator()
+            mock_client.aio.agents.messages.create.return_value = mock_stream_generator()
 
             # Mock conversations.messages.list
             mock_messages_response = MagicMock()
@@ -490,7 +500,7 @@ class TestAgentClientExtended:
             mock_assistant_msg.message_type = "assistant_message"
             mock_assistant_msg.content = "Recovered response"
             mock_messages_response.data = [mock_assistant_msg]
-            mock_client.conversations.messages.list.return_value = (
+            mock_client.aio.conversations.messages.list.return_value = (
                 mock_messages_response
             )
 
@@ -498,3 +508,221 @@ class TestAgentClientExtended:
             result = await agent.process_message_async("Test message")
 
             assert result == "Recovered response"
+
+    @staticmethod
+    def _event(message_type, content=None, event_id=None):
+        """Stream event stub with only the attributes Letta sends."""
+        return SimpleNamespace(message_type=message_type, content=content, id=event_id)
+
+    @patch("runtime.core.agent.get_env_var")
+    @pytest.mark.asyncio
+    async def test_agent_client_process_message_async_returns_at_stop_reason(
+        self, mock_get_env_var
+    ):
+        """The final message is returned at stop_reason, before the stream closes."""
+        mock_get_env_var.side_effect = (
+            lambda key, default=None, required=False, cast_type=None: {
+                "DEBUG_MODE": False,
+                "AGENT_ID": "test-agent",
+                "LONG_TASK_MAX_WAIT": "600",
+            }.get(key, default)
+        )
+        closed = asyncio.Event()
+
+        async def stream():
+            try:
+                yield self._event("ping")
+                yield self._event("reasoning_message", "thinking")
+                yield self._event("assistant_message", "Final answer", "msg-1")
+                yield self._event("stop_reason")
+                await asyncio.sleep(3600)  # trailing events never needed
+            finally:
+                closed.set()
+
+        with patch("runtime.core.agent.get_letta_client") as mock_get_client:
+            mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
+            mock_get_client.return_value = mock_client
+            mock_client.aio.agents.messages.create.return_value = stream()
+
+            agent = AgentClient()
+            result = await asyncio.wait_for(
+                agent.process_message_async("Test message"), timeout=5
+            )
+
+        assert result == "Final answer"
+        assert closed.is_set()
+        mock_client.aio.conversations.messages.list.assert_not_called()
+
+    @patch("runtime.core.agent.get_env_var")
+    @pytest.mark.asyncio
+    async def test_agent_client_process_message_async_reports_partial_text(
+        self, mock_get_env_var
+    ):
+        """on_partial gets the growing assistant text from token chunks."""
+        mock_get_env_var.side_effect = (
+            lambda key, default=None, required=False, cast_type=None: {
+                "DEBUG_MODE": False,
+                "AGENT_ID": "test-agent",
+                "LONG_TASK_MAX_WAIT": "600",
+            }.get(key, default)
+        )
+
+        async def stream():
+            yield self._event("reasoning_message", "hmm", "r-1")
+            yield self._event("assistant_message", "Hel", "msg-1")
+            yield self._event("ping")
+            yield self._event("assistant_message", "lo!", "msg-1")
+            yield self._event("stop_reason")
+
+        partials = []
+
+        async def on_partial(text):
+            partials.append(text)
+
+        with patch("runtime.core.agent.get_letta_client") as mock_get_client:
+            mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
+            mock_get_client.return_value = mock_client
+            mock_client.aio.agents.messages.create.return_value = stream()
+
+            agent = AgentClient()
+            result = await agent.process_message_async(
+                "Hi", "ident-1", on_partial=on_partial
+            )
+
+        assert partials == ["Hel", "Hello!"]
+        assert result == "Hello!"
+        call = mock_client.aio.agents.messages.create.call_args
+        assert call.kwargs["stream_tokens"] is True
+        assert call.kwargs["messages"][0]["sender_id"] == "ident-1"
+
+    @patch("runtime.core.agent.get_env_var")
+    @pytest.mark.asyncio
+    async def test_agent_client_process_message_async_partial_errors_are_ignored(
+        self, mock_get_env_var
+    ):
+        """A failing on_partial callback does not fail the turn."""
+        mock_get_env_var.side_effect = (
+            lambda key, default=None, required=False, cast_type=None: {
+                "DEBUG_MODE": False,
+                "AGENT_ID": "test-agent",
+                "LONG_TASK_MAX_WAIT": "600",
+            }.get(key, default)
+        )
+
+        async def stream():
+            yield self._event("assistant_message", "Done", "msg-1")
+            yield self._event("stop_reason")
+
+        with patch("runtime.core.agent.get_letta_client") as mock_get_client:
+            mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
+            mock_get_client.return_value = mock_client
+            mock_client.aio.agents.messages.create.return_value = stream()
+
+            agent = AgentClient()
+            result = await agent.process_message_async(
+                "Hi", on_partial=AsyncMock(side_effect=RuntimeError("render"))
+            )
+
+        assert result == "Done"
+        mock_client.aio.agents.messages.create.assert_awaited_once()
+
+    @staticmethod
+    def _fallback_env(key, default=None, required=False, cast_type=None):
+        return {"DEBUG_MODE": False, "AGENT_ID": "test-agent"}.get(key, default)
+
+    @pytest.mark.asyncio
+    async def test_fallback_checks_run_status_before_listing(self):
+        """Fallback backs off exponentially and lists messages once the run is done."""
+        with (
+            patch("runtime.core.agent.get_env_var", side_effect=self._fallback_env),
+            patch("runtime.core.agent.get_letta_client") as mock_get_client,
+            patch("runtime.core.agent.asyncio.sleep", new_callable=AsyncMock) as sleep,
+        ):
+            mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
+            mock_get_client.return_value = mock_client
+            mock_client.aio.agents.messages.create_async.return_value = SimpleNamespace(
+                id="run-1", status="created", conversation_id="conv-1"
+            )
+            mock_client.aio.runs.retrieve.side_effect = [
+                SimpleNamespace(status="running", conversation_id="conv-1"),
+                SimpleNamespace(status="running", conversation_id="conv-1"),
+                SimpleNamespace(status="completed", conversation_id="conv-1"),
+            ]
+            mock_client.aio.conversations.messages.list.return_value = (
+                SimpleNamespace(
+                    items=[
+                        self._event("assistant_message", "Done", "msg-2"),
+                        self._event("user_message", "Hi", "msg-1"),
+                    ]
+                )
+            )
+
+            agent = AgentClient()
+            result = await agent._fallback_to_async("Hi")
+
+        assert result == "Done"
+        assert [c.args[0] for c in sleep.await_args_list] == [0.25, 0.5, 1.0]
+        mock_client.aio.conversations.messages.list.assert_awaited_once_with(
+            "conv-1", order="desc", limit=10
+        )
+        assert agent.poll_metrics.turns == 1
+        assert agent.poll_metrics.last_turn_polls == 3
+        assert agent.poll_metrics.run_checks == 3
+        assert agent.poll_metrics.message_lists == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_pages_forward_by_cursor(self):
+        """After the first page, only messages after the newest seen are listed."""
+        with (
+            patch("runtime.core.agent.get_env_var", side_effect=self._fallback_env),
+            patch("runtime.core.agent.get_letta_client") as mock_get_client,
+            patch("runtime.core.agent.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
+            mock_get_client.return_value = mock_client
+            mock_client.aio.agents.messages.create_async.return_value = SimpleNamespace(
+                id=None, conversation_id="conv-1"
+            )
+            mock_client.aio.conversations.messages.list.side_effect = [
+                SimpleNamespace(items=[self._event("user_message", "Hi", "msg-1")]),
+                SimpleNamespace(items=[]),
+                SimpleNamespace(
+                    items=[self._event("assistant_message", "Later", "msg-2")]
+                ),
+            ]
+
+            agent = AgentClient()
+            result = await agent._fallback_to_async("Hi")
+
+        assert result == "Later"
+        calls = mock_client.aio.conversations.messages.list.await_args_list
+        assert calls[1].kwargs == {"after": "msg-1", "order": "asc", "limit": 50}
+        assert calls[2].kwargs["after"] == "msg-1"
+
+    @pytest.mark.asyncio
+    async def test_fallback_failed_run_returns_none_without_listing(self):
+        """A failed run ends the fallback without listing conversation messages."""
+        with (
+            patch("runtime.core.agent.get_env_var", side_effect=self._fallback_env),
+            patch("runtime.core.agent.get_letta_client") as mock_get_client,
+            patch("runtime.core.agent.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            mock_client = MagicMock()
+            mock_client.aio = AsyncMock()
+            mock_get_client.return_value = mock_client
+            mock_client.aio.agents.messages.create_async.return_value = SimpleNamespace(
+                id="run-1", conversation_id="conv-1"
+            )
+            mock_client.aio.runs.retrieve.return_value = SimpleNamespace(
+                status="failed", conversation_id="conv-1"
+            )
+
+            agent = AgentClient()
+            assert await agent._fallback_to_async("Hi") is None
+
+        mock_client.aio.conversations.messages.list.assert_not_called()
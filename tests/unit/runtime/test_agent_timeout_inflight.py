@@ -6,7 +6,7 @@ Complements ``test_queue_timeout_inflight.py`` (queue-side) for production safet
 
 from __future__ import annotations
 
-import time
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -15,9 +15,9 @@ from common.exceptions import AgentTurnTimeoutInFlight
 from runtime.core.agent import AgentClient
 
 
-def _slow_stream():
+async def _slow_stream():
     while True:
-        time.sleep(2)
+        await asyncio.sleep(2)
         yield MagicMock()
 
 
@@ -58,8 +58,9 @@ class TestProcessMessageAsyncStreamTimeoutAndFallback:
         with patch("runtime.core.agent.get_env_var", side_effect=self._env(True)):
             with patch("runtime.core.agent.get_letta_client") as mock_get_client:
                 mock_client = MagicMock()
+                mock_client.aio = AsyncMock()
                 mock_get_client.return_value = mock_client
-                mock_client.agents.messages.create.return_value = _slow_stream()
+                mock_client.aio.agents.messages.create.return_value = _slow_stream()
 
                 with patch.object(
                     AgentClient, "_fallback_to_async", new_callable=AsyncMock
@@ -77,8 +78,9 @@ class TestProcessMessageAsyncStreamTimeoutAndFallback:
         with patch("runtime.core.agent.get_env_var", side_effect=self._env(True)):
             with patch("runtime.core.agent.get_letta_client") as mock_get_client:
                 mock_client = MagicMock()
+                mock_client.aio = AsyncMock()
                 mock_get_client.return_value = mock_client
-                mock_client.agents.messages.create.return_value = _slow_stream()
+                mock_client.aio.agents.messages.create.return_value = _slow_stream()
 
                 with patch.object(
                     AgentClient, "_fallback_to_async", new_callable=AsyncMock
@@ -123,8 +125,9 @@ class TestProcessMessageAsyncNonTimeoutErrorsStillReturnNone:
             }.get(key, default)
             with patch("runtime.core.agent.get_letta_client") as mock_get_client:
                 mock_client = MagicMock()
+                mock_client.aio = AsyncMock()
                 mock_get_client.return_value = mock_client
-                mock_client.agents.messages.create.return_value = broken_stream()
+                mock_client.aio.agents.messages.create.return_value = broken_stream()
 
                 with patch.object(
                     AgentClient, "_fallback_to_async", new_callable=AsyncMock
@@ -159,8 +162,9 @@ class TestProcessMessageAsyncNoTimeoutPathUnchanged:
         ):
             with patch("runtime.core.agent.get_letta_client") as mock_get_client:
                 mock_client = MagicMock()
+                mock_client.aio = AsyncMock()
                 mock_get_client.return_value = mock_client
-                mock_client.agents.messages.create.return_value = stream_one_assistant()
+                mock_client.aio.agents.messages.create.return_value = stream_one_assistant()
 
                 agent = AgentClient()
                 with patch.object(
@@ -0,0 +1,178 @@
+"""Unit tests for core block attachment tracking."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from runtime.core.blocks import CoreBlockAttachments
+
+
+def _tracker(idle_timeout: float = 30.0) -> tuple[CoreBlockAttachments, MagicMock]:
+    client = MagicMock()
+    client.aio = AsyncMock()
+    return CoreBlockAttachments(client, "agent-1", idle_timeout), client
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_consecutive_turns_reuse_attached_block():
+    """The same user's follow-up turns skip the attach/detach pair."""
+    blocks, client = _tracker()
+
+    for _ in range(3):
+        await blocks.acquire("block-a")
+        await blocks.release("block-a")
+
+    client.aio.agents.blocks.attach.assert_awaited_once_with("block-a", agent_id="agent-1")
+    client.aio.agents.blocks.detach.assert_not_called()
+    assert blocks.is_attached("block-a")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_other_users_turn_detaches_idle_block():
+    """A different user's turn detaches the previous user's idle block first."""
+    blocks, client = _tracker()
+
+    await blocks.acquire("block-a")
+    await blocks.release("block-a")
+    await blocks.acquire("block-b")
+
+    client.aio.agents.blocks.detach.assert_awaited_once_with("block-a", agent_id="agent-1")
+    assert not blocks.is_attached("block-a")
+    assert blocks.is_attached("block-b")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_acquire_waits_while_other_users_block_is_in_use():
+    """Another user's turn waits until the running turn releases its block."""
+    blocks, client = _tracker()
+    await blocks.acquire("block-a")
+
+    waiting = asyncio.create_task(blocks.acquire("block-b"))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+    client.aio.agents.blocks.attach.assert_awaited_once_with("block-a", agent_id="agent-1")
+    client.aio.agents.blocks.detach.assert_not_called()
+
+    # The same user's concurrent turn shares the attached block
+    await asyncio.wait_for(blocks.acquire("block-a"), timeout=1.0)
+    await blocks.release("block-a")
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    await blocks.release("block-a")
+    await asyncio.wait_for(waiting, timeout=1.0)
+    client.aio.agents.blocks.detach.assert_awaited_once_with("block-a", agent_id="agent-1")
+    assert not blocks.is_attached("block-a")
+    assert blocks.is_attached("block-b")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_sweep_detaches_after_idle_timeout():
+    """Blocks idle past idle_timeout are detached; fresher ones stay."""
+    blocks, client = _tracker(idle_timeout=30.0)
+
+    with patch("runtime.core.blocks.time.monotonic", return_value=100.0):
+        await blocks.acquire("block-a")
+        await blocks.release("block-a")
+
+    with patch("runtime.core.blocks.time.monotonic", return_value=110.0):
+        assert await blocks.sweep() == 0
+    with patch("runtime.core.blocks.time.monotonic", return_value=131.0):
+        assert await blocks.sweep() == 1
+
+    client.aio.agents.blocks.detach.assert_awaited_once_with("block-a", agent_id="agent-1")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_release_with_detach_and_zero_timeout_detach_immediately():
+    """Errors (detach=True) and idle_timeout=0 keep the old per-turn detach."""
+    blocks, client = _tracker(idle_timeout=0)
+    await blocks.acquire("block-a")
+    await blocks.release("block-a")
+    assert client.aio.agents.blocks.detach.call_count == 1
+
+    blocks, client = _tracker()
+    await blocks.acquire("block-a")
+    await blocks.release("block-a", detach=True)
+    assert client.aio.agents.blocks.detach.call_count == 1
+    assert not blocks.is_attached("block-a")
+
+
+def _listing(*block_ids: str) -> MagicMock:
+    """Stand-in for an SDK list call: async-iterates blocks with these IDs."""
+
+    async def pages():
+        for block_id in block_ids:
+            yield MagicMock(id=block_id)
+
+    return MagicMock(side_effect=lambda *args, **kwargs: pages())
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_attach_tolerates_already_attached_error():
+    """A duplicate-attach error counts as attached if the agent lists the block."""
+    blocks, client = _tracker()
+    client.aio.agents.blocks.attach.side_effect = RuntimeError("409 already exists")
+    client.aio.agents.blocks.list = _listing("persona", "block-a")
+
+    await blocks.acquire("block-a")
+
+    assert blocks.is_attached("block-a")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_attach_conflict_with_other_block_fails():
+    """A unique-label conflict with another user's block is not success."""
+    blocks, client = _tracker()
+    client.aio.agents.blocks.attach.side_effect = RuntimeError(
+        "409 unique constraint unique_agent_block_label"
+    )
+    client.aio.agents.blocks.list = _listing("persona", "block-other")
+
+    with pytest.raises(RuntimeError):
+        await blocks.acquire("block-a")
+
+    assert not blocks.is_attached("block-a")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconcile_detaches_leaked_and_finds_missing_blocks():
+    """Untracked user blocks on the agent are detached; deleted ones reported."""
+    blocks, client = _tracker()
+    await blocks.acquire("block-a")
+    await blocks.release("block-a")
+
+    # On the agent: its persona, a tracked block, a block leaked by a crashed
+    # turn and one whose user has a turn in flight elsewhere
+    client.aio.agents.blocks.list = _listing("persona", "block-a", "leak", "busy")
+    client.aio.blocks.list = _listing("block-b")
+    not_found = Exception("not found")
+    not_found.status_code = 404
+    client.aio.blocks.retrieve = AsyncMock(side_effect=not_found)
+    client.aio.agents.blocks.detach.reset_mock()
+
+    result = await blocks.reconcile(
+        {"block-a", "block-b", "leak", "busy", "deleted"}, busy_blocks={"busy"}
+    )
+
+    client.aio.agents.blocks.detach.assert_awaited_once_with("leak", agent_id="agent-1")
+    assert result.leaked == ["leak"]
+    assert result.missing == ["deleted"]
+    client.aio.blocks.retrieve.assert_awaited_once_with("deleted")
+    assert blocks.is_attached("block-a")
+    assert blocks.last_reconcile is result
+
+    # The cache forgets a tracked block that is no longer on the agent
+    client.aio.agents.blocks.list = _listing("persona")
+    client.aio.blocks.list = _listing("block-a")
+    await blocks.reconcile({"block-a"})
+    assert not blocks.is_attached("block-a")
@@ -0,0 +1,130 @@
+"""Unit tests for the outbox delivery workers."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from database.operations.messages import insert_message
+from database.operations.outbox import enqueue_outbox
+from database.pool import get_pool
+from runtime.core.delivery import OutboxDelivery
+
+
+async def _seed_response(response: str = "hello") -> int:
+    """Insert a user, profile and message with a pending response."""
+    async with get_pool().write_connection() as db:
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, 'x')")
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        await db.commit()
+    message_id = await insert_message(1, 1, "user", "hi")
+    await enqueue_outbox(1, message_id, "telegram", response)
+    return message_id
+
+
+def _plugin_manager(handler: AsyncMock) -> MagicMock:
+    manager = MagicMock()
+    manager.get_platforms.return_value = ["telegram"]
+    manager.get_platform_handler.return_value = handler
+    return manager
+
+
+async def _outbox_row() -> tuple:
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT status, attempts, last_error FROM outbox"
+        ) as cursor:
+            return tuple(await cursor.fetchone())
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_send_is_retried_until_delivered(temp_db):
+    """A platform error is retried with the worker's own policy."""
+    message_id = await _seed_response()
+    handler = AsyncMock(side_effect=[ConnectionError("rate limited"), None])
+    delivery = OutboxDelivery(_plugin_manager(handler), base_delay=0)
+
+    assert await delivery.deliver_next("telegram")
+    assert await _outbox_row() == ("pending", 1, "rate limited")
+    assert await delivery.deliver_next("telegram")
+    assert not await delivery.deliver_next("telegram")
+
+    assert await _outbox_row() == ("delivered", 1, "rate limited")
+    response, profile, reply_to = handler.await_args.args
+    assert (response, profile.platform_user_id, reply_to) == (
+        "hello",
+        "42",
+        message_id,
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_send_gives_up_after_max_attempts(temp_db):
+    """A response that keeps failing is marked failed, not retried forever."""
+    await _seed_response()
+    handler = AsyncMock(side_effect=ConnectionError("down"))
+    delivery = OutboxDelivery(_plugin_manager(handler), max_attempts=2, base_delay=0)
+
+    while await delivery.deliver_next("telegram"):
+        pass
+
+    assert handler.await_count == 2
+    assert await _outbox_row() == ("failed", 2, "down")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_workers_deliver_enqueued_responses(temp_db):
+    """Started workers are woken by an enqueue and stop cleanly."""
+    sent = asyncio.Event()
+    handler = AsyncMock(side_effect=lambda *_: sent.set())
+    delivery = OutboxDelivery(_plugin_manager(handler), idle_poll_interval=60)
+
+    await delivery.start()
+    try:
+        await _seed_response()
+        await asyncio.wait_for(sent.wait(), timeout=5)
+    finally:
+        await delivery.stop()
+
+    handler.assert_awaited_once()
+    assert not delivery.is_running
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_timed_out_send_is_not_reclaimed_and_sent_again(temp_db):
+    """A send that times out is recorded as failed before its lease expires."""
+    from database.operations.outbox import claim_outbox, reclaim_expired_outbox
+
+    await _seed_response()
+
+    async def hang(*_):
+        await asyncio.sleep(3600)
+
+    handler = AsyncMock(side_effect=hang)
+    delivery = OutboxDelivery(
+        _plugin_manager(handler), lease_seconds=1.0, send_timeout=60, base_delay=60
+    )
+    assert delivery.send_timeout < delivery.lease_seconds
+
+    send = asyncio.create_task(delivery.deliver_next("telegram"))
+    reclaimed = 0
+    stolen = []
+    while not send.done():
+        # A concurrent sweeper and a second worker
+        reclaimed += await reclaim_expired_outbox()
+        item = await claim_outbox("telegram", "worker-2", lease_seconds=1.0)
+        if item is not None:
+            stolen.append(item)
+        await asyncio.sleep(0.02)
+
+    assert await send
+    assert (reclaimed, stolen) == (0, [])
+    handler.assert_awaited_once()
+    assert await _outbox_row() == ("pending", 1, "TimeoutError")
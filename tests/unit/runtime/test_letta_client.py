@@ -1,6 +1,6 @@
 """Unit tests for runtime core letta_client functionality."""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -115,3 +115,44 @@ def test_letta_client_close():
         client = LettaClient()
         # Should not raise an exception
         client.close()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_letta_client_shares_async_http_pool(monkeypatch):
+    """aio and create_identity reuse one keep-alive httpx.AsyncClient."""
+    monkeypatch.setenv("AGENT_ENDPOINT", "http://test.endpoint")
+    monkeypatch.setenv("AGENT_API_KEY", "test-api-key")
+    monkeypatch.setenv("LETTA_HTTP_MAX_CONNECTIONS", "7")
+
+    with patch("runtime.core.letta_client.Letta"):
+        client = LettaClient()
+
+    assert client.http_limits.max_connections == 7
+    aio = client.aio
+    assert client.aio is aio
+    http_client = client.http_client
+    assert aio._client is http_client
+
+    response = MagicMock()
+    response.json.return_value = {"id": "identity-1"}
+    with patch.object(
+        http_client, "post", new_callable=AsyncMock, return_value=response
+    ) as mock_post:
+        identity = await client.create_identity(identifier_key="k", name="n")
+    assert identity.id == "identity-1"
+    assert mock_post.await_args.args[0] == "http://test.endpoint/v1/identities/"
+    with patch.object(
+        http_client, "patch", new_callable=AsyncMock, return_value=response
+    ) as mock_patch:
+        await client.update_identity("identity-1", name="Amy")
+    assert mock_patch.await_args.args[0] == (
+        "http://test.endpoint/v1/identities/identity-1"
+    )
+    assert mock_patch.await_args.kwargs["json"] == {"name": "Amy"}
+
+    await client.aclose()
+    assert http_client.is_closed
+    # A closed pool is recreated on next use
+    assert client.http_client is not http_client
+    await client.aclose()
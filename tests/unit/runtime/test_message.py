@@ -51,6 +51,20 @@ async def test_message_formatter_format_response():
     assert "Response text" in formatted
 
 
+@pytest.mark.unit
+def test_merge_messages():
+    """Merged messages keep their order, one per line, with UTC timestamps."""
+    from datetime import UTC, datetime
+
+    merged = MessageFormatter.merge_messages(
+        [
+            ("hi", datetime(2024, 1, 1, 12, 0, 5, tzinfo=UTC)),
+            ("one more thing", None),
+        ]
+    )
+    assert merged == "[2024-01-01 12:00:05 UTC] hi\none more thing"
+
+
 @pytest.mark.unit
 @pytest.mark.asyncio
 async def test_message_handler_abstract():
@@ -1,6 +1,8 @@
 """Unit tests for runtime core queue functionality."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -213,3 +215,363 @@ def test_queue_processor_properties():
         assert hasattr(processor, "_stop_event")
         assert hasattr(processor, "letta_client")
         assert hasattr(processor, "agent_id")
+
+
+@pytest.mark.unit
+def test_queue_processor_max_concurrent_defaults_to_config():
+    """max_concurrent falls back to the queue_processor config default."""
+    from common.config import QueueProcessorConfig
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(MagicMock())
+        assert processor.max_concurrent == QueueProcessorConfig().max_concurrent
+
+        processor = QueueProcessor(MagicMock(), max_concurrent=5)
+        assert processor.max_concurrent == 5
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_queue_processor_runs_users_in_parallel_lanes():
+    """Different users run concurrently; a user's own items never overlap."""
+    items = [
+        SimpleNamespace(id=1, letta_user_id=10, message_id=1, attempts=0),
+        SimpleNamespace(id=2, letta_user_id=20, message_id=2, attempts=0),
+        SimpleNamespace(id=3, letta_user_id=10, message_id=3, attempts=0),
+    ]
+    excluded_calls: list[set[int]] = []
+
+    async def fake_dequeue_batch(limit, exclude_user_ids=None, **lease):
+        excluded = set(exclude_user_ids or ())
+        excluded_calls.append(excluded)
+        claimed = []
+        for item in list(items):
+            if len(claimed) < limit and item.letta_user_id not in excluded:
+                items.remove(item)
+                excluded.add(item.letta_user_id)
+                claimed.append(item)
+        return claimed
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(MagicMock(), max_concurrent=3)
+
+    running: set[int] = set()
+    max_parallel = 0
+    started = asyncio.Event()
+
+    async def fake_process(queue_item):
+        nonlocal max_parallel
+        assert queue_item.letta_user_id not in running
+        running.add(queue_item.letta_user_id)
+        max_parallel = max(max_parallel, len(running))
+        if len(running) == 2:
+            started.set()
+        await started.wait()
+        running.discard(queue_item.letta_user_id)
+
+    processor._process_single_message = fake_process  # type: ignore[method-assign]
+
+    with (
+        patch(
+            "runtime.core.queue.atomic_dequeue_batch", side_effect=fake_dequeue_batch
+        ),
+        patch(
+            "runtime.core.queue.requeue_stale_processing_items",
+            new_callable=AsyncMock,
+        ),
+        patch("runtime.core.queue.next_retry_delay", new_callable=AsyncMock),
+        patch.object(processor, "reconcile_blocks", new_callable=AsyncMock),
+    ):
+        task = asyncio.create_task(processor.start())
+        for _ in range(100):
+            if not items and not processor._processing_tasks:
+                break
+            await asyncio.sleep(0.01)
+        await processor.stop()
+        await asyncio.wait_for(task, timeout=5.0)
+
+    assert not items
+    assert max_parallel == 2
+    assert {10} in excluded_calls
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_queue_processor_heartbeat_renews_in_flight_leases():
+    """The lease loop renews in-flight claims and sweeps expired ones."""
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(
+            MagicMock(), lease_seconds=10, heartbeat_interval=0.01
+        )
+    processor.processing_messages.update({5, 6})
+
+    with (
+        patch("runtime.core.queue.renew_leases", new_callable=AsyncMock) as renew,
+        patch(
+            "runtime.core.queue.reclaim_expired_leases", new_callable=AsyncMock
+        ) as reclaim,
+    ):
+        renew.return_value = 2
+        task = asyncio.create_task(processor._maintain_leases())
+        await asyncio.sleep(0.05)
+        processor._stop_event.set()
+        await asyncio.wait_for(task, timeout=1.0)
+
+    renew.assert_awaited_with(processor.lease_owner, {5, 6}, 10.0)
+    assert reclaim.await_count >= 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_queue_processor_coalesces_a_users_pending_messages(temp_db):
+    """A burst from one user becomes one turn whose response every row gets."""
+    from database.operations.messages import insert_message
+    from database.operations.queue import add_to_queue, atomic_dequeue_batch
+    from database.pool import get_pool
+
+    async with get_pool().write_connection() as db:
+        await db.execute("INSERT INTO letta_users (id, created_at) VALUES (1, 'x')")
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id, username) VALUES (1, 1, 'telegram', '42', 'amy')"
+        )
+        await db.commit()
+    for text in ("hi", "one more thing", "also..."):
+        await add_to_queue(1, await insert_message(1, 1, "user", text))
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(MagicMock(), coalesce_messages=True)
+    (head,) = await atomic_dequeue_batch(1)
+    await processor._process_single_message(head)
+
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT DISTINCT status FROM queue") as cursor:
+            assert [row[0] for row in await cursor.fetchall()] == ["completed"]
+        async with db.execute(
+            "SELECT DISTINCT agent_response FROM messages"
+        ) as cursor:
+            (response,) = [row[0] for row in await cursor.fetchall()]
+    assert response.startswith("[Username: @amy, Telegram ID: 42] [")
+    assert [line.split("] ")[-1] for line in response.split("\n")] == [
+        "hi",
+        "one more thing",
+        "also...",
+    ]
+    assert not processor.processing_messages
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconcile_reprovisions_users_with_deleted_blocks(temp_db):
+    """A user whose block is gone in Letta waits for a new one, not a failed turn."""
+    from database.operations.provisioning import schedule_provisioning
+    from database.pool import get_pool
+
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "INSERT INTO letta_users (id, created_at, letta_identity_id, "
+            "letta_block_id) VALUES (1, 'x', 'identity-1', 'block-1')"
+        )
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id, username) VALUES (1, 1, 'telegram', '42', 'amy')"
+        )
+        await db.commit()
+
+    async def no_blocks(*args, **kwargs):
+        return
+        yield
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(MagicMock())
+    aio = processor.letta_client.aio
+    aio.agents.blocks.list = MagicMock(side_effect=no_blocks)
+    aio.blocks.list = MagicMock(side_effect=no_blocks)
+    not_found = Exception("not found")
+    not_found.status_code = 404
+    aio.blocks.retrieve = AsyncMock(side_effect=not_found)
+
+    letta = MagicMock()
+    letta.aio.blocks.create = AsyncMock(return_value=MagicMock(id="block-2"))
+    with patch(
+        "database.operations.provisioning.get_letta_client", return_value=letta
+    ):
+        result = await processor.reconcile_blocks()
+        assert result.missing == ["block-1"]
+        assert await schedule_provisioning("telegram", "42", 1)
+
+    letta.create_identity.assert_not_called()
+    async with get_pool().connection() as db:
+        async with db.execute(
+            "SELECT letta_identity_id, letta_block_id, provision_status "
+            "FROM letta_users"
+        ) as cursor:
+            assert tuple(await cursor.fetchone()) == ("identity-1", "block-2", "ready")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_users_each_turn_sees_only_their_block(temp_db):
+    """Two users' turns never share the agent's "human" block slot."""
+    from database.operations.messages import insert_message
+    from database.operations.queue import add_to_queue, atomic_dequeue_batch
+    from database.pool import get_pool
+
+    async with get_pool().write_connection() as db:
+        for uid in (1, 2):
+            await db.execute(
+                "INSERT INTO letta_users (id, created_at, letta_identity_id, "
+                "letta_block_id) VALUES (?, 'x', ?, ?)",
+                (uid, f"identity-{uid}", f"block-{uid}"),
+            )
+            await db.execute(
+                "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+                "platform_user_id) VALUES (?, ?, 'telegram', ?)",
+                (uid, uid, str(uid)),
+            )
+        await db.commit()
+    for uid in (1, 2):
+        await add_to_queue(uid, await insert_message(uid, uid, "user", "hi"))
+
+    # The agent holds one "human" block; Letta rejects a second one
+    on_agent: set[str] = set()
+
+    async def attach(block_id, agent_id):
+        if on_agent:
+            raise RuntimeError("409 unique constraint unique_agent_block_label")
+        on_agent.add(block_id)
+
+    async def detach(block_id, agent_id):
+        on_agent.discard(block_id)
+
+    async def agent_blocks(*args, **kwargs):
+        for block_id in sorted(on_agent):
+            yield MagicMock(id=block_id)
+
+    seen: dict[str, set[str]] = {}
+
+    async def run_turn(message, sender_id=None):
+        await asyncio.sleep(0.01)
+        seen[sender_id] = set(on_agent)
+        return "ok"
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(run_turn, message_mode="live", max_concurrent=2)
+    aio = processor.letta_client.aio
+    aio.agents.blocks.attach = AsyncMock(side_effect=attach)
+    aio.agents.blocks.detach = AsyncMock(side_effect=detach)
+    aio.agents.blocks.list = MagicMock(side_effect=agent_blocks)
+
+    items = await atomic_dequeue_batch(2)
+    with patch.object(processor, "_route_response", AsyncMock(return_value=True)):
+        await asyncio.gather(
+            *(processor._process_single_message(item) for item in items)
+        )
+
+    assert seen == {"identity-1": {"block-1"}, "identity-2": {"block-2"}}
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT DISTINCT status FROM queue") as cursor:
+            assert [row[0] for row in await cursor.fetchall()] == ["completed"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconcile_keeps_block_warm_in_another_process(temp_db):
+    """A block another consumer used within block_idle_timeout is not a leak."""
+    from database.operations.messages import insert_message
+    from database.operations.queue import add_to_queue
+    from database.operations.shared import now_ms
+    from database.pool import get_pool
+
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "INSERT INTO letta_users (id, created_at, letta_identity_id, "
+            "letta_block_id) VALUES (1, 'x', 'identity-1', 'block-1')"
+        )
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        await db.commit()
+    await add_to_queue(1, await insert_message(1, 1, "user", "hi"))
+
+    async def set_completed(claimed_ago: float, lease_ago: float) -> None:
+        """Complete the item as another consumer would, times in seconds ago."""
+        now = now_ms()
+        async with get_pool().write_connection() as db:
+            await db.execute(
+                "UPDATE queue SET status = 'completed', claimed_at = ?, "
+                "lease_owner = 'other-host', lease_expires_at = ?",
+                (now - int(claimed_ago * 1000), now - int(lease_ago * 1000)),
+            )
+            await db.commit()
+
+    async def agent_blocks(*args, **kwargs):
+        for block_id in ("persona", "block-1"):
+            yield MagicMock(id=block_id)
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(MagicMock(), block_idle_timeout=30)
+    aio = processor.letta_client.aio
+    aio.agents.blocks.list = MagicMock(side_effect=agent_blocks)
+    aio.agents.blocks.detach = AsyncMock()
+
+    # Claimed recently, or a long turn whose renewed lease is still recent
+    for claimed_ago, lease_ago in ((5, -55), (300, 10)):
+        await set_completed(claimed_ago, lease_ago)
+        assert (await processor.reconcile_blocks()).leaked == []
+    aio.agents.blocks.detach.assert_not_called()
+
+    await set_completed(300, 60)
+    assert (await processor.reconcile_blocks()).leaked == ["block-1"]
+    aio.agents.blocks.detach.assert_awaited_once_with("block-1", agent_id="test_agent")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_partial_text_is_reported_during_the_queued_turn(temp_db):
+    """on_partial sees the streamed text while the user's block is attached."""
+    from database.operations.messages import insert_message
+    from database.operations.queue import add_to_queue, atomic_dequeue_batch
+    from database.pool import get_pool
+
+    async with get_pool().write_connection() as db:
+        await db.execute(
+            "INSERT INTO letta_users (id, created_at, letta_identity_id, "
+            "letta_block_id) VALUES (1, 'x', 'identity-1', 'block-1')"
+        )
+        await db.execute(
+            "INSERT INTO platform_profiles (id, letta_user_id, platform, "
+            "platform_user_id) VALUES (1, 1, 'telegram', '42')"
+        )
+        await db.commit()
+    message_id = await insert_message(1, 1, "user", "hi")
+    await add_to_queue(1, message_id)
+
+    async def run_turn(message, sender_id=None, on_partial=None):
+        await on_partial("Hel")
+        await on_partial("Hello")
+        return "Hello"
+
+    partials = []
+
+    async def on_partial(text, profile, reply_to):
+        attached = processor.block_attachments.is_attached("block-1")
+        partials.append((text, profile.platform_user_id, reply_to, attached))
+
+    with patch.dict("os.environ", {"AGENT_ID": "test_agent"}):
+        processor = QueueProcessor(
+            run_turn, message_mode="live", on_partial=on_partial
+        )
+    processor.letta_client.aio = AsyncMock()
+    (item,) = await atomic_dequeue_batch(1)
+    with patch.object(processor, "_route_response", AsyncMock(return_value=True)):
+        await processor._process_single_message(item)
+
+    assert partials == [
+        ("Hel", "42", message_id, True),
+        ("Hello", "42", message_id, True),
+    ]
+    async with get_pool().connection() as db:
+        async with db.execute("SELECT status FROM queue") as cursor:
+            assert (await cursor.fetchone())[0] == "completed"
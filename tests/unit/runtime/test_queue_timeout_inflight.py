@@ -7,6 +7,7 @@ that interact with ``asyncio.TimeoutError`` and ``AgentTurnTimeoutInFlight``.
 
 from __future__ import annotations
 
+import asyncio
 import inspect
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -14,8 +15,18 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from common.exceptions import AgentTurnTimeoutInFlight
+from database.models import PlatformProfile, QueueItemContext
 from runtime.core.queue import QueueProcessor
 
+_PROFILE = PlatformProfile(
+    id=99,
+    letta_user_id=3,
+    platform="telegram",
+    platform_user_id="plat-user",
+    username="user1",
+    display_name="Display",
+)
+
 
 def _discard_unawaited_coroutine(awaitable: object) -> None:
     """Avoid RuntimeWarning when tests short-circuit ``asyncio.wait_for`` without awaiting."""
@@ -53,31 +64,24 @@ def live_queue_deps() -> None:
     """Minimal happy-path DB + profile chain for live-mode message processing."""
     with (
         patch(
-            "runtime.core.queue.get_message_text",
-            new_callable=AsyncMock,
-            return_value=("user", "hello world"),
-        ),
-        patch(
-            "runtime.core.queue.get_user_details",
-            new_callable=AsyncMock,
-            return_value=("Display", "user1"),
-        ),
-        patch(
-            "runtime.core.queue.get_platform_profile_id",
+            "runtime.core.queue.get_queue_item_context",
             new_callable=AsyncMock,
-            return_value=(99, "plat-user"),
+            return_value=QueueItemContext(
+                queue_id=42,
+                letta_user_id=3,
+                message_id=7,
+                message="hello world",
+                profile=_PROFILE,
+                letta_block_id="block-uuid-1234",
+                letta_identity_id="ident-1",
+            ),
         ),
-        # Imported inside ``_process_single_message``; patch at source module.
-        patch(
-            "database.operations.users.get_platform_profile",
-            new_callable=AsyncMock,
-        ) as gp,
         patch(
-            "runtime.core.queue.update_message_with_response",
+            "runtime.core.queue.save_turn_response",
             new_callable=AsyncMock,
         ),
         patch(
-            "runtime.core.queue.update_queue_status",
+            "runtime.core.queue.set_queue_status",
             new_callable=AsyncMock,
         ),
         patch(
@@ -92,9 +96,6 @@ def live_queue_deps() -> None:
         ),
         patch("runtime.core.queue.asyncio.sleep", new_callable=AsyncMock),
     ):
-        prof = MagicMock()
-        prof.platform = "telegram"
-        gp.return_value = prof
         yield
 
 
@@ -120,7 +121,7 @@ class TestQueueOuterTimeoutNoRequeue:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq_mock:
                 with patch(
-                    "runtime.core.queue.update_queue_status", new_callable=AsyncMock
+                    "runtime.core.queue.set_queue_status", new_callable=AsyncMock
                 ) as uq:
                     await p._process_single_message(_queue_item())
         uq.assert_awaited_once_with(42, "failed")
@@ -144,7 +145,7 @@ class TestQueueOuterTimeoutNoRequeue:
             rq_mod = "runtime.core.queue.requeue_failed_item"
             with patch(rq_mod, new_callable=AsyncMock) as rq_mock:
                 with patch(
-                    "runtime.core.queue.update_queue_status",
+                    "runtime.core.queue.set_queue_status",
                     new_callable=AsyncMock,
                     side_effect=RuntimeError("db down"),
                 ):
@@ -176,7 +177,7 @@ class TestQueueAgentTurnTimeoutInFlightNoRequeue:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq_mock:
                 with patch(
-                    "runtime.core.queue.update_queue_status", new_callable=AsyncMock
+                    "runtime.core.queue.set_queue_status", new_callable=AsyncMock
                 ) as uq:
                     await p._process_single_message(_queue_item())
         uq.assert_awaited_once_with(42, "failed")
@@ -202,7 +203,7 @@ class TestQueueAgentTurnTimeoutInFlightNoRequeue:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq_mock:
                 with patch(
-                    "runtime.core.queue.update_queue_status",
+                    "runtime.core.queue.set_queue_status",
                     new_callable=AsyncMock,
                     side_effect=OSError("disk full"),
                 ):
@@ -230,7 +231,7 @@ class TestQueueBeltAndSuspendersInflight:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq_mock:
                 with patch(
-                    "runtime.core.queue.update_queue_status", new_callable=AsyncMock
+                    "runtime.core.queue.set_queue_status", new_callable=AsyncMock
                 ) as uq:
                     await p._process_single_message(_queue_item(qid=99))
         uq.assert_awaited_once_with(99, "failed")
@@ -243,7 +244,7 @@ class TestQueueNormalNoneResponseStillRequeues:
     async def test_core_returns_none_failed_requeues(
         self, live_queue_deps: None
     ) -> None:
-        """Completed turn with no assistant text → existing backoff + requeue."""
+        """Completed turn with no assistant text → deferred requeue."""
 
         async def passthrough_wait_for(coro, timeout=None):  # noqa: ARG002
             return await coro
@@ -262,7 +263,12 @@ class TestQueueNormalNoneResponseStillRequeues:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq_mock:
                 await p._process_single_message(_queue_item(attempts=1))
-        rq_mock.assert_awaited_once_with(42)
+        rq_mock.assert_awaited_once_with(
+            42,
+            max_attempts=p.max_attempts,
+            error="No response received from agent",
+            failure_class="no_response",
+        )
 
 
 @pytest.mark.unit
@@ -278,18 +284,18 @@ class TestQueueSuccessPath:
             return "assistant says hi", "completed"
 
         with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
-            p = QueueProcessor(AsyncMock(), message_mode="live")
+            p = QueueProcessor(AsyncMock(), message_mode="live", outbox_delivery=False)
         p._process_with_core_block = core_ok  # type: ignore[method-assign]
 
         with patch(
             "runtime.core.queue.asyncio.wait_for", side_effect=passthrough_wait_for
         ):
             with patch(
-                "runtime.core.queue.update_message_with_response",
+                "runtime.core.queue.save_turn_response",
                 new_callable=AsyncMock,
-            ) as um:
+            ) as save:
                 with patch(
-                    "runtime.core.queue.update_queue_status", new_callable=AsyncMock
+                    "runtime.core.queue.set_queue_status", new_callable=AsyncMock
                 ) as uq:
                     with patch(
                         "runtime.core.queue.requeue_failed_item",
@@ -299,9 +305,17 @@ class TestQueueSuccessPath:
                             p, "_route_response", new_callable=AsyncMock
                         ) as route:
                             await p._process_single_message(_queue_item())
-        um.assert_awaited_once_with(7, "assistant says hi")
-        uq.assert_awaited_once_with(42, "completed")
-        route.assert_awaited_once_with(7, "assistant says hi")
+        # Response and status are written together, not as separate writes
+        save.assert_awaited_once_with(
+            [7],
+            [42],
+            "assistant says hi",
+            "completed",
+            outbox_platform=None,
+            letta_user_id=3,
+        )
+        uq.assert_not_awaited()
+        route.assert_awaited_once_with(7, "assistant says hi", profile=_PROFILE)
         rq.assert_not_awaited()
 
 
@@ -310,7 +324,7 @@ class TestQueueSuccessPath:
 class TestQueueEchoMode:
     async def test_echo_never_invokes_wait_for(self, live_queue_deps: None) -> None:
         with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
-            p = QueueProcessor(AsyncMock(), message_mode="echo")
+            p = QueueProcessor(AsyncMock(), message_mode="echo", outbox_delivery=False)
 
         async def forbidden_wait_for(_c, timeout=None):  # noqa: ANN001, ARG002
             raise AssertionError("echo mode must not wrap agent in wait_for")
@@ -322,11 +336,11 @@ class TestQueueEchoMode:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq:
                 with patch(
-                    "runtime.core.queue.update_message_with_response",
+                    "runtime.core.queue.save_turn_response",
                     new_callable=AsyncMock,
-                ) as um:
+                ) as save:
                     with patch(
-                        "runtime.core.queue.update_queue_status",
+                        "runtime.core.queue.set_queue_status",
                         new_callable=AsyncMock,
                     ) as uq:
                         with patch.object(
@@ -334,8 +348,9 @@ class TestQueueEchoMode:
                         ) as route:
                             await p._process_single_message(_queue_item())
         rq.assert_not_awaited()
-        um.assert_awaited_once()
-        uq.assert_awaited_once_with(42, "completed")
+        save.assert_awaited_once()
+        assert save.await_args.args[3] == "completed"
+        uq.assert_not_awaited()
         route.assert_awaited_once()
 
 
@@ -383,7 +398,7 @@ class TestQueueMessageProcessTimeoutFloor:
                     "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
                 ):
                     with patch(
-                        "runtime.core.queue.update_queue_status",
+                        "runtime.core.queue.set_queue_status",
                         new_callable=AsyncMock,
                     ):
                         await p._process_single_message(_queue_item())
@@ -429,7 +444,7 @@ class TestQueueMessageProcessTimeoutFloor:
                     "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
                 ):
                     with patch(
-                        "runtime.core.queue.update_queue_status",
+                        "runtime.core.queue.set_queue_status",
                         new_callable=AsyncMock,
                     ):
                         await p._process_single_message(_queue_item())
@@ -456,7 +471,12 @@ class TestQueueGenericExceptionStillRequeues:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq:
                 await p._process_single_message(_queue_item())
-        rq.assert_awaited_once_with(42)
+        rq.assert_awaited_once_with(
+            42,
+            max_attempts=p.max_attempts,
+            error="unexpected",
+            failure_class="RuntimeError",
+        )
 
 
 @pytest.mark.unit
@@ -481,7 +501,7 @@ class TestQueuePostSuccessPersistenceFailure:
             "runtime.core.queue.asyncio.wait_for", side_effect=passthrough_wait_for
         ):
             with patch(
-                "runtime.core.queue.update_message_with_response",
+                "runtime.core.queue.save_turn_response",
                 new_callable=AsyncMock,
                 side_effect=RuntimeError("sqlite locked"),
             ) as um:
@@ -490,71 +510,77 @@ class TestQueuePostSuccessPersistenceFailure:
                 ) as rq:
                     await p._process_single_message(_queue_item())
         um.assert_awaited_once()
-        rq.assert_awaited_once_with(42)
+        rq.assert_awaited_once_with(
+            42,
+            max_attempts=p.max_attempts,
+            error="sqlite locked",
+            failure_class="RuntimeError",
+        )
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
 class TestProcessWithCoreBlockDetachOnInflight:
     async def test_detach_called_then_reraises(self) -> None:
-        attach_detach = AsyncMock(return_value=None)
-
         async def mp(_m: str, sender_id: str | None = None) -> str:
             raise AgentTurnTimeoutInFlight("letta")
 
         with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
             p = QueueProcessor(mp, message_mode="live")
-
-        with (
-            patch(
-                "runtime.core.queue.get_letta_user_block_id",
-                new_callable=AsyncMock,
-                return_value="block-uuid-1234",
-            ),
-            patch(
-                "runtime.core.queue.get_letta_identity_id",
-                new_callable=AsyncMock,
-                return_value="ident-1",
-            ),
-            patch("runtime.core.queue.asyncio.to_thread", attach_detach),
-        ):
-            with pytest.raises(AgentTurnTimeoutInFlight, match="letta"):
-                await p._process_with_core_block("msg", letta_user_id=1)
-
-        # attach + detach on in-flight path (order: attach, then detach after timeout)
-        assert attach_detach.await_count >= 2
+        client = MagicMock()
+        client.aio = AsyncMock()
+        p.block_attachments.letta_client = client
+        blocks_api = client.aio.agents.blocks
+
+        with pytest.raises(AgentTurnTimeoutInFlight, match="letta"):
+            await p._process_with_core_block(
+                "msg",
+                letta_user_id=1,
+                block_id="block-uuid-1234",
+                identity_id="ident-1",
+            )
+
+        # attach, then detach on the in-flight path
+        blocks_api.attach.assert_awaited_once_with("block-uuid-1234", agent_id="agent-x")
+        blocks_api.detach.assert_awaited_once_with("block-uuid-1234", agent_id="agent-x")
 
     async def test_detach_failure_still_reraises_inflight(self) -> None:
-        call_n = 0
+        async def mp(_m: str, sender_id: str | None = None) -> str:
+            raise AgentTurnTimeoutInFlight("letta")
 
-        async def flaky_to_thread(fn, *args, **kwargs):  # noqa: ANN001
-            nonlocal call_n
-            call_n += 1
-            if "detach" in getattr(fn, "__name__", str(fn)):
-                raise ConnectionError("detach failed")
-            return None
+        with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
+            p = QueueProcessor(mp, message_mode="live")
+        client = MagicMock()
+        client.aio = AsyncMock()
+        client.aio.agents.blocks.detach.side_effect = ConnectionError("detach failed")
+        p.block_attachments.letta_client = client
+
+        with pytest.raises(AgentTurnTimeoutInFlight):
+            await p._process_with_core_block("m", 1, "block-uuid-1234", "ident-1")
 
+    async def test_outer_timeout_frees_block_for_next_user(self) -> None:
         async def mp(_m: str, sender_id: str | None = None) -> str:
-            raise AgentTurnTimeoutInFlight("letta")
+            await asyncio.sleep(10)
+            return "late"
 
         with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
             p = QueueProcessor(mp, message_mode="live")
+        client = MagicMock()
+        client.aio = AsyncMock()
+        p.block_attachments.letta_client = client
 
-        with (
-            patch(
-                "runtime.core.queue.get_letta_user_block_id",
-                new_callable=AsyncMock,
-                return_value="block-uuid-1234",
-            ),
-            patch(
-                "runtime.core.queue.get_letta_identity_id",
-                new_callable=AsyncMock,
-                return_value="ident-1",
-            ),
-            patch("runtime.core.queue.asyncio.to_thread", flaky_to_thread),
-        ):
-            with pytest.raises(AgentTurnTimeoutInFlight):
-                await p._process_with_core_block("m", 1)
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(
+                p._process_with_core_block("m", 1, "block-uuid-1234", "ident-1"),
+                timeout=0.01,
+            )
+
+        # The cancelled turn's block is detached, so another user's acquire
+        # does not wait on it
+        client.aio.agents.blocks.detach.assert_awaited_once_with(
+            "block-uuid-1234", agent_id="agent-x"
+        )
+        await asyncio.wait_for(p.block_attachments.acquire("block-other"), 1.0)
 
 
 @pytest.mark.unit
@@ -564,7 +590,7 @@ class TestQueueOrphanedPathsUnchanged:
         with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
             p = QueueProcessor(AsyncMock(), message_mode="live")
         with patch(
-            "runtime.core.queue.get_message_text",
+            "runtime.core.queue.get_queue_item_context",
             new_callable=AsyncMock,
             return_value=None,
         ):
@@ -572,4 +598,30 @@ class TestQueueOrphanedPathsUnchanged:
                 "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
             ) as rq:
                 await p._process_single_message(_queue_item())
-        rq.assert_awaited_once_with(42)
+        rq.assert_awaited_once_with(
+            42,
+            max_attempts=p.max_attempts,
+            error="Message 7 not found",
+            failure_class="missing_message",
+        )
+
+    async def test_missing_profile_marks_failed(self) -> None:
+        with patch.dict("os.environ", {"AGENT_ID": "agent-x"}):
+            p = QueueProcessor(AsyncMock(), message_mode="live")
+        context = QueueItemContext(
+            queue_id=42, letta_user_id=3, message_id=7, message="hi", profile=None
+        )
+        with patch(
+            "runtime.core.queue.get_queue_item_context",
+            new_callable=AsyncMock,
+            return_value=context,
+        ):
+            with patch(
+                "runtime.core.queue.set_queue_status", new_callable=AsyncMock
+            ) as uq:
+                with patch(
+                    "runtime.core.queue.requeue_failed_item", new_callable=AsyncMock
+                ) as rq:
+                    await p._process_single_message(_queue_item())
+        uq.assert_awaited_once_with(42, "failed")
+        rq.assert_not_awaited()
@@ -327,7 +327,7 @@ class TestApplicationMocked:
             result = await app._process_message("Test message")
             assert result == mock_response
             app.agent.process_message_async.assert_called_once_with(
-                "Test message", None
+                "Test message", None, on_partial=None
             )
 
     @pytest.mark.asyncio
@@ -459,3 +459,79 @@ class TestApplicationMocked:
 
             # Should not raise exception
             app.update_settings({"message_mode": "listen"})
+
+    @pytest.mark.asyncio
+    async def test_application_resource_pool_refill_is_cancelled_by_stop(self):
+        """stop() cancels an in-progress refill so it cannot outlive the pool."""
+        import asyncio
+
+        refilling = asyncio.Event()
+
+        async def slow_refill(size, batch):
+            refilling.set()
+            await asyncio.sleep(3600)
+
+        with (
+            patch.dict(os.environ, {"AGENT_ID": "test-agent-123"}),
+            patch("main.create_default_settings"),
+            patch("main.PluginManager"),
+            patch("main.AgentClient"),
+            patch("main.QueueProcessor"),
+            patch("main.get_settings", return_value={}),
+            patch("main.get_config_manager", return_value=MagicMock()),
+            patch("builtins.open", mock_open()),
+            patch("os.getpid", return_value=12345),
+            patch("main.signal.signal"),
+            patch("main.refill_resource_pool", side_effect=slow_refill),
+            patch("main.cancel_provisioning", new_callable=AsyncMock),
+        ):
+            from main import Application
+
+            app = Application()
+            app._shutdown_event = asyncio.Event()
+            app.agent.cleanup = AsyncMock()
+            app.plugin_manager.stop = AsyncMock()
+            app.queue_processor = None
+            task = asyncio.create_task(app._run_resource_pool())
+            app._tasks.add(task)
+            task.add_done_callback(app._tasks.discard)
+            await asyncio.wait_for(refilling.wait(), timeout=5)
+
+            await app.stop()
+
+            assert task.cancelled()
+            assert not app._tasks
+
+    @pytest.mark.asyncio
+    async def test_application_stop_cancels_provisioning_before_agent_cleanup(self):
+        """Provisioning tasks stop while the Letta client is still open."""
+        calls = []
+
+        def record(name):
+            return AsyncMock(side_effect=lambda *args: calls.append(name))
+
+        with (
+            patch.dict(os.environ, {"AGENT_ID": "test-agent-123"}),
+            patch("main.create_default_settings"),
+            patch("main.PluginManager"),
+            patch("main.AgentClient"),
+            patch("main.QueueProcessor"),
+            patch("main.get_settings", return_value={}),
+            patch("main.get_config_manager", return_value=MagicMock()),
+            patch("builtins.open", mock_open()),
+            patch("os.getpid", return_value=12345),
+            patch("main.signal.signal"),
+            patch("main.cancel_provisioning", record("provisioning")),
+        ):
+            from main import Application
+
+            app = Application()
+            app.queue_processor.stop = record("queue")
+            app.outbox_delivery = MagicMock(stop=record("outbox"))
+            app.agent.cleanup = record("agent")
+            app.plugin_manager.stop = record("plugins")
+            app.db_pool = MagicMock(close=record("db"))
+
+            await app.stop()
+
+        assert calls == ["queue", "outbox", "provisioning", "agent", "plugins", "db"]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Queue scheduling simulation: per-user wait times under each dequeue policy.
+
+Replays a synthetic workload against a real SQLite queue with the production
+claim path (atomic_dequeue_batch) on a simulated clock: every agent turn takes
+TURN seconds of simulated time, nothing actually sleeps. The default workload
+is one user dumping a 200-message backlog while 10 other users each send a
+message every 15 minutes or so.
+
+  python tools/queue_fairness_sim.py [--slots 1] [--turn 60] [--backlog 200]
+
+Prints p50 / p95 / max wait (enqueue to claim, in simulated seconds) for the
+backlogged user and for everyone else, per policy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database.operations.queue import (  # noqa: E402
+    SCHEDULING_POLICIES,
+    atomic_dequeue_batch,
+)
+from database.pool import get_pool  # noqa: E402
+
+BACKLOG_USER = 1
+
+
+def default_workload(
+    backlog: int = 200,
+    light_users: int = 10,
+    light_messages: int = 5,
+    mean_gap: float = 900.0,
+    seed: int = 7,
+) -> list[tuple[float, int]]:
+    """(arrival second, letta_user_id) pairs: one backlog plus light traffic."""
+    rng = random.Random(seed)
+    arrivals = [(0.0, BACKLOG_USER)] * backlog
+    for user in range(2, light_users + 2):
+        t = rng.uniform(0, mean_gap)
+        for _ in range(light_messages):
+            arrivals.append((t, user))
+            t += rng.expovariate(1 / mean_gap)
+    return sorted(arrivals)
+
+
+async def _seed_users(user_ids: set[int]) -> None:
+    async with get_pool().write_connection() as db:
+        await db.executemany(
+            "INSERT OR IGNORE INTO letta_users (id, created_at) VALUES (?, 'sim')",
+            [(user,) for user in user_ids],
+        )
+        await db.commit()
+
+
+async def _enqueue(arrivals: list[tuple[float, int]]) -> dict[int, float]:
+    """Insert queue rows with simulated enqueue times; return id -> arrival."""
+    arrived = {}
+    async with get_pool().write_connection() as db:
+        for t, user in arrivals:
+            cursor = await db.execute(
+                "INSERT INTO queue (letta_user_id, status, enqueued_at) "
+                "VALUES (?, 'pending', ?)",
+                (user, int(t * 1000)),
+            )
+            arrived[cursor.lastrowid] = t
+        await db.commit()
+    return arrived
+
+
+async def _complete(queue_ids: list[int]) -> None:
+    async with get_pool().write_connection() as db:
+        await db.executemany(
+            "UPDATE queue SET status = 'completed' WHERE id = ?",
+            [(queue_id,) for queue_id in queue_ids],
+        )
+        await db.commit()
+
+
+async def _reset() -> None:
+    async with get_pool().write_connection() as db:
+        await db.execute("DELETE FROM queue")
+        await db.execute("DELETE FROM queue_fair_share")
+        await db.commit()
+
+
+async def simulate(
+    policy: str,
+    arrivals: list[tuple[float, int]],
+    slots: int = 1,
+    turn_seconds: float = 60.0,
+    user_weights: dict[int, float] | None = None,
+) -> dict[int, list[float]]:
+    """Run the workload through atomic_dequeue_batch on a simulated clock.
+
+    Needs an initialized database (and pool). Clears queue and fair-share
+    state first.
+
+    Returns:
+        letta_user_id -> waits (simulated seconds from enqueue to claim)
+    """
+    await _reset()
+    await _seed_users({user for _, user in arrivals})
+    pending = sorted(arrivals)
+    arrival_of: dict[int, float] = {}
+    in_flight: list[tuple[float, int]] = []  # (finish time, queue id)
+    waits: dict[int, list[float]] = defaultdict(list)
+    clock = 0.0
+
+    while pending or in_flight or len(arrival_of) > sum(map(len, waits.values())):
+        done = [qid for finish, qid in in_flight if finish <= clock]
+        if done:
+            await _complete(done)
+            in_flight = [(f, q) for f, q in in_flight if q not in done]
+
+        due = [a for a in pending if a[0] <= clock]
+        pending = pending[len(due) :]
+        if due:
+            arrival_of.update(await _enqueue(due))
+
+        free = slots - len(in_flight)
+        if free > 0:
+            claimed = await atomic_dequeue_batch(
+                free, policy=policy, user_weights=user_weights
+            )
+            for item in claimed:
+                waits[item.letta_user_id].append(clock - arrival_of[item.id])
+                in_flight.append((clock + turn_seconds, item.id))
+
+        next_events = [f for f, _ in in_flight] + [a[0] for a in pending[:1]]
+        if not next_events:
+            break
+        clock = max(clock, min(next_events))
+
+    return dict(waits)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _summary(label: str, values: list[float]) -> str:
+    return (
+        f"  {label:<10} n={len(values):<4} p50={percentile(values, 50):>8.0f}s "
+        f"p95={percentile(values, 95):>8.0f}s max={max(values, default=0):>8.0f}s"
+    )
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    import database.pool as pool_mod
+    from database.operations.shared import initialize_database
+    from database.pool import initialize_pool
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TEST_DB_PATH"] = os.path.join(tmp, "sim.db")
+        pool_mod._pool = None
+        await initialize_pool(2, 1).initialize()
+        await initialize_database()
+
+        arrivals = default_workload(backlog=args.backlog)
+        print(
+            f"{len(arrivals)} messages, {args.slots} slot(s), "
+            f"{args.turn:.0f}s per turn"
+        )
+        for policy in SCHEDULING_POLICIES:
+            waits = await simulate(policy, arrivals, args.slots, args.turn)
+            light = [
+                w for user, ws in waits.items() if user != BACKLOG_USER for w in ws
+            ]
+            print(policy)
+            print(_summary("backlog", waits.get(BACKLOG_USER, [])))
+            print(_summary("others", light))
+
+        await get_pool().close()
+        pool_mod._pool = None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slots", type=int, default=1, help="Concurrent turns")
+    parser.add_argument("--turn", type=float, default=60.0, help="Seconds per turn")
+    parser.add_argument("--backlog", type=int, default=200, help="Backlog size")
+    asyncio.run(_async_main(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())